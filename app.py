@@ -8,12 +8,14 @@ import streamlit as st
 import time
 import base64
 import tempfile
-import os
 from datetime import datetime
 
 # Import custom modules
 from utils.chatbot import MindEaseAI
-from utils.crisis_detector import detect_crisis, is_severe_distress, get_gentle_checkin
+from utils.crisis_detector import (
+    detect_crisis, is_severe_distress, get_gentle_checkin, StreamingCrisisDetector,
+    SessionRiskTracker, get_severity_score
+)
 from utils.coping_toolkit import (
     get_breathing_exercise, get_grounding_exercise, get_reset_routine,
     get_sleep_tips, get_focus_tips, get_mood_based_exercise, get_all_exercises
@@ -142,6 +144,9 @@ def init_session_state():
     if "chatbot" not in st.session_state:
         st.session_state.chatbot = MindEaseAI()
     
+    if "risk_tracker" not in st.session_state:
+        st.session_state.risk_tracker = SessionRiskTracker()
+    
     if "voice_handler" not in st.session_state:
         st.session_state.voice_handler = VoiceHandler()
     
@@ -197,9 +202,22 @@ def display_messages():
                 if st.button("🔊 Play", key=f"play_{idx}", help="Click to hear this message"):
                     st.session_state.play_message_index = idx
 
+def screen_stream(chunks, detector: StreamingCrisisDetector):
+    """Pass model output through, stopping as soon as crisis content appears."""
+    try:
+        for chunk in chunks:
+            if detector.feed(chunk):
+                return
+            yield chunk
+    finally:
+        chunks.close()
+
 def process_user_input(user_input: str):
-    """Process user input and generate response."""
-    # Check for crisis content first
+    """Process user input and stream the response."""
+    # Track distress across recent turns, not just this message
+    st.session_state.risk_tracker.observe(user_input, severity=get_severity_score(user_input))
+    
+    # Check for crisis content first (misspellings only raise the risk score above)
     is_crisis, crisis_response = detect_crisis(user_input)
     
     if is_crisis:
@@ -209,12 +227,23 @@ def process_user_input(user_input: str):
     
     # Generate AI response
     add_message("user", user_input)
+    with st.chat_message("user", avatar="👤"):
+        st.markdown(user_input)
     
-    response = st.session_state.chatbot.generate_response(
+    # Stream it into the chat view, screening the bot's output as it arrives
+    output_screen = StreamingCrisisDetector.for_model_output()
+    chunks = st.session_state.chatbot.generate_response_stream(
         user_input,
         mood=st.session_state.current_mood,
         intensity=st.session_state.mood_intensity
     )
+    with st.chat_message("assistant", avatar="🧘"):
+        response = st.write_stream(screen_stream(chunks, output_screen))
+    
+    if output_screen.triggered or output_screen.close():
+        response = output_screen.get_response()
+    elif st.session_state.risk_tracker.needs_check_in():
+        response = get_gentle_checkin() + "\n\n---\n\n" + response
     
     add_message("assistant", response)
     
@@ -224,17 +253,11 @@ def text_to_speech(text: str):
     """Convert text to speech and play it."""
     if st.session_state.voice_enabled and st.session_state.voice_handler.is_tts_available():
         try:
-            # Use gTTS for audio file generation (works better in Streamlit)
-            audio_path = st.session_state.voice_handler.speak(text, use_gtts=True)
-            if audio_path and os.path.exists(audio_path):
-                # Read audio bytes before displaying
-                with open(audio_path, "rb") as audio_file:
-                    audio_bytes = audio_file.read()
-                # Clean up temp file first
-                try:
-                    os.unlink(audio_path)
-                except:
-                    pass
+            # MP3 bytes, served from the shared audio cache on replays. st.audio
+            # needs the whole file, so replies are cut at 500 characters to
+            # bound time-to-audio and TTS cost (pre-rendered texts play in full)
+            audio_bytes = st.session_state.voice_handler.speak_bytes(text)
+            if audio_bytes:
                 # Store in session state to persist
                 st.session_state.last_audio = audio_bytes
         except Exception as e:
@@ -302,8 +325,10 @@ with st.sidebar:
             st.error(f"❤️ Intense {selected_mood.lower()}")
         
         if st.button("Get Support for This Mood", type="primary"):
-            # Check for severe distress
-            if is_severe_distress(selected_mood, intensity):
+            st.session_state.risk_tracker.observe(mood=selected_mood, intensity=intensity)
+            checkin_due = st.session_state.risk_tracker.needs_check_in()
+            # Check for severe distress (now or building up over recent turns)
+            if is_severe_distress(selected_mood, intensity) or checkin_due:
                 response = get_gentle_checkin() + "\n\n---\n\n" + get_mood_based_exercise(selected_mood, intensity)
             else:
                 response = get_mood_based_exercise(selected_mood, intensity)
@@ -400,6 +425,7 @@ with st.sidebar:
         if st.button("🔄 Reset", use_container_width=True, help="Start fresh conversation"):
             st.session_state.messages = []
             st.session_state.chatbot.reset_conversation()
+            st.session_state.risk_tracker.reset()
             st.session_state.current_mood = None
             st.session_state.mood_intensity = 5
             st.session_state.conversation_started = False
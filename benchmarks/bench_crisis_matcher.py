@@ -0,0 +1,70 @@
+"""
+Crisis Matcher Benchmark
+Compares the old per-keyword substring scan with the compiled PhraseMatcher
+as the phrase list grows.
+
+Run from the repository root:
+    python benchmarks/bench_crisis_matcher.py
+"""
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.crisis_detector import CRISIS_KEYWORDS  # noqa: E402
+from utils.phrase_matcher import PhraseMatcher  # noqa: E402
+
+SIZES = [len(CRISIS_KEYWORDS), 250, 1000, 5000, 10000]
+
+MESSAGES = [
+    "I've been feeling really stressed about exams and I can't sleep at night",
+    "hi",
+    "Honestly nobody cares about me and I'm tired of pretending everything is fine",
+    "Work has been overwhelming lately, my manager keeps piling on more tasks and "
+    "I don't know how to say no without looking lazy. Any tips for setting boundaries?",
+    "Some days I feel like I can't take it anymore.",
+]
+
+
+def synthetic_phrases(count: int, seed: int = 7) -> list:
+    """Real keywords padded with random 2-4 word phrases."""
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    vocab = ["".join(rng.choice(letters) for _ in range(rng.randint(3, 9))) for _ in range(3000)]
+    phrases = list(CRISIS_KEYWORDS)
+    while len(phrases) < count:
+        phrases.append(" ".join(rng.choice(vocab) for _ in range(rng.randint(2, 4))))
+    return phrases[:count]
+
+
+def naive_scan(message: str, keywords: list) -> bool:
+    """The original detect_crisis loop (a stem like "overdos*" as a plain substring)."""
+    message_lower = message.lower()
+    for keyword in keywords:
+        if keyword.rstrip("*") in message_lower:
+            return True
+    return False
+
+
+def per_message_us(func, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number / len(MESSAGES) * 1e6
+
+
+def main():
+    print(f"{'phrases':>8} | {'naive scan (us/msg)':>20} | {'PhraseMatcher (us/msg)':>23} | {'build (ms)':>10}")
+    print("-" * 72)
+    for size in SIZES:
+        phrases = synthetic_phrases(size)
+        build_ms = min(timeit.repeat(lambda: PhraseMatcher(phrases), number=1, repeat=3)) * 1e3
+        matcher = PhraseMatcher(phrases)
+
+        naive = per_message_us(lambda: [naive_scan(m, phrases) for m in MESSAGES], 200)
+        compiled = per_message_us(lambda: [matcher.search(m) for m in MESSAGES], 2000)
+        print(f"{size:>8} | {naive:>20.2f} | {compiled:>23.2f} | {build_ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
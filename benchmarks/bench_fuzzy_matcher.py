@@ -0,0 +1,70 @@
+"""
+Fuzzy Crisis Matcher Benchmark
+Per-message latency of typo-tolerant crisis matching (n-gram index) against
+exact matching and a brute-force edit-distance scan over every phrase word.
+
+Run from the repository root:
+    python benchmarks/bench_fuzzy_matcher.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.crisis_detector import _CRISIS_MATCHER  # noqa: E402
+from utils.phrase_matcher import WORD_PATTERN, bounded_edit_distance, normalize_token  # noqa: E402
+
+MESSAGES = [
+    "I feel suicdal and I don't know who to talk to about any of this anymore",
+    "honestly i just want to kil myself, everything at home is falling apart",
+    "Work has been overwhelming lately, my manager keeps piling on more tasks and "
+    "I don't know how to say no without looking lazy. Any tips for setting boundaries?",
+    "i cant tkae it anymroe, evryone hates me",
+    "hi",
+    "Had a pretty decent day today, went for a walk and called my sister afterwards",
+]
+
+
+def brute_force(message: str) -> bool:
+    """Edit distance from every word to every typo target (the naive approach)."""
+    vocabulary = _CRISIS_MATCHER.fuzzy_index.words
+    hits = 0
+    for match in WORD_PATTERN.finditer(message):
+        token = normalize_token(match.group())
+        for word in vocabulary:
+            if bounded_edit_distance(token, word, 2) <= 2:
+                hits += 1
+                break
+    return hits > 0
+
+
+def per_message_us(func, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number / len(MESSAGES) * 1e6
+
+
+def cold_fuzzy():
+    index = _CRISIS_MATCHER.fuzzy_index
+    for message in MESSAGES:
+        index._cache.clear()
+        _CRISIS_MATCHER.search(message, fuzzy=True)
+
+
+def main():
+    index = _CRISIS_MATCHER.fuzzy_index
+    print(f"phrases: {len(_CRISIS_MATCHER)}, indexed words: {len(index.words)}, n={index.n}")
+    print(f"{'mode':<34} | {'us/msg':>8}")
+    print("-" * 46)
+    exact = per_message_us(lambda: [_CRISIS_MATCHER.search(m) for m in MESSAGES], 2000)
+    warm = per_message_us(lambda: [_CRISIS_MATCHER.search(m, fuzzy=True) for m in MESSAGES], 2000)
+    cold = per_message_us(cold_fuzzy, 200)
+    naive = per_message_us(lambda: [brute_force(m) for m in MESSAGES], 5)
+    print(f"{'exact':<34} | {exact:>8.1f}")
+    print(f"{'fuzzy, correction cache warm':<34} | {warm:>8.1f}")
+    print(f"{'fuzzy, correction cache cold':<34} | {cold:>8.1f}")
+    print(f"{'brute-force edit distance':<34} | {naive:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Response Bank Benchmark
+Per-message lookup latency of the offline retrieval index at increasing bank
+sizes, plus index build time and memory-mapped load time
+
+Banks larger than the curated one are synthesized by recombining its cue
+words (and some filler vocabulary), so postings lists look realistic.
+
+Run from the repository root:
+    python benchmarks/bench_response_bank.py
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.response_bank import (  # noqa: E402
+    DEFAULT_BANK_PATH, MOODS, ResponseBank, read_bank
+)
+
+MESSAGES = [
+    "I have exams tomorrow and I can't focus on anything",
+    "my boss keeps giving me more work and I can't say no",
+    "i feel so lonely, nobody talks to me anymore",
+    "I can't sleep at night, my mind keeps racing",
+    "ugh i'm so angry i want to scream",
+    "how do I cook pasta",
+]
+
+
+def synthesize(entries, size: int, seed: int = 7):
+    """A bank of `size` entries built from the curated bank's cue vocabulary."""
+    rng = random.Random(seed)
+    vocabulary = sorted({word for entry in entries for word in entry["cues"].split()})
+    filler = [f"topic{i}" for i in range(5000)]
+    bank = []
+    for i in range(size):
+        base = entries[i % len(entries)]
+        words = base["cues"].split()
+        cues = rng.sample(words, min(len(words), 8)) + rng.sample(vocabulary, 4) + rng.sample(filler, 3)
+        bank.append({"id": f"{base['id']}-{i}", "moods": rng.sample(MOODS, rng.randint(0, 2)),
+                     "cues": " ".join(cues), "response": base["response"]})
+    return bank
+
+
+def per_message_us(bank: ResponseBank, number: int) -> float:
+    run = lambda: [bank.lookup(m, "Stressed") for m in MESSAGES]  # noqa: E731
+    return min(timeit.repeat(run, number=number, repeat=5)) / number / len(MESSAGES) * 1e6
+
+
+def main():
+    curated = read_bank(DEFAULT_BANK_PATH)
+    print(f"{'entries':>8} | {'build s':>8} | {'mmap load ms':>12} | {'us/lookup':>9}")
+    print("-" * 48)
+    for size in (len(curated), 1000, 10000, 30000, 100000):
+        entries = curated if size == len(curated) else synthesize(curated, size)
+        started = time.perf_counter()
+        bank = ResponseBank.build(entries)
+        build_s = time.perf_counter() - started
+        with tempfile.TemporaryDirectory() as index_dir:
+            bank.save(index_dir, f"synthetic-{size}")
+            started = time.perf_counter()
+            bank = ResponseBank.load(entries, index_dir, f"synthetic-{size}")
+            load_ms = (time.perf_counter() - started) * 1000
+            lookup_us = per_message_us(bank, 200)
+        print(f"{size:>8} | {build_s:>8.2f} | {load_ms:>12.1f} | {lookup_us:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Session Creation Benchmark
+Cost of creating a chatbot for a new browser session: the old per-session
+Gemini client (configure + GenerativeModel + ChatSession) versus the shared
+process-wide model with lazily created chat state.
+
+No network calls are made; a placeholder key is used if GOOGLE_API_KEY is
+not set. Requires google-generativeai.
+
+Run from the repository root:
+    python benchmarks/bench_session_creation.py
+"""
+
+import gc
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import chatbot  # noqa: E402
+from utils.chatbot import MindEaseAI, SYSTEM_PROMPT  # noqa: E402
+
+SESSIONS = 200
+API_KEY = os.getenv("GOOGLE_API_KEY") or "benchmark-placeholder-key"
+
+
+def per_session_client():
+    """What init_session_state used to build for every session."""
+    chatbot.genai.configure(api_key=API_KEY)
+    model = chatbot.genai.GenerativeModel(model_name="gemini-2.0-flash",
+                                          system_instruction=SYSTEM_PROMPT)
+    return model, model.start_chat(history=[])
+
+
+def shared_client():
+    return MindEaseAI(api_key=API_KEY)
+
+
+def retained_kib(factory) -> float:
+    """Memory still held per session after creating SESSIONS of them."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    sessions = [factory() for _ in range(SESSIONS)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del sessions
+    return size / SESSIONS / 1024
+
+
+def main():
+    if not chatbot.GEMINI_AVAILABLE:
+        print("google-generativeai is not installed; nothing to compare.")
+        return
+
+    shared_client()  # build the shared model once, as the first session would
+    print(f"{'variant':<28} | {'us/session':>10} | {'KiB/session':>11}")
+    print("-" * 56)
+    for name, factory in [("before: client per session", per_session_client),
+                          ("after: shared client", shared_client)]:
+        cost = min(timeit.repeat(factory, number=SESSIONS, repeat=3)) / SESSIONS * 1e6
+        print(f"{name:<28} | {cost:>10.1f} | {retained_kib(factory):>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
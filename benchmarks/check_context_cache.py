@@ -0,0 +1,153 @@
+"""
+Context Cache Check
+Drives the cached system prompt through its whole lifecycle on a fake clock
+and checks the token accounting of every turn
+
+An in-memory provider stands in for Gemini's CachedContent, so no API key or
+network access is needed. Each turn goes through GeminiBackend, exactly as a
+chat turn does, and must report the system prompt as cached input while a
+cache is live and as fresh input while it is not.
+
+Lifecycle covered: create -> reuse -> refresh near expiry -> re-create after
+expiry -> re-create after the provider lost the entry -> create failure
+(prompt sent uncached, retry after a pause) -> delete on close.
+
+Run from the repository root (exits non-zero on a failure):
+    python benchmarks/check_context_cache.py
+"""
+
+import asyncio
+import os
+import sys
+from typing import Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.context_cache import CacheHandle, ContextCacheProvider, SystemPromptCache  # noqa: E402
+from utils.history import estimate_tokens  # noqa: E402
+from utils.llm_backends import GeminiBackend, TokenUsage, contents_tokens  # noqa: E402
+
+SYSTEM_PROMPT = "You are MindEase, a supportive mental wellness companion. " * 40
+TTL = 3600.0
+REFRESH_MARGIN = 300.0
+RETRY_AFTER = 600.0
+
+
+class FakeClock:
+    """Monotonic seconds that only move when the check says so."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeResponse:
+    """Model reply without usage metadata, so the backend estimates tokens."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.usage_metadata = None
+
+
+class FakeModel:
+    """Answers every call with the same short reply."""
+
+    async def generate_content_async(self, contents, stream: bool = False):
+        return FakeResponse("I'm here for you.")
+
+
+class LocalContextCacheProvider(ContextCacheProvider):
+    """In-memory provider whose entries expire on the fake clock."""
+
+    def __init__(self, model, clock: FakeClock):
+        self.model = model
+        self.clock = clock
+        self.entries: Dict[str, float] = {}
+        self.fail_creates = False
+        self.created = 0
+        self.refreshed = 0
+        self.deleted = 0
+
+    def create(self, model_name: str, system_prompt: str, ttl: float) -> CacheHandle:
+        if self.fail_creates:
+            raise RuntimeError("cached content is below the minimum size")
+        self.created += 1
+        name = f"cachedContents/local-{self.created}"
+        self.entries[name] = self.clock() + ttl
+        return CacheHandle(name, self.entries[name], estimate_tokens(system_prompt))
+
+    def refresh(self, handle: CacheHandle, ttl: float) -> CacheHandle:
+        if self.entries.get(handle.name, 0) <= self.clock():
+            raise LookupError(f"{handle.name} has expired")
+        self.refreshed += 1
+        self.entries[handle.name] = self.clock() + ttl
+        return handle._replace(expires_at=self.entries[handle.name])
+
+    def delete(self, handle: CacheHandle):
+        if self.entries.pop(handle.name, None) is not None:
+            self.deleted += 1
+
+    def model_for(self, handle: CacheHandle):
+        return self.model
+
+
+def main() -> int:
+    clock = FakeClock()
+    model = FakeModel()
+    provider = LocalContextCacheProvider(model, clock)
+    cache = SystemPromptCache(provider, "gemini-2.0-flash", SYSTEM_PROMPT, ttl=TTL,
+                              refresh_margin=REFRESH_MARGIN, retry_after=RETRY_AFTER, clock=clock)
+    backend = GeminiBackend(model, "gemini-2.0-flash", system_cache=cache,
+                            system_prompt=SYSTEM_PROMPT)
+    contents = [{"role": "user", "parts": ["I've been feeling anxious about work."]}]
+    prompt_tokens = estimate_tokens(SYSTEM_PROMPT)
+    message_tokens = contents_tokens(contents)
+    failures = []
+
+    def turn(label: str, at: float, cached: bool, creates: int, refreshes: int, cache_failures: int):
+        clock.now = at
+        usage = TokenUsage()
+        asyncio.run(backend.generate(contents, usage))
+        expected = ((prompt_tokens, message_tokens) if cached
+                    else (0, message_tokens + prompt_tokens))
+        got = (usage.cached_input, usage.uncached_input)
+        counters = (cache.creates, cache.refreshes, cache.failures)
+        status = "ok"
+        if got != expected or counters != (creates, refreshes, cache_failures):
+            status = "FAIL"
+            failures.append(label)
+        print(f"{status:<4} t={at:>6.0f}s  {label:<38} cached/fresh input {got[0]:>4}/{got[1]:<4}"
+              f" creates={counters[0]} refreshes={counters[1]} failures={counters[2]}")
+
+    turn("first turn creates the cache", 0, True, 1, 0, 0)
+    turn("fresh cache is reused", 1000, True, 1, 0, 0)
+    turn("near expiry: refreshed", TTL - REFRESH_MARGIN + 60, True, 1, 1, 0)
+    expires = 2 * TTL - REFRESH_MARGIN + 60
+    turn("after expiry: re-created", expires + 10, True, 2, 1, 0)
+    # Provider dropped the entry early: the refresh fails and the cache is re-created
+    provider.entries.clear()
+    lost = expires + 10 + TTL - REFRESH_MARGIN + 60
+    turn("entry lost: refresh fails, re-created", lost, True, 3, 1, 0)
+    # Creating fails (e.g. prompt too small): turns send the prompt uncached until retry_after
+    provider.fail_creates = True
+    broken = lost + TTL + 10
+    turn("create fails: prompt sent uncached", broken, False, 3, 1, 1)
+    provider.fail_creates = False
+    turn("within retry_after: still uncached", broken + RETRY_AFTER / 2, False, 3, 1, 1)
+    turn("after retry_after: re-created", broken + RETRY_AFTER + 1, True, 4, 1, 1)
+
+    live = cache.stats()["name"]
+    cache.close()
+    if provider.deleted != 1 or live in provider.entries or cache.stats()["active"]:
+        failures.append("close deletes the cached context")
+        print("FAIL close did not delete the cached context")
+
+    print(f"{provider.created} creates, {provider.refreshed} refreshes, {provider.deleted} deletes, "
+          f"{len(failures)} failures")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
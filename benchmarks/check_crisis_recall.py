@@ -0,0 +1,114 @@
+"""
+Crisis Recall Check
+Runs messages the original substring scan flagged through detect_crisis (and
+the turn risk score) and fails if any of them is no longer detected
+
+The original detector flagged a message when any keyword appeared anywhere
+in it as a substring, so inflections like "overdosed" or "self-harming" were
+caught. The compiled matcher only matches whole words (plus stems), so this
+check guards against losing those hits. Word-boundary differences that are
+intended ("want to diet") are listed separately and must stay undetected.
+
+Run from the repository root (exits non-zero on a regression):
+    python benchmarks/check_crisis_recall.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.crisis_detector import (  # noqa: E402
+    detect_crisis, score_turn_risk, StreamingCrisisDetector
+)
+
+# The keyword list as it was before the compiled matcher
+BASELINE_KEYWORDS = [
+    "kill myself", "end my life", "want to die", "suicide", "suicidal",
+    "self harm", "self-harm", "hurt myself", "cutting myself",
+    "don't want to live", "no reason to live", "better off dead",
+    "ending it all", "can't go on", "give up on life",
+    "take my own life", "not worth living", "overdose",
+    "nobody cares", "everyone hates me", "completely alone",
+    "no hope left", "nothing matters anymore", "can't take it anymore",
+]
+
+MESSAGES = [
+    # Reported regressions
+    "I overdosed last night",
+    "I keep self-harming",
+    "thinking about suicides",
+    "I am self harming",
+    # A stem phrase right after a word that starts another phrase ("i'm a burden", "so alone")
+    "I want suicide",
+    "I might take overdose tonight",
+    "I'm suicidal",
+    "I feel so suicidal",
+    # Inflections and punctuation around keywords
+    "I've taken overdoses before",
+    "took too many pills, it was an overdose.",
+    "I self-harmed again yesterday",
+    "the self harm has gotten worse",
+    "I have suicidal thoughts every night",
+    "Suicide feels like the only option",
+    "my brother died by suicide and now I think about it too",
+    "I want to kill myself",
+    "I just want to end my life!!",
+    "sometimes I want to die",
+    "I keep cutting myself when it gets bad",
+    "I don't want to live like this",
+    "I'd be better off dead",
+    "I'm thinking of ending it all",
+    "I can't go on anymore",
+    "nobody cares about me",
+    "I can't take it anymore.",
+    "I feel completely alone",
+    "I wanna hurt myself",
+    "there's no reason to live",
+]
+
+# Substring hits the original scan made that are deliberately no longer crisis matches
+INTENDED_EXCLUSIONS = [
+    "I want to diet before summer",
+]
+
+
+def baseline_detect(message: str) -> bool:
+    """The original detect_crisis check."""
+    message_lower = message.lower()
+    return any(keyword in message_lower for keyword in BASELINE_KEYWORDS)
+
+
+def streamed_detect(message: str, chunk_size: int = 3) -> bool:
+    """detect_crisis on the same text fed in small chunks."""
+    detector = StreamingCrisisDetector()
+    for i in range(0, len(message), chunk_size):
+        detector.feed(message[i:i + chunk_size])
+    return detector.close()
+
+
+def main() -> int:
+    failures = []
+    for message in MESSAGES:
+        if not baseline_detect(message):
+            failures.append(f"not a baseline positive (fix the check): {message!r}")
+            continue
+        if not detect_crisis(message)[0]:
+            failures.append(f"missed by detect_crisis: {message!r}")
+        if not streamed_detect(message):
+            failures.append(f"missed by StreamingCrisisDetector: {message!r}")
+        if score_turn_risk(message) <= 0:
+            failures.append(f"zero risk score: {message!r}")
+    for message in INTENDED_EXCLUSIONS:
+        if not baseline_detect(message) or detect_crisis(message)[0]:
+            failures.append(f"expected a baseline-only hit: {message!r}")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print(f"{len(MESSAGES)} baseline positives, {len(INTENDED_EXCLUSIONS)} intended exclusions, "
+          f"{len(failures)} failures")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""
+Safety Gate Check
+Crisis messages must never be answered by a shortcut that skips the model's
+safety handling
+
+MindEaseAI answers some turns without the model: the local fast path for
+greetings, thanks, breathing and help requests, the response cache shared
+by every session, and the rule-based fallback (templates and the offline
+response bank) used when the model is unavailable. Every such shortcut must
+refuse a message that detect_crisis or the turn risk score flags. This
+check drives each gate with crisis openers, including ones only caught by a
+stem phrase ("suicid*", "overdos*"), and with ordinary messages that should
+still take the shortcut.
+
+Runs offline with an in-memory backend. Run from the repository root (exits
+non-zero on a failure):
+    python benchmarks/check_safety_gates.py
+"""
+
+import os
+import sys
+from typing import AsyncIterator, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.chatbot import MindEaseAI, TierPolicy  # noqa: E402
+from utils.crisis_detector import detect_crisis  # noqa: E402
+from utils.llm_backends import LLMBackend, TokenUsage  # noqa: E402
+from utils.response_cache import ResponseCache  # noqa: E402
+
+# Crisis openers that also look like greetings, thanks or help requests
+CRISIS_OPENERS = [
+    "hi I'm suicidal",
+    "hello, I want suicide",
+    "thanks, I'm feeling suicidal",
+    "help me, I'm suicidal",
+    "help, I might take overdose tonight",
+    "breathing exercise please, I feel so suicidal",
+]
+
+# Ordinary openers the shortcuts should still answer
+SAFE_OPENERS = [
+    "hi",
+    "thank you",
+]
+
+# Short enough to be cached, caught only by a stem or the risk phrases
+CRISIS_CACHE_MESSAGES = CRISIS_OPENERS + [
+    "I'm suicidal",
+    "I feel so suicidal",
+    "I want suicide",
+]
+
+# Raise the risk score without being crisis matches: the fallback offers help instead
+RISK_MESSAGES = [
+    "I feel so hopeless",
+]
+
+# Short openers that may share a cached reply
+CACHEABLE_MESSAGES = [
+    "I'm so stressed",
+    "work has been rough",
+]
+
+
+class OfflineBackend(LLMBackend):
+    """Backend that is never expected to be called."""
+
+    name = "offline"
+
+    async def generate(self, contents: List[Dict], usage: Optional[TokenUsage] = None) -> str:
+        return "model reply"
+
+    async def stream(self, contents: List[Dict],
+                     usage: Optional[TokenUsage] = None) -> AsyncIterator[str]:
+        yield "model reply"
+
+
+def check_local_tier(failures: List[str]):
+    """The local fast path declines crisis messages, even with a permissive policy."""
+    # Confidence 0 lets every routed intent through, so only the safety gate decides
+    bot = MindEaseAI(backend=OfflineBackend(), tier_policy=TierPolicy(min_confidence=0.0))
+    for message in CRISIS_OPENERS:
+        if bot._local_tier_response(message, None, None) is not None:
+            failures.append(f"local tier answered a crisis message: {message!r}")
+    for message in SAFE_OPENERS:
+        if bot._local_tier_response(message, None, None) is None:
+            failures.append(f"local tier declined a safe message: {message!r}")
+
+
+def check_response_cache(failures: List[str]):
+    """Crisis messages get no cache scope, so they are never stored or served from the cache."""
+    bot = MindEaseAI(backend=OfflineBackend(), response_cache=ResponseCache())
+    for message in CRISIS_CACHE_MESSAGES:
+        if bot._cache_scope(message, None, None) is not None:
+            failures.append(f"crisis message is cacheable: {message!r}")
+    for message in CACHEABLE_MESSAGES:
+        if bot._cache_scope(message, None, None) is None:
+            failures.append(f"ordinary opener is not cacheable: {message!r}")
+
+
+def check_fallback(failures: List[str]):
+    """With no model, crisis messages get the crisis reply and risky ones the help reply."""
+    bot = MindEaseAI(backend=OfflineBackend())
+    bot.using_ai = False
+    for message in CRISIS_CACHE_MESSAGES + ["I want to kill myself"]:
+        if bot._fallback_response(message) != detect_crisis(message)[1]:
+            failures.append(f"fallback did not give the crisis reply: {message!r}")
+    help_reply = bot._get_help_response()
+    for message in RISK_MESSAGES:
+        if bot._fallback_response(message) != help_reply:
+            failures.append(f"fallback did not give the help reply: {message!r}")
+
+
+def main() -> int:
+    failures: List[str] = []
+    check_local_tier(failures)
+    check_response_cache(failures)
+    check_fallback(failures)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print(f"{len(CRISIS_OPENERS)} local-tier, {len(CRISIS_CACHE_MESSAGES)} cache and "
+          f"{len(CRISIS_CACHE_MESSAGES) + 1 + len(RISK_MESSAGES)} fallback messages, "
+          f"{len(failures)} failures")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
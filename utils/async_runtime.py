@@ -0,0 +1,166 @@
+"""
+Async Runtime Module
+One long-lived asyncio event loop per process, running on a daemon thread
+
+Streamlit runs each session's script on its own thread. Instead of every
+thread spinning up its own event loop (asyncio.run) for network calls, all
+async work is submitted to this shared loop, so hundreds of in-flight calls
+cost coroutines rather than threads and process-wide limits can be enforced
+with ordinary asyncio primitives.
+"""
+
+import asyncio
+import atexit
+import concurrent.futures
+import threading
+from typing import AsyncIterator, Awaitable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class BackgroundLoop:
+    """An asyncio event loop running forever on a background thread."""
+
+    def __init__(self, name: str = "mindease-async"):
+        """
+        Create the runtime (the thread starts on first use).
+
+        Args:
+            name: Thread name, shown in debuggers and thread dumps
+        """
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The running event loop, started on first access."""
+        if self._loop is None:
+            self.start()
+        return self._loop
+
+    def start(self):
+        """Start the loop thread if it is not already running."""
+        with self._lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            self._thread = threading.Thread(target=run, name=self.name, daemon=True)
+            self._thread.start()
+            ready.wait()
+            self._loop = loop
+
+    def in_loop_thread(self) -> bool:
+        """True when called from the loop's own thread."""
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def is_current_loop(self) -> bool:
+        """True when called from a coroutine already running on this loop."""
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def submit(self, coro: Awaitable[T]) -> "concurrent.futures.Future[T]":
+        """
+        Schedule a coroutine on the loop from any thread.
+
+        Returns:
+            A concurrent.futures.Future for its result
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+        """
+        Run a coroutine on the loop and block the calling thread for its result.
+
+        Args:
+            coro: Coroutine to run
+            timeout: Seconds to wait before cancelling it
+
+        Returns:
+            The coroutine's result (its exception is re-raised)
+        """
+        if self.in_loop_thread():
+            coro.close()
+            raise RuntimeError("BackgroundLoop.run() called from the loop thread; await instead")
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    async def run_here(self, coro: Awaitable[T]) -> T:
+        """Await a coroutine on this loop from any other event loop."""
+        if self.is_current_loop():
+            return await coro
+        return await asyncio.wrap_future(self.submit(coro))
+
+    def iterate(self, agen: AsyncIterator[T]) -> Iterator[T]:
+        """
+        Consume an async iterator from synchronous code.
+
+        Each item is produced on the loop; closing the returned generator
+        early also closes the async iterator on the loop.
+        """
+        finished = False
+        try:
+            while True:
+                try:
+                    item = self.run(agen.__anext__())
+                except StopAsyncIteration:
+                    finished = True
+                    return
+                yield item
+        finally:
+            if not finished and hasattr(agen, "aclose"):
+                try:
+                    self.run(agen.aclose(), timeout=5)
+                except Exception:
+                    pass
+
+    def shutdown(self, timeout: float = 5.0):
+        """Cancel outstanding tasks, stop the loop and join its thread."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop, self._thread = None, None
+        if loop is None:
+            return
+
+        async def cancel_all():
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        try:
+            asyncio.run_coroutine_threadsafe(cancel_all(), loop).result(timeout)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        if not thread.is_alive():
+            loop.close()
+
+
+_SHARED_RUNTIME: Optional[BackgroundLoop] = None
+_SHARED_LOCK = threading.Lock()
+
+
+def get_runtime() -> BackgroundLoop:
+    """The process-wide background loop, created on first use."""
+    global _SHARED_RUNTIME
+    with _SHARED_LOCK:
+        if _SHARED_RUNTIME is None:
+            _SHARED_RUNTIME = BackgroundLoop()
+            atexit.register(_SHARED_RUNTIME.shutdown)
+        return _SHARED_RUNTIME
@@ -0,0 +1,309 @@
+"""
+Audio Assets Module
+Pre-rendered speech for the app's static texts (coping exercises, journaling prompts)
+Built ahead of time so the most-played audio never waits on synthesis
+
+A bundle is a directory holding manifest.json and content-addressed MP3
+files. Entries are keyed exactly like the runtime audio cache (hash of the
+cleaned text, voice, engine and format), so VoiceHandler can serve them
+directly. Texts are rendered in full, never cut at the runtime speech
+limit. Rebuilding only renders texts whose key is new, i.e. whose text
+changed or that are missing; the manifest version goes up whenever the
+set of entries changes.
+
+Usage:
+    python -m utils.audio_assets build                  # every static text in every voice
+    python -m utils.audio_assets build --voices female_warm male_calm --workers 8
+    python -m utils.audio_assets status
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import threading
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+from utils.audio_cache import audio_key
+
+# Rendering goes through utils.voice_handler; only check that edge-tts is installed
+EDGE_TTS_AVAILABLE = importlib.util.find_spec("edge_tts") is not None
+
+DEFAULT_ASSETS_DIR = os.getenv(
+    "MINDEASE_TTS_ASSETS",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "tts")
+)
+
+# Bumped when the manifest layout changes
+MANIFEST_FORMAT = 1
+
+ENGINE = "edge"
+
+
+def static_texts() -> Dict[str, str]:
+    """
+    Every fixed text the app can speak, by a stable name.
+
+    Covers the coping toolkit exercises (alone and in the combinations
+    get_mood_based_exercise() returns) and every journaling prompt.
+    """
+    from utils import coping_toolkit, journaling
+
+    texts: Dict[str, str] = {}
+    for name, value in vars(coping_toolkit).items():
+        if name.isupper() and isinstance(value, str):
+            texts[f"coping_toolkit.{name}"] = value
+    for mood in ("Stressed", "Anxious", "Sad", "Angry", "Tired"):
+        for level, intensity in (("low", 2), ("medium", 5), ("high", 8)):
+            text = coping_toolkit.get_mood_based_exercise(mood, intensity)
+            if text not in texts.values():
+                texts[f"coping_toolkit.mood.{mood}.{level}"] = text
+    for name, value in vars(journaling).items():
+        if name.endswith("_PROMPTS") and isinstance(value, list):
+            for i, prompt in enumerate(value):
+                texts[f"journaling.{name}[{i}]"] = prompt
+    return texts
+
+
+def _write_atomic(path: str, data: bytes):
+    """Write a file under a temporary name and rename it into place."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def _read_manifest(directory: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(directory, "manifest.json"), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("format") != MANIFEST_FORMAT:
+        return None
+    return manifest
+
+
+class AssetBundle:
+    """A built bundle of pre-rendered audio, looked up by audio cache key."""
+
+    def __init__(self, directory: str, manifest: dict):
+        """
+        Args:
+            directory: Bundle directory
+            manifest: Its parsed manifest.json
+        """
+        self.directory = directory
+        self.version = manifest.get("version", 0)
+        self.entries: Dict[str, dict] = manifest.get("entries", {})
+        self.hits = 0
+
+    @classmethod
+    def load(cls, directory: str = DEFAULT_ASSETS_DIR) -> Optional["AssetBundle"]:
+        """The bundle in a directory, or None if it has not been built."""
+        manifest = _read_manifest(directory)
+        return cls(directory, manifest) if manifest is not None else None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Pre-rendered audio for an audio cache key, or None."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        try:
+            with open(os.path.join(self.directory, entry["file"]), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        self.hits += 1
+        return data
+
+    def stats(self) -> dict:
+        """Bundle version, size and hits."""
+        return {
+            "version": self.version,
+            "entries": len(self.entries),
+            "bytes": sum(entry.get("bytes", 0) for entry in self.entries.values()),
+            "hits": self.hits,
+        }
+
+
+async def _render_edge(text: str, voice: str) -> bytes:
+    """Synthesize one text with Edge TTS, collecting the MP3 in memory."""
+    from utils.voice_handler import edge_audio_chunks
+    return b"".join([chunk async for chunk in edge_audio_chunks(text, voice)])
+
+
+def build_bundle(directory: str = DEFAULT_ASSETS_DIR, texts: Optional[Dict[str, str]] = None,
+                 voices: Optional[Sequence[str]] = None, workers: int = 4,
+                 render: Optional[Callable[[str, str], Awaitable[bytes]]] = None) -> dict:
+    """
+    Render new or changed texts into a bundle and rewrite its manifest.
+
+    Args:
+        directory: Bundle directory (created if needed)
+        texts: Name -> text (defaults to static_texts())
+        voices: Edge TTS voice names (defaults to every VOICE_OPTIONS voice)
+        workers: Syntheses in flight at once
+        render: Coroutine function (text, voice) -> MP3 bytes (defaults to Edge TTS)
+
+    Returns:
+        Counts of rendered, reused, failed and removed entries, and the version
+    """
+    from utils.voice_handler import VOICE_OPTIONS, VoiceHandler
+
+    texts = static_texts() if texts is None else texts
+    voices = list(VOICE_OPTIONS.values()) if voices is None else list(voices)
+    if render is None:
+        if not EDGE_TTS_AVAILABLE:
+            raise ImportError("edge-tts is required to build audio assets")
+        render = _render_edge
+
+    previous = _read_manifest(directory) or {"version": 0, "entries": {}}
+    entries: Dict[str, dict] = {}
+    jobs = []
+    seen = set()
+    for name, text in texts.items():
+        clean_text = VoiceHandler._clean_text_for_speech(text, max_chars=None)
+        for voice in voices:
+            key = audio_key(clean_text, voice, ENGINE)
+            if key in seen:
+                continue
+            seen.add(key)
+            old = previous["entries"].get(key)
+            if old is not None and os.path.exists(os.path.join(directory, old["file"])):
+                entries[key] = dict(old, name=name)
+            else:
+                jobs.append((key, name, voice, clean_text))
+
+    async def run_jobs():
+        limit = asyncio.Semaphore(workers)
+        failures = []
+
+        async def job(key: str, name: str, voice: str, clean_text: str):
+            async with limit:
+                try:
+                    audio = await render(clean_text, voice)
+                    if not audio:
+                        raise ValueError("no audio returned")
+                except Exception as e:
+                    failures.append((name, voice, e))
+                    return
+            relative = os.path.join("files", key[:2], f"{key}.mp3")
+            await asyncio.to_thread(_write_atomic, os.path.join(directory, relative), audio)
+            entries[key] = {"name": name, "voice": voice, "engine": ENGINE,
+                            "file": relative, "bytes": len(audio)}
+            print(f"  rendered {name} [{voice}]")
+
+        await asyncio.gather(*(job(*spec) for spec in jobs))
+        return failures
+
+    failures = asyncio.run(run_jobs()) if jobs else []
+    for name, voice, error in failures:
+        print(f"⚠️ Could not render {name} [{voice}]: {error}")
+
+    changed = set(entries) != set(previous["entries"])
+    manifest = {
+        "format": MANIFEST_FORMAT,
+        "version": previous["version"] + 1 if changed else previous["version"],
+        "built_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "engine": ENGINE,
+        "voices": voices,
+        "entries": dict(sorted(entries.items(), key=lambda item: (item[1]["name"], item[1]["voice"]))),
+    }
+    _write_atomic(os.path.join(directory, "manifest.json"),
+                  json.dumps(manifest, indent=1, ensure_ascii=False).encode("utf-8"))
+
+    # Drop audio no longer referenced (texts that changed or were removed)
+    removed = 0
+    referenced = {entry["file"] for entry in entries.values()}
+    for key, entry in previous["entries"].items():
+        if key not in entries and entry["file"] not in referenced:
+            try:
+                os.unlink(os.path.join(directory, entry["file"]))
+                removed += 1
+            except OSError:
+                pass
+
+    return {
+        "version": manifest["version"],
+        "rendered": len(jobs) - len(failures),
+        "reused": len(entries) - (len(jobs) - len(failures)),
+        "failed": len(failures),
+        "removed": removed,
+    }
+
+
+_SHARED_BUNDLE: Optional[AssetBundle] = None
+_SHARED_LOADED = False
+_SHARED_LOCK = threading.Lock()
+
+
+def get_audio_assets() -> Optional[AssetBundle]:
+    """The bundle in MINDEASE_TTS_ASSETS (default assets/tts), or None if not built."""
+    global _SHARED_BUNDLE, _SHARED_LOADED
+    with _SHARED_LOCK:
+        if not _SHARED_LOADED:
+            _SHARED_LOADED = True
+            _SHARED_BUNDLE = AssetBundle.load(DEFAULT_ASSETS_DIR)
+        return _SHARED_BUNDLE
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point."""
+    from utils.voice_handler import VOICE_OPTIONS
+
+    parser = argparse.ArgumentParser(prog="python -m utils.audio_assets",
+                                     description="Pre-render speech for the app's static texts.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_cmd = commands.add_parser("build", help="Render new or changed texts")
+    build_cmd.add_argument("--out", default=DEFAULT_ASSETS_DIR)
+    build_cmd.add_argument("--voices", nargs="+", choices=sorted(VOICE_OPTIONS),
+                           help="Voice keys (default: all)")
+    build_cmd.add_argument("--workers", type=int, default=4, help="Concurrent syntheses")
+
+    status_cmd = commands.add_parser("status", help="Show bundle version and coverage")
+    status_cmd.add_argument("--dir", default=DEFAULT_ASSETS_DIR)
+
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        if not EDGE_TTS_AVAILABLE:
+            print("edge-tts is required: pip install edge-tts", file=sys.stderr)
+            return 1
+        voices = [VOICE_OPTIONS[key] for key in args.voices] if args.voices else None
+        summary = build_bundle(args.out, voices=voices, workers=args.workers)
+        print(f"Bundle v{summary['version']}: {summary['rendered']} rendered, "
+              f"{summary['reused']} reused, {summary['removed']} removed, "
+              f"{summary['failed']} failed -> {args.out}")
+        return 1 if summary["failed"] else 0
+
+    bundle = AssetBundle.load(args.dir)
+    if bundle is None:
+        print(f"No bundle in {args.dir} (run: python -m utils.audio_assets build)")
+        return 1
+    from utils.voice_handler import VoiceHandler
+    wanted = {audio_key(VoiceHandler._clean_text_for_speech(text, max_chars=None), voice, ENGINE)
+              for text in static_texts().values() for voice in VOICE_OPTIONS.values()}
+    stats = bundle.stats()
+    print(f"Bundle v{stats['version']}: {stats['entries']} entries, {stats['bytes'] / 2 ** 20:.1f} MB; "
+          f"{len(wanted & set(bundle.entries))}/{len(wanted)} static texts x voices covered")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
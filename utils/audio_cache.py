@@ -0,0 +1,219 @@
+"""
+Audio Cache Module
+Content-addressed cache of synthesized speech, in memory and on disk
+Replaying the same text in the same voice never calls a TTS service twice
+
+Entries are keyed by a SHA-256 of (cleaned text, voice, engine, format).
+Recently used audio is kept in a bounded in-memory LRU; everything is also
+written to a shared directory, so several worker processes (and restarts)
+reuse each other's audio. Files are written to a temporary name and
+renamed into place, so readers never see a partial file, and the directory
+is trimmed least-recently-used once it grows past its size limit.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+
+def audio_key(text: str, voice: str, engine: str, fmt: str = "mp3") -> str:
+    """
+    Cache key for a piece of synthesized speech.
+
+    Args:
+        text: Text as sent to the engine (after cleaning)
+        voice: Voice name
+        engine: TTS engine ("edge", "gtts", ...)
+        fmt: Audio format / file extension
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    payload = "\x1f".join((engine, voice, fmt, text))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """Two-level (memory + disk) LRU cache of audio bytes."""
+
+    def __init__(self, directory: Optional[str], max_disk_bytes: int = 200 * 2 ** 20,
+                 max_memory_bytes: int = 32 * 2 ** 20, fmt: str = "mp3"):
+        """
+        Args:
+            directory: Shared cache directory (None for memory only)
+            max_disk_bytes: Trim the directory back under this size
+            max_memory_bytes: Bytes of audio kept in memory
+            fmt: File extension of cached entries
+        """
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_bytes = max_memory_bytes
+        self.fmt = fmt
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes: Optional[int] = None   # estimate; recounted when trimming
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.{self.fmt}")
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Cached audio for a key, or None."""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return data
+        if self.directory:
+            path = self._path(key)
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                # The modification time doubles as the shared LRU clock
+                os.utime(path)
+            except OSError:
+                data = None
+            if data:
+                with self._lock:
+                    self.disk_hits += 1
+                    self._remember(key, data)
+                return data
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, data: bytes):
+        """Store audio under a key (in memory and, atomically, on disk)."""
+        if not data:
+            return
+        with self._lock:
+            self._remember(key, data)
+        if not self.directory:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except OSError as e:
+            print(f"⚠️ Could not write audio cache entry: {e}")
+            return
+        with self._lock:
+            self.writes += 1
+            if self._disk_bytes is not None:
+                self._disk_bytes += len(data)
+            over = self._disk_bytes is None or self._disk_bytes > self.max_disk_bytes
+        if over:
+            self._trim_disk()
+
+    def _remember(self, key: str, data: bytes):
+        """Insert into the memory LRU (lock held)."""
+        if len(data) > self.max_memory_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _trim_disk(self):
+        """Recount the directory and delete least-recently-used files down to 90% of the limit."""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(f".{self.fmt}"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        if total > self.max_disk_bytes:
+            target = int(self.max_disk_bytes * 0.9)
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                try:
+                    os.unlink(path)
+                except OSError:
+                    continue
+                total -= size
+                evicted += 1
+        with self._lock:
+            self._disk_bytes = total
+            self.evictions += evicted
+
+    def clear(self):
+        """Drop the in-memory entries (files on disk are kept)."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+
+    def stats(self) -> dict:
+        """Hit/miss counters and sizes."""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_bytes": self._disk_bytes,
+                "directory": self.directory,
+            }
+
+
+_SHARED_CACHE: Optional[AudioCache] = None
+_SHARED_LOCK = threading.Lock()
+
+
+def get_audio_cache() -> Optional[AudioCache]:
+    """
+    The process-wide audio cache, configured from the environment.
+
+    Returns None when MINDEASE_TTS_CACHE is set to 0.
+    """
+    global _SHARED_CACHE
+    if os.getenv("MINDEASE_TTS_CACHE", "1").lower() in ("0", "false", "no"):
+        return None
+    with _SHARED_LOCK:
+        if _SHARED_CACHE is None:
+            directory = os.getenv("MINDEASE_TTS_CACHE_DIR",
+                                  os.path.join(tempfile.gettempdir(), "mindease-tts-cache"))
+            try:
+                _SHARED_CACHE = AudioCache(
+                    directory or None,
+                    max_disk_bytes=int(float(os.getenv("MINDEASE_TTS_CACHE_MB", "200")) * 2 ** 20),
+                    max_memory_bytes=int(float(os.getenv("MINDEASE_TTS_MEMORY_MB", "32")) * 2 ** 20),
+                )
+            except OSError as e:
+                print(f"⚠️ Audio cache directory unavailable ({e}). Caching in memory only.")
+                _SHARED_CACHE = AudioCache(None)
+        return _SHARED_CACHE
@@ -4,14 +4,105 @@ Contains the AI brain for generating mental wellness responses
 Supports multiple AI backends with rule-based fallback
 """
 
+import asyncio
+import atexit
+import hashlib
+import json
 import os
 import random
-from typing import Optional
+import threading
+import time
+import uuid
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, Optional, Tuple
 from dotenv import load_dotenv
 
+from utils.async_runtime import get_runtime
+from utils.context_cache import GeminiContextCacheProvider, SystemPromptCache
+from utils.history import ConversationHistory
+from utils.crisis_detector import detect_crisis, is_severe_distress, score_turn_risk
+from utils.intent_router import route_intent
+from utils.llm_backends import (
+    USAGE_METER, GeminiBackend, HedgedBackend, LLMBackend, OpenAIBackend,
+    OpenAICompatibleBackend, TokenUsage, first_chunk
+)
+from utils.rate_limit import RateLimitExceeded, get_rate_limiter
+from utils.resilience import (
+    CircuitBreaker, CircuitOpenError, RetryBudget, call_with_retries, get_circuit_breaker,
+    get_retry_budget
+)
+from utils.response_bank import get_response_bank
+from utils.response_cache import ResponseCache, cache_scope, get_response_cache
+from utils.single_flight import SingleFlight
+from utils.telemetry import PrometheusSink, RingBufferSink, TurnRecord, get_telemetry
+
 # Load environment variables
 load_dotenv()
 
+# Process-wide cap on in-flight model calls, and per-call timeout (seconds)
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MINDEASE_MAX_CONCURRENT_REQUESTS", "64"))
+REQUEST_TIMEOUT = float(os.getenv("MINDEASE_REQUEST_TIMEOUT", "30"))
+
+# Which provider answers (gemini, openai, compat), and an optional second
+# provider raced against it for slow requests (see utils.llm_backends)
+LLM_BACKEND = os.getenv("MINDEASE_LLM_BACKEND", "gemini").lower()
+HEDGE_BACKEND = os.getenv("MINDEASE_HEDGE_BACKEND", "").lower()
+
+# Global and per-session request quotas (see utils.rate_limit)
+RATE_LIMIT_ENABLED = os.getenv("MINDEASE_RATE_LIMIT", "1").lower() not in ("0", "false", "no")
+
+# Provider-side caching of SYSTEM_PROMPT (Gemini; see utils.context_cache).
+# Off by default: providers only cache prompts above a minimum size.
+CONTEXT_CACHE_ENABLED = os.getenv("MINDEASE_CONTEXT_CACHE", "0").lower() in ("1", "true", "yes")
+CONTEXT_CACHE_TTL = float(os.getenv("MINDEASE_CONTEXT_CACHE_TTL", "3600"))
+
+# Per-attempt timeout and retries within REQUEST_TIMEOUT (see utils.resilience)
+ATTEMPT_TIMEOUT = float(os.getenv("MINDEASE_ATTEMPT_TIMEOUT", "12"))
+MAX_RETRIES = int(os.getenv("MINDEASE_MAX_RETRIES", "2"))
+
+# Created lazily on the shared loop; every model call goes through it
+_request_limiter: Optional[asyncio.Semaphore] = None
+
+
+def _get_request_limiter() -> asyncio.Semaphore:
+    """Process-wide semaphore bounding concurrent model calls (shared loop only)."""
+    global _request_limiter
+    if _request_limiter is None:
+        _request_limiter = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    return _request_limiter
+
+
+# Per-turn records for the ring buffer / JSONL / Prometheus sinks
+TELEMETRY = get_telemetry()
+
+# Identical in-flight model requests from any session share one call (shared loop only)
+MODEL_FLIGHTS = SingleFlight()
+
+
+def get_rate_limit_stats() -> dict:
+    """Rate-limit queue depth, admissions and wait times."""
+    return get_runtime().run(_rate_limit_stats())
+
+
+async def _rate_limit_stats() -> dict:
+    return get_rate_limiter().stats()
+
+
+def get_coalescing_stats() -> dict:
+    """How many model calls were coalesced into an identical in-flight call."""
+    return MODEL_FLIGHTS.stats()
+
+
+def get_recent_turns(n: int = 20) -> list:
+    """The last n per-turn telemetry records, oldest first."""
+    ring = TELEMETRY.sink(RingBufferSink)
+    return ring.recent(n) if ring is not None else []
+
+
+def get_metrics_text() -> str:
+    """Turn, token and latency metrics in the Prometheus text format."""
+    metrics = TELEMETRY.sink(PrometheusSink)
+    return metrics.render() if metrics is not None else ""
+
 # Try to import AI libraries
 try:
     import google.generativeai as genai
@@ -64,52 +155,323 @@ NEVER: diagnose, prescribe, minimize pain, give vague advice
 ONE good specific suggestion beats ten vague platitudes."""
 
 
+# Process-wide model clients, shared by every session: (api_key, model_name) -> model
+_SHARED_MODELS: Dict[Tuple[str, str], "genai.GenerativeModel"] = {}
+_SHARED_MODELS_LOCK = threading.Lock()
+_configured_api_key: Optional[str] = None
+
+
+def get_shared_model(api_key: str, model_name: str) -> "genai.GenerativeModel":
+    """
+    Returns the process-wide GenerativeModel for a key and model name.
+    
+    genai.configure and the model (with its system prompt) are set up once
+    per process; sessions only hold their own chat history.
+    
+    Args:
+        api_key: Google API key
+        model_name: Gemini model name
+        
+    Returns:
+        Shared GenerativeModel instance
+    """
+    global _configured_api_key
+    key = (api_key, model_name)
+    model = _SHARED_MODELS.get(key)
+    if model is not None:
+        return model
+    with _SHARED_MODELS_LOCK:
+        model = _SHARED_MODELS.get(key)
+        if model is None:
+            if _configured_api_key != api_key:
+                genai.configure(api_key=api_key)
+                _configured_api_key = api_key
+            model = genai.GenerativeModel(
+                model_name=model_name,
+                system_instruction=SYSTEM_PROMPT
+            )
+            _SHARED_MODELS[key] = model
+            print("✅ Gemini AI initialized successfully")
+    return model
+
+
+# Process-wide backends, shared by every session: key -> backend
+_SHARED_BACKENDS: Dict[Tuple, LLMBackend] = {}
+_SHARED_BACKENDS_LOCK = threading.Lock()
+
+
+def _create_backend(kind: str, api_key: Optional[str], model_name: str) -> Optional[LLMBackend]:
+    """Build one provider from its name and the environment; None if unusable."""
+    if kind == "gemini":
+        if not GEMINI_AVAILABLE:
+            print("⚠️ Gemini not available. Using rule-based responses.")
+            return None
+        if not api_key:
+            print("⚠️ No API key provided. Using rule-based responses.")
+            return None
+        model = get_shared_model(api_key, model_name)
+        system_cache = None
+        if CONTEXT_CACHE_ENABLED:
+            system_cache = SystemPromptCache(GeminiContextCacheProvider(), model_name,
+                                             SYSTEM_PROMPT, ttl=CONTEXT_CACHE_TTL)
+            atexit.register(system_cache.close)
+        return GeminiBackend(model, model_name, system_cache=system_cache,
+                             system_prompt=SYSTEM_PROMPT)
+    if kind == "openai":
+        openai_key = os.getenv("OPENAI_API_KEY")
+        if not openai_key:
+            print("⚠️ OPENAI_API_KEY not set. Skipping OpenAI backend.")
+            return None
+        return OpenAIBackend(openai_key, os.getenv("MINDEASE_OPENAI_MODEL", "gpt-4o-mini"),
+                             system_prompt=SYSTEM_PROMPT)
+    if kind == "compat":
+        base_url = os.getenv("MINDEASE_COMPAT_BASE_URL")
+        if not base_url:
+            print("⚠️ MINDEASE_COMPAT_BASE_URL not set. Skipping OpenAI-compatible backend.")
+            return None
+        return OpenAICompatibleBackend(base_url, os.getenv("MINDEASE_COMPAT_MODEL", "llama3.2"),
+                                       api_key=os.getenv("MINDEASE_COMPAT_API_KEY"),
+                                       system_prompt=SYSTEM_PROMPT)
+    print(f"⚠️ Unknown backend '{kind}'.")
+    return None
+
+
+def get_shared_backend(kind: str, api_key: Optional[str], model_name: str,
+                       hedge: str = "") -> Optional[LLMBackend]:
+    """
+    Returns the process-wide backend for a provider (optionally hedged).
+    
+    Backends hold connection pools and, when hedged, the latency history
+    that sets the hedge delay, so they are created once per process.
+    
+    Args:
+        kind: Primary provider: "gemini", "openai" or "compat"
+        api_key: Google API key (for "gemini")
+        model_name: Gemini model name (for "gemini")
+        hedge: Secondary provider to race against slow requests ("" = none)
+        
+    Returns:
+        Shared backend, or None if the primary provider is not usable
+    """
+    key = (kind, api_key, model_name, hedge)
+    backend = _SHARED_BACKENDS.get(key)
+    if backend is not None:
+        return backend
+    with _SHARED_BACKENDS_LOCK:
+        backend = _SHARED_BACKENDS.get(key)
+        if backend is None:
+            backend = _create_backend(kind, api_key, model_name)
+            if backend is not None and hedge and hedge != kind:
+                secondary = _create_backend(hedge, api_key, model_name)
+                if secondary is not None:
+                    backend = HedgedBackend(
+                        backend, secondary,
+                        quantile=float(os.getenv("MINDEASE_HEDGE_QUANTILE", "0.95"))
+                    )
+            if backend is not None:
+                _SHARED_BACKENDS[key] = backend
+    return backend
+
+
+class TierPolicy:
+    """Which messages the local fast path may answer without calling the model."""
+    
+    def __init__(self, enabled: Optional[bool] = None, intents: Optional[Iterable[str]] = None,
+                 min_confidence: Optional[float] = None, max_chars: int = 80):
+        """
+        Initialize the policy (unset values come from the environment).
+        
+        Args:
+            enabled: Turn the local tier on/off (MINDEASE_LOCAL_TIER, default on)
+            intents: Intents safe to answer locally (MINDEASE_LOCAL_INTENTS,
+                default greeting, gratitude, breathing, help)
+            min_confidence: Router confidence required (MINDEASE_LOCAL_MIN_CONFIDENCE,
+                default 0.7)
+            max_chars: Longer messages always go to the model
+        """
+        if enabled is None:
+            enabled = os.getenv("MINDEASE_LOCAL_TIER", "1").lower() not in ("0", "false", "no")
+        if intents is None:
+            intents = os.getenv("MINDEASE_LOCAL_INTENTS", "greeting,gratitude,breathing,help").split(",")
+        if min_confidence is None:
+            min_confidence = float(os.getenv("MINDEASE_LOCAL_MIN_CONFIDENCE", "0.7"))
+        self.enabled = enabled
+        self.intents = frozenset(intent.strip() for intent in intents if intent.strip())
+        self.min_confidence = min_confidence
+        self.max_chars = max_chars
+
+
+_DEFAULT_TIER_POLICY: Optional[TierPolicy] = None
+
+
+def get_default_tier_policy() -> TierPolicy:
+    """The process-wide TierPolicy from the environment, shared by all sessions."""
+    global _DEFAULT_TIER_POLICY
+    if _DEFAULT_TIER_POLICY is None:
+        _DEFAULT_TIER_POLICY = TierPolicy()
+    return _DEFAULT_TIER_POLICY
+
+
+class TierStats:
+    """Thread-safe, process-wide counters of which tier answered each turn."""
+    
+    TIERS = ("local", "cache", "model", "fallback")
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {tier: 0 for tier in self.TIERS}
+        self._seconds = {tier: 0.0 for tier in self.TIERS}
+    
+    def record(self, tier: str, seconds: float):
+        """Count one turn answered by a tier and how long it took."""
+        with self._lock:
+            self._counts[tier] += 1
+            self._seconds[tier] += seconds
+    
+    def snapshot(self) -> dict:
+        """Per-tier hit count, share of turns and average latency (ms)."""
+        with self._lock:
+            total = sum(self._counts.values())
+            return {
+                tier: {
+                    "count": count,
+                    "share": round(count / total, 3) if total else 0.0,
+                    "avg_ms": round(self._seconds[tier] / count * 1000, 3) if count else 0.0,
+                }
+                for tier, count in self._counts.items()
+            }
+    
+    def reset(self):
+        """Zero all counters."""
+        with self._lock:
+            for tier in self.TIERS:
+                self._counts[tier] = 0
+                self._seconds[tier] = 0.0
+
+
+TIER_STATS = TierStats()
+
+
+def get_tier_stats() -> dict:
+    """How often each tier (local fast path, response cache, model, fallback) answered."""
+    return TIER_STATS.snapshot()
+
+
+# Placeholder for per-session state whose default may legitimately be None
+_UNRESOLVED = object()
+
+
 class MindEaseAI:
     """AI chatbot for mental wellness support."""
     
-    def __init__(self, api_key: Optional[str] = None, model_name: str = "gemini-2.0-flash"):
+    def __init__(self, api_key: Optional[str] = None, model_name: str = "gemini-2.0-flash",
+                 history: Optional[ConversationHistory] = None,
+                 tier_policy: Optional[TierPolicy] = None,
+                 response_cache: Optional[ResponseCache] = None,
+                 backend: Optional[LLMBackend] = None, session_id: Optional[str] = None):
         """
         Initialize the AI chatbot.
         
         Args:
             api_key: API key for the AI service (or set GOOGLE_API_KEY env var)
             model_name: Name of the model to use
+            history: Conversation history manager (defaults to a token-budgeted
+                history keeping the last 6 turns verbatim)
+            tier_policy: Local fast-path policy (defaults to the process-wide
+                policy from get_default_tier_policy())
+            response_cache: Cache for first-turn replies (defaults to the
+                process-wide cache; disable with MINDEASE_RESPONSE_CACHE=0)
+            backend: Model provider (defaults to the shared backend chosen by
+                MINDEASE_LLM_BACKEND / MINDEASE_HEDGE_BACKEND)
+            session_id: Identity for per-session rate limiting (defaults to a
+                random id, i.e. one per MindEaseAI instance)
+        
+        Per-session state (history, session id, breaker and retry budget
+        handles, last usage) is created on first use, so an idle session
+        holds little more than this object.
         """
         self.api_key = api_key or os.getenv("GOOGLE_API_KEY")
         self.model_name = model_name
         self.model = None
-        self.chat = None
+        self.backend = backend
+        self._session_id = session_id
+        self._last_usage = None
+        self._history = history
+        self.tier_policy = tier_policy if tier_policy is not None else get_default_tier_policy()
+        # Resolved on first use; None afterwards means the cache is disabled
+        self._response_cache = response_cache if response_cache is not None else _UNRESOLVED
+        # Loaded (memory-mapped or built) once per process, before the first fallback
+        self.response_bank = get_response_bank()
         self.using_ai = False
         
+        self._breaker = None
+        self._retry_budget = None
+        
         self._init_ai()
     
+    @property
+    def session_id(self) -> str:
+        """Identity for per-session rate limiting (random unless given)."""
+        if self._session_id is None:
+            self._session_id = uuid.uuid4().hex
+        return self._session_id
+    
+    @property
+    def history(self) -> ConversationHistory:
+        """This session's conversation history."""
+        if self._history is None:
+            self._history = ConversationHistory()
+        return self._history
+    
+    @property
+    def response_cache(self) -> Optional[ResponseCache]:
+        """Cache for first-turn replies (None when disabled)."""
+        if self._response_cache is _UNRESOLVED:
+            self._response_cache = get_response_cache()
+        return self._response_cache
+    
+    @property
+    def last_usage(self) -> TokenUsage:
+        """Token usage of the most recent turn (zero before the first)."""
+        return self._last_usage if self._last_usage is not None else TokenUsage()
+    
+    @property
+    def breaker(self) -> CircuitBreaker:
+        """Process-wide circuit breaker for this session's backend."""
+        if self._breaker is None:
+            self._breaker = get_circuit_breaker(self._backend_key())
+        return self._breaker
+    
+    @property
+    def retry_budget(self) -> RetryBudget:
+        """Process-wide retry budget for this session's backend."""
+        if self._retry_budget is None:
+            self._retry_budget = get_retry_budget(self._backend_key())
+        return self._retry_budget
+    
+    def _backend_key(self) -> str:
+        return self.backend.name if self.backend else f"{LLM_BACKEND}:{self.model_name}"
+    
     def _init_ai(self):
-        """Initialize the AI model."""
-        if GEMINI_AVAILABLE and self.api_key:
+        """Attach to the shared backend (created once per process)."""
+        if self.backend is None:
             try:
-                genai.configure(api_key=self.api_key)
-                self.model = genai.GenerativeModel(
-                    model_name=self.model_name,
-                    system_instruction=SYSTEM_PROMPT
-                )
-                self.chat = self.model.start_chat(history=[])
-                self.using_ai = True
-                print("✅ Gemini AI initialized successfully")
+                self.backend = get_shared_backend(LLM_BACKEND, self.api_key, self.model_name,
+                                                  hedge=HEDGE_BACKEND)
             except Exception as e:
-                print(f"⚠️ Gemini initialization failed: {e}")
-                self.using_ai = False
-        else:
-            if not GEMINI_AVAILABLE:
-                print("⚠️ Gemini not available. Using rule-based responses.")
-            elif not self.api_key:
-                print("⚠️ No API key provided. Using rule-based responses.")
-            self.using_ai = False
+                print(f"⚠️ AI backend initialization failed: {e}")
+                self.backend = None
+        if isinstance(self.backend, GeminiBackend):
+            self.model = self.backend.model
+        self.using_ai = self.backend is not None
     
     def generate_response(self, user_message: str, mood: Optional[str] = None, 
                          intensity: Optional[int] = None) -> str:
         """
         Generate a response to the user's message.
         
+        Thin blocking wrapper around generate_response_async().
+        
         Args:
             user_message: The user's input message
             mood: Current mood type if known
@@ -118,66 +480,389 @@ class MindEaseAI:
         Returns:
             Bot response string
         """
-        # Add context if mood info is available
-        context = ""
-        if mood and intensity:
-            context = f"[User's current mood: {mood}, Intensity: {intensity}/10] "
+        return get_runtime().run(self.generate_response_async(user_message, mood, intensity))
+    
+    async def generate_response_async(self, user_message: str, mood: Optional[str] = None,
+                                      intensity: Optional[int] = None,
+                                      timeout: Optional[float] = None) -> str:
+        """
+        Generate a response without holding a thread for the model round trip.
         
-        full_message = context + user_message
+        The call runs on the process-wide background loop, whatever loop it is
+        awaited from, so the concurrency limit (MINDEASE_MAX_CONCURRENT_REQUESTS)
+        holds across all sessions. Errors and timeouts fall back to the
+        rule-based response.
         
-        if self.using_ai:
-            try:
-                response = self.chat.send_message(full_message)
-                return response.text
-            except Exception as e:
-                print(f"AI response error: {e}")
-                return self._fallback_response(user_message, mood, intensity)
-        else:
-            return self._fallback_response(user_message, mood, intensity)
+        Args:
+            user_message: The user's input message
+            mood: Current mood type if known
+            intensity: Mood intensity (1-10) if known
+            timeout: Seconds before giving up on the model (default REQUEST_TIMEOUT)
+        
+        Returns:
+            Bot response string
+        """
+        return await get_runtime().run_here(
+            self._generate_async(user_message, mood, intensity, timeout)
+        )
     
-    def _fallback_response(self, message: str, mood: Optional[str] = None,
-                          intensity: Optional[int] = None) -> str:
-        """Generate rule-based fallback response."""
-        message_lower = message.lower()
+    async def _generate_async(self, user_message: str, mood: Optional[str],
+                              intensity: Optional[int], timeout: Optional[float]) -> str:
+        """Model call with limiter and timeout; runs on the shared loop."""
+        record = self._new_record("text")
+        if not self.using_ai:
+            text = self._fallback_response(user_message, mood, intensity)
+            self._finish(record, "fallback", "no_backend")
+            return text
         
-        # Check for greetings first
-        if any(word in message_lower for word in ["hello", "hi", "hey", "hii"]) and len(message_lower) < 10:
-            return self._get_greeting_response()
+        full_message = self._build_message(user_message, mood, intensity)
+        local = self._local_tier_response(user_message, mood, intensity)
+        if local is not None:
+            await self.history.add_turn_async(full_message, local)
+            self._finish(record, "local")
+            return local
         
-        # Check for help requests
-        if any(word in message_lower for word in ["help me", "help", "i need help", "what do i do"]):
-            return self._get_help_response(mood, intensity)
+        if self.breaker.state == self.breaker.OPEN:
+            # Backend known to be down: answer locally without waiting on it
+            text = self._fallback_response(user_message, mood, intensity)
+            self._finish(record, "fallback", "circuit_open")
+            return text
+        
+        scope = self._cache_scope(user_message, mood, intensity)
+        if scope is not None:
+            hit = self.response_cache.get(user_message, scope)
+            record.cache = "miss" if hit is None else "hit"
+            if hit is not None:
+                await self.history.add_turn_async(full_message, hit.response)
+                self._finish(record, "cache")
+                return hit.response
+        
+        contents = self._build_contents(full_message)
+        deadline = time.monotonic() + (timeout or REQUEST_TIMEOUT)
+        # Cleared by _call_model, which only runs for the caller that goes upstream
+        record.coalesced = True
+        try:
+            text = await MODEL_FLIGHTS.do(
+                self._flight_key("text", contents),
+                lambda: self._call_model(contents, deadline, record)
+            )
+        except Exception as e:
+            reason = self._fallback_reason(e)
+            if reason.startswith("error:"):
+                print(f"AI response error: {e!r}")
+            text = self._fallback_response(user_message, mood, intensity)
+            self._finish(record, "fallback", reason)
+            return text
+        if scope is not None:
+            self.response_cache.put(user_message, text, scope)
+        await self.history.add_turn_async(full_message, text)
+        self._finish(record, "model")
+        return text
+    
+    def generate_response_stream(self, user_message: str, mood: Optional[str] = None,
+                                 intensity: Optional[int] = None) -> Iterator[str]:
+        """
+        Generate a response, yielding text chunks as the model produces them.
+        
+        Blocking iterator over generate_response_stream_async(). Falls back to
+        the rule-based response if the model fails, even mid-stream. Only
+        completed turns are added to the history, so if the caller stops
+        iterating early (e.g. to cut off unsafe output) nothing is added; the
+        turn's telemetry record is still emitted, with outcome "cut_off".
+        
+        Args:
+            user_message: The user's input message
+            mood: Current mood type if known
+            intensity: Mood intensity (1-10) if known
+        
+        Yields:
+            Response text chunks
+        """
+        return get_runtime().iterate(
+            self.generate_response_stream_async(user_message, mood, intensity)
+        )
+    
+    async def generate_response_stream_async(self, user_message: str, mood: Optional[str] = None,
+                                             intensity: Optional[int] = None,
+                                             timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """
+        Async streaming variant; must be iterated on the shared background loop.
+        
+        Args:
+            user_message: The user's input message
+            mood: Current mood type if known
+            intensity: Mood intensity (1-10) if known
+            timeout: Seconds allowed for the whole stream (default REQUEST_TIMEOUT)
         
-        # Check for thanks
-        if any(word in message_lower for word in ["thank", "thanks", "helpful"]):
-            return self._get_gratitude_response()
+        Yields:
+            Response text chunks
+        """
+        record = self._new_record("stream")
+        if not self.using_ai:
+            self._finish(record, "fallback", "no_backend")
+            yield self._fallback_response(user_message, mood, intensity)
+            return
         
-        # Keyword-based responses (prioritize over mood)
-        if any(word in message_lower for word in ["stress", "stressed", "overwhelming"]):
-            return self._get_stress_response()
+        full_message = self._build_message(user_message, mood, intensity)
+        local = self._local_tier_response(user_message, mood, intensity)
+        if local is not None:
+            await self.history.add_turn_async(full_message, local)
+            self._finish(record, "local")
+            yield local
+            return
         
-        if any(word in message_lower for word in ["anxious", "anxiety", "worried", "worry", "panic"]):
-            return self._get_anxiety_response()
+        if self.breaker.state == self.breaker.OPEN:
+            self._finish(record, "fallback", "circuit_open")
+            yield self._fallback_response(user_message, mood, intensity)
+            return
         
-        if any(word in message_lower for word in ["sad", "depressed", "down", "low", "unhappy", "miserable"]):
-            return self._get_sadness_response()
+        scope = self._cache_scope(user_message, mood, intensity)
+        if scope is not None:
+            hit = self.response_cache.get(user_message, scope)
+            record.cache = "miss" if hit is None else "hit"
+            if hit is not None:
+                await self.history.add_turn_async(full_message, hit.response)
+                self._finish(record, "cache")
+                yield hit.response
+                return
         
-        if any(word in message_lower for word in ["angry", "anger", "frustrated", "mad", "furious"]):
-            return self._get_anger_response()
+        contents = self._build_contents(full_message)
+        deadline = time.monotonic() + (timeout or REQUEST_TIMEOUT)
+        record.coalesced = True
+        parts = []
+        flight = MODEL_FLIGHTS.stream(self._flight_key("stream", contents),
+                                      lambda: self._stream_model(contents, deadline, record))
+        try:
+            async for text in flight:
+                if not parts:
+                    record.first_token()
+                parts.append(text)
+                yield text
+        except GeneratorExit:
+            # The reader stopped early (e.g. the crisis screen cut the reply off)
+            self._finish(record, "model", outcome="cut_off")
+            raise
+        except asyncio.CancelledError:
+            self._finish(record, "model", outcome="cancelled")
+            raise
+        except Exception as e:
+            reason = self._fallback_reason(e)
+            if reason.startswith("error:"):
+                print(f"AI streaming error: {e!r}")
+            self._finish(record, "fallback", reason)
+            fallback = self._fallback_response(user_message, mood, intensity)
+            yield "\n\n" + fallback if parts else fallback
+            return
+        finally:
+            # Stopping early (e.g. the crisis screen cutting the reply off)
+            # releases our subscription, cancelling the model call if no one
+            # else is reading it
+            await flight.aclose()
+        text = "".join(parts)
+        if scope is not None:
+            self.response_cache.put(user_message, text, scope)
+        await self.history.add_turn_async(full_message, text)
+        self._finish(record, "model")
+    
+    def _new_record(self, mode: str) -> TurnRecord:
+        """Start the telemetry record for a turn."""
+        record = TurnRecord(self.session_id, self.backend.name if self.backend else None, mode)
+        self._last_usage = record.usage
+        return record
+    
+    def _finish(self, record: TurnRecord, tier: str, fallback_reason: Optional[str] = None,
+                outcome: str = "completed"):
+        """Close a turn's record and publish it to the tier stats and telemetry sinks."""
+        record.finish(tier, fallback_reason, outcome)
+        TIER_STATS.record(tier, record.latency)
+        if tier == "model":
+            USAGE_METER.record(record.usage)
+        TELEMETRY.emit(record)
+    
+    @staticmethod
+    def _fallback_reason(error: Exception) -> str:
+        """Short label for why a model call fell back."""
+        if isinstance(error, CircuitOpenError):
+            return "circuit_open"
+        if isinstance(error, RateLimitExceeded):
+            return "rate_limited"
+        if isinstance(error, asyncio.TimeoutError):
+            return "timeout"
+        return f"error:{type(error).__name__}"
+    
+    async def _call_model(self, contents: list, deadline: float, record: TurnRecord) -> str:
+        """One model request under the limiter, with breaker and budgeted retries."""
+        record.coalesced = False
+        await self._admit(deadline, record)
         
-        if any(word in message_lower for word in ["tired", "exhausted", "sleep", "rest", "fatigue"]):
-            return self._get_tiredness_response()
+        async def attempt() -> str:
+            queued = time.perf_counter()
+            async with _get_request_limiter():
+                record.queue_wait += time.perf_counter() - queued
+                return await self.backend.generate(contents, record.usage)
         
-        if any(word in message_lower for word in ["breath", "breathing", "calm"]):
-            return self._get_breathing_response()
+        return await call_with_retries(attempt, self.breaker, self.retry_budget, deadline,
+                                       max_retries=MAX_RETRIES, attempt_timeout=ATTEMPT_TIMEOUT)
+    
+    async def _stream_model(self, contents: list, deadline: float,
+                            record: TurnRecord) -> AsyncIterator[str]:
+        """
+        One streaming model request under the limiter.
+        
+        Opening the stream and getting its first chunk is retried like
+        _call_model; once text has been produced a failure is not retried.
+        """
+        record.coalesced = False
+        
+        async def open_stream():
+            stream = self.backend.stream(contents, record.usage)
+            try:
+                has_text, first = await first_chunk(stream)
+            except BaseException:
+                await stream.aclose()
+                raise
+            return stream, (first if has_text else None)
+        
+        await self._admit(deadline, record)
+        queued = time.perf_counter()
+        async with _get_request_limiter():
+            record.queue_wait += time.perf_counter() - queued
+            stream, text = await call_with_retries(
+                open_stream, self.breaker, self.retry_budget, deadline,
+                max_retries=MAX_RETRIES, attempt_timeout=ATTEMPT_TIMEOUT
+            )
+            try:
+                while text is not None:
+                    yield text
+                    try:
+                        text = await asyncio.wait_for(stream.__anext__(), deadline - time.monotonic())
+                    except StopAsyncIteration:
+                        break
+                    except Exception:
+                        self.breaker.record_failure()
+                        raise
+            finally:
+                await stream.aclose()
+    
+    async def _admit(self, deadline: float, record: TurnRecord):
+        """
+        Wait for a global and per-session rate-limit slot.
+        
+        Raises RateLimitExceeded after MINDEASE_RATE_MAX_WAIT seconds (or at
+        the request deadline), so the turn falls back to a local response.
+        """
+        if RATE_LIMIT_ENABLED:
+            record.queue_wait += await get_rate_limiter().acquire(
+                self.session_id, max_wait=deadline - time.monotonic()
+            )
+    
+    def _flight_key(self, kind: str, contents: list) -> Tuple[str, str, str]:
+        """Requests with the same model and exact contents share one call."""
+        digest = hashlib.sha1(json.dumps(contents, sort_keys=True).encode("utf-8")).hexdigest()
+        return (kind, self.backend.name, digest)
+    
+    def _local_tier_response(self, user_message: str, mood: Optional[str],
+                             intensity: Optional[int]) -> Optional[str]:
+        """
+        Answer locally if the message is a clear, low-risk intent.
+        
+        Greetings, thanks and explicit breathing/help requests are served
+        from the templates in microseconds. Anything with distress signals,
+        a severe mood, or low router confidence goes to the model.
+        
+        Returns:
+            The local response, or None to use the model
+        """
+        policy = self.tier_policy
+        if not policy.enabled or len(user_message) > policy.max_chars:
+            return None
+        intent, confidence = route_intent(user_message)
+        if intent not in policy.intents or confidence < policy.min_confidence:
+            return None
+        if mood and intensity and is_severe_distress(mood, intensity):
+            return None
+        if detect_crisis(user_message)[0] or score_turn_risk(user_message) > 0:
+            return None
+        if intent == "help":
+            return self._get_help_response(mood, intensity)
+        return self._intent_handlers[intent]()
+    
+    def _cache_scope(self, user_message: str, mood: Optional[str],
+                     intensity: Optional[int]) -> Optional[Tuple]:
+        """
+        Response-cache scope for this turn, or None if it must not be cached.
+        
+        Only opening messages are cached: once there is history the reply
+        depends on it. Crisis messages, messages with distress signals and
+        turns with a severe mood always get a fresh reply.
+        """
+        if self.response_cache is None or not self.history.is_empty():
+            return None
+        if mood and intensity and is_severe_distress(mood, intensity):
+            return None
+        if detect_crisis(user_message)[0] or score_turn_risk(user_message) > 0:
+            return None
+        return cache_scope(self.backend.name, mood, intensity)
+    
+    def _build_message(self, user_message: str, mood: Optional[str] = None,
+                       intensity: Optional[int] = None) -> str:
+        """Prefix the message with mood context when it is known."""
+        context = ""
+        if mood and intensity:
+            context = f"[User's current mood: {mood}, Intensity: {intensity}/10] "
+        return context + user_message
+    
+    def _build_contents(self, full_message: str) -> list:
+        """Bounded request contents: summary + recent turns + this message."""
+        return self.history.as_contents() + [{"role": "user", "parts": [full_message]}]
+    
+    def _fallback_response(self, message: str, mood: Optional[str] = None,
+                          intensity: Optional[int] = None) -> str:
+        """Generate rule-based fallback response."""
+        # Distress never gets a template or a retrieved reply
+        is_crisis, crisis_response = detect_crisis(message)
+        if is_crisis:
+            return crisis_response
+        if score_turn_risk(message) > 0:
+            return self._get_help_response(mood, intensity)
+        
+        intent, _ = route_intent(message)
+        
+        if intent == "help":
+            return self._get_help_response(mood, intensity)
+        if intent in ("greeting", "gratitude", "breathing"):
+            return self._intent_handlers[intent]()
+        
+        # Closest curated response from the offline bank, if any is close enough
+        if self.response_bank is not None:
+            match = self.response_bank.lookup(message, mood)
+            if match is not None:
+                return match.response
+        
+        if intent is not None:
+            return self._intent_handlers[intent]()
         
         # Use mood context only if message is very short or unclear
-        if mood and len(message_lower) < 20:
+        if mood and len(message) < 20:
             return self._get_mood_response(mood, intensity or 5)
         
         # Default supportive response
         return self._get_default_response()
     
+    @property
+    def _intent_handlers(self) -> Dict[str, Callable[[], str]]:
+        """Template for each routed intent (except "help", which needs mood)."""
+        return {
+            "greeting": self._get_greeting_response,
+            "gratitude": self._get_gratitude_response,
+            "stress": self._get_stress_response,
+            "anxiety": self._get_anxiety_response,
+            "sadness": self._get_sadness_response,
+            "anger": self._get_anger_response,
+            "tiredness": self._get_tiredness_response,
+            "breathing": self._get_breathing_response,
+        }
+    
     def _get_mood_response(self, mood: str, intensity: int) -> str:
         """Get response based on mood type and intensity."""
         responses = {
@@ -354,8 +1039,8 @@ There's no judgment here - just support. What do you need?""",
     
     def reset_conversation(self):
         """Reset the conversation history."""
-        if self.model:
-            self.chat = self.model.start_chat(history=[])
+        if self._history is not None:
+            self._history.clear()
     
     def is_ai_available(self) -> bool:
         """Check if AI is available."""
@@ -363,8 +1048,19 @@ There's no judgment here - just support. What do you need?""",
     
     def get_status(self) -> dict:
         """Get status of the AI module."""
+        backend = self.backend.describe() if self.using_ai else {}
         return {
             "ai_available": self.using_ai,
-            "model": self.model_name if self.using_ai else "Rule-based Fallback",
-            "provider": "Google Gemini" if self.using_ai else "Local"
+            "model": backend.get("model", backend.get("name")) if self.using_ai else "Rule-based Fallback",
+            "provider": backend.get("provider", "Local") if self.using_ai else "Local",
+            "backend": backend,
+            "tiers": get_tier_stats(),
+            "response_cache": self.response_cache.stats() if self.response_cache is not None else None,
+            "coalescing": get_coalescing_stats(),
+            "rate_limit": get_rate_limit_stats() if RATE_LIMIT_ENABLED else None,
+            "circuit": self.breaker.snapshot(),
+            "retry_budget": self.retry_budget.snapshot(),
+            "tokens": USAGE_METER.snapshot(),
+            "telemetry": {"recent_turns": get_recent_turns(5), "sink_errors": TELEMETRY.sink_errors},
+            "last_turn_tokens": self.last_usage.as_dict()
         }
@@ -0,0 +1,188 @@
+"""
+Context Cache Module
+Provider-side caching of the system prompt, shared by every session
+
+The system instruction is uploaded once per process as a cached context;
+model calls then reference it instead of re-sending it each turn. The
+cache is extended before it expires and re-created if it is lost.
+benchmarks/check_context_cache.py drives that lifecycle with an in-memory
+provider and a fake clock.
+"""
+
+import asyncio
+import datetime
+import threading
+import time
+from typing import Callable, Dict, NamedTuple, Optional
+
+try:
+    from google.generativeai import caching as genai_caching
+    import google.generativeai as genai
+    GEMINI_CACHING_AVAILABLE = True
+except ImportError:
+    GEMINI_CACHING_AVAILABLE = False
+
+from utils.history import estimate_tokens
+
+
+class CacheHandle(NamedTuple):
+    """A live cached context."""
+    name: str
+    expires_at: float      # time.monotonic() deadline
+    token_count: int       # tokens served from the cache on every call
+
+
+class ContextCacheProvider:
+    """Creates, extends and deletes cached contexts for one provider."""
+
+    def create(self, model_name: str, system_prompt: str, ttl: float) -> CacheHandle:
+        raise NotImplementedError
+
+    def refresh(self, handle: CacheHandle, ttl: float) -> CacheHandle:
+        raise NotImplementedError
+
+    def delete(self, handle: CacheHandle):
+        raise NotImplementedError
+
+    def model_for(self, handle: CacheHandle):
+        """Model object whose calls use the cached context."""
+        raise NotImplementedError
+
+
+class GeminiContextCacheProvider(ContextCacheProvider):
+    """Gemini explicit context caching (google.generativeai.caching.CachedContent)."""
+
+    def __init__(self):
+        if not GEMINI_CACHING_AVAILABLE:
+            raise ImportError("google-generativeai is required for Gemini context caching")
+        self._contents: Dict[str, "genai_caching.CachedContent"] = {}
+        self._models: Dict[str, "genai.GenerativeModel"] = {}
+
+    def create(self, model_name: str, system_prompt: str, ttl: float) -> CacheHandle:
+        cached = genai_caching.CachedContent.create(
+            model=model_name if model_name.startswith("models/") else f"models/{model_name}",
+            display_name="mindease-system-prompt",
+            system_instruction=system_prompt,
+            ttl=datetime.timedelta(seconds=ttl),
+        )
+        self._contents[cached.name] = cached
+        tokens = getattr(cached.usage_metadata, "total_token_count", 0) or estimate_tokens(system_prompt)
+        return CacheHandle(cached.name, time.monotonic() + ttl, tokens)
+
+    def refresh(self, handle: CacheHandle, ttl: float) -> CacheHandle:
+        self._contents[handle.name].update(ttl=datetime.timedelta(seconds=ttl))
+        return handle._replace(expires_at=time.monotonic() + ttl)
+
+    def delete(self, handle: CacheHandle):
+        cached = self._contents.pop(handle.name, None)
+        self._models.pop(handle.name, None)
+        if cached is not None:
+            cached.delete()
+
+    def model_for(self, handle: CacheHandle):
+        model = self._models.get(handle.name)
+        if model is None:
+            model = genai.GenerativeModel.from_cached_content(cached_content=self._contents[handle.name])
+            self._models[handle.name] = model
+        return model
+
+
+class SystemPromptCache:
+    """One cached system prompt per process, kept alive while in use."""
+
+    def __init__(self, provider: ContextCacheProvider, model_name: str, system_prompt: str,
+                 ttl: float = 3600.0, refresh_margin: float = 300.0, retry_after: float = 600.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            provider: Backend-specific cache operations
+            model_name: Model the cache is created for
+            system_prompt: Text to cache
+            ttl: Lifetime requested on create/refresh (seconds)
+            refresh_margin: Extend the cache when it has less than this left
+            retry_after: After a failed create, wait this long before retrying
+            clock: Time source (monotonic seconds)
+        """
+        self.provider = provider
+        self.model_name = model_name
+        self.system_prompt = system_prompt
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.retry_after = retry_after
+        self.clock = clock
+        self._handle: Optional[CacheHandle] = None
+        self._disabled_until = 0.0
+        self._lock = threading.Lock()
+        self.creates = 0
+        self.refreshes = 0
+        self.failures = 0
+
+    def _is_fresh(self, now: float) -> bool:
+        return self._handle is not None and self._handle.expires_at - now > self.refresh_margin
+
+    def get(self) -> Optional[CacheHandle]:
+        """
+        The live cache handle, creating or extending it if needed.
+
+        Blocking (it may call the provider); use get_async() on an event loop.
+
+        Returns:
+            The handle, or None if caching is unavailable right now (the
+            caller then sends the system prompt itself)
+        """
+        now = self.clock()
+        if self._is_fresh(now):
+            return self._handle
+        with self._lock:
+            now = self.clock()
+            if self._is_fresh(now):
+                return self._handle
+            if now < self._disabled_until:
+                return None
+            if self._handle is not None and self._handle.expires_at > now:
+                try:
+                    self._handle = self.provider.refresh(self._handle, self.ttl)
+                    self.refreshes += 1
+                    return self._handle
+                except Exception as e:
+                    print(f"⚠️ Could not extend cached context ({e}); re-creating it.")
+            try:
+                self._handle = self.provider.create(self.model_name, self.system_prompt, self.ttl)
+                self.creates += 1
+            except Exception as e:
+                # E.g. the prompt is below the provider's minimum cacheable size
+                print(f"⚠️ System prompt caching unavailable: {e}")
+                self.failures += 1
+                self._handle = None
+                self._disabled_until = now + self.retry_after
+                return None
+            return self._handle
+
+    async def get_async(self) -> Optional[CacheHandle]:
+        """get() that only leaves the event loop when the provider must be called."""
+        if self._is_fresh(self.clock()):
+            return self._handle
+        return await asyncio.to_thread(self.get)
+
+    def close(self):
+        """Delete the cached context (e.g. at shutdown)."""
+        with self._lock:
+            if self._handle is not None:
+                try:
+                    self.provider.delete(self._handle)
+                except Exception as e:
+                    print(f"⚠️ Could not delete cached context: {e}")
+                self._handle = None
+
+    def stats(self) -> dict:
+        """Cache lifecycle counters."""
+        handle = self._handle
+        return {
+            "active": handle is not None and handle.expires_at > self.clock(),
+            "name": handle.name if handle else None,
+            "cached_tokens": handle.token_count if handle else 0,
+            "expires_in_s": round(max(0.0, handle.expires_at - self.clock()), 1) if handle else 0.0,
+            "creates": self.creates,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+        }
@@ -3,22 +3,53 @@ Crisis Detection Module - Responsible AI Safety Layer
 Detects potential self-harm or crisis situations and provides appropriate support
 """
 
-import re
-from typing import Tuple
-
-# Crisis keywords that require immediate safety response
-CRISIS_KEYWORDS = [
-    # Self-harm related
-    "kill myself", "end my life", "want to die", "suicide", "suicidal",
-    "self harm", "self-harm", "hurt myself", "cutting myself",
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from utils.phrase_matcher import PhraseMatch, PhraseMatcher, PhraseStream, phrase_tokens
+from utils.severity_model import get_default_classifier
+
+# Crisis keywords that require immediate safety response. A trailing "*"
+# matches any ending of the last word ("overdos*" -> "overdosed", "overdosing")
+SELF_HARM_KEYWORDS = [
+    "kill myself", "end my life", "want to die", "suicid*",
+    "self-harm*", "hurt myself", "cutting myself",
     "don't want to live", "no reason to live", "better off dead",
     "ending it all", "can't go on", "give up on life",
-    "take my own life", "not worth living", "overdose",
-    # Severe distress
+    "take my own life", "not worth living", "overdos*",
+]
+
+SEVERE_DISTRESS_KEYWORDS = [
     "nobody cares", "everyone hates me", "completely alone",
     "no hope left", "nothing matters anymore", "can't take it anymore"
 ]
 
+CRISIS_KEYWORDS = SELF_HARM_KEYWORDS + SEVERE_DISTRESS_KEYWORDS
+
+# Streamed model output is screened against this narrower list instead:
+# supportive replies legitimately mention suicide or self-harm ("if you're
+# having thoughts of suicide, please reach out"), so only phrases that would
+# be harmful coming from the assistant cut the reply off
+UNSAFE_OUTPUT_KEYWORDS = [
+    "you should kill yourself", "go kill yourself", "just kill yourself",
+    "you should die", "you deserve to die", "you should end your life",
+    "you'd be better off dead", "you are better off dead", "you're better off dead",
+    "nobody would miss you", "no one would miss you", "no reason for you to live",
+    "lethal dose", "painless way to die",
+]
+
+# Weaker distress cues: not a crisis on their own, but they add up across turns
+DISTRESS_SIGNALS = {
+    "hopeless": 1.0, "worthless": 1.0, "hate myself": 1.5, "i'm a burden": 1.5,
+    "no way out": 1.5, "trapped": 1.0, "what's the point": 1.0, "no point": 1.0,
+    "give up": 1.0, "can't do this": 1.0, "nothing helps": 1.0,
+    "tired of everything": 1.0, "want to disappear": 1.5, "disappear": 1.0,
+    "so alone": 1.0, "lonely": 0.5, "empty": 0.5, "numb": 0.5, "exhausted": 0.5,
+}
+
 # Emergency helplines (India-focused, add more as needed)
 EMERGENCY_RESOURCES = """
 🆘 **If you're in crisis, please reach out immediately:**
@@ -53,25 +84,232 @@ Would you like me to help you with some grounding exercises while you reach out
 """
 
 
-def detect_crisis(message: str) -> Tuple[bool, str]:
+def build_crisis_matcher(keywords: Optional[Iterable[str]] = None) -> PhraseMatcher:
+    """
+    Compiles crisis phrases into a single-pass matcher.
+    
+    Args:
+        keywords: Phrases to match (defaults to CRISIS_KEYWORDS)
+        
+    Returns:
+        Compiled PhraseMatcher
+    """
+    return PhraseMatcher(CRISIS_KEYWORDS if keywords is None else keywords)
+
+
+# Everyday words within the typo budget of a crisis word ("overdue" -> "overdose")
+FUZZY_PROTECTED_WORDS = ["overdo", "overdue", "overdone", "overdoes"]
+
+# A misspelled crisis word is a risk signal worth this fraction of the
+# phrase's weight; it never triggers the crisis response on its own
+FUZZY_MATCH_FACTOR = 0.5
+
+# Base forms of the stemmed keywords: the severity model's lexicon seed, and
+# the words typos are corrected to ("suicdal" -> "suicidal")
+STEM_FORMS = {
+    "suicid*": ["suicide", "suicidal"],
+    "self-harm*": ["self harm", "self-harm"],
+    "overdos*": ["overdose"],
+}
+
+FUZZY_CRISIS_WORDS = [form for forms in STEM_FORMS.values() for form in forms if len(phrase_tokens(form)) == 1]
+
+# Compiled once at import (with its typo index); every chat turn reuses it
+_CRISIS_MATCHER = PhraseMatcher(CRISIS_KEYWORDS, fuzzy=True, protected_words=FUZZY_PROTECTED_WORDS,
+                                fuzzy_words=FUZZY_CRISIS_WORDS)
+_OUTPUT_MATCHER = PhraseMatcher(UNSAFE_OUTPUT_KEYWORDS)
+
+
+def find_crisis_phrases(message: str, fuzzy: bool = False) -> List[PhraseMatch]:
+    """
+    Finds every crisis phrase in a message.
+    
+    Args:
+        message: User's input message
+        fuzzy: Also match misspelled single-word keywords ("suicdal")
+        
+    Returns:
+        List of PhraseMatch(phrase, start, end, fuzzy), in order of appearance
+    """
+    return _CRISIS_MATCHER.find_all(message, fuzzy)
+
+
+def detect_crisis(message: str, fuzzy: bool = False) -> Tuple[bool, str]:
     """
     Detects if a message contains crisis-related content.
     
+    Typo matches are approximate; the app feeds them to SessionRiskTracker
+    (via score_turn_risk) instead of treating them as a crisis.
+    
     Args:
         message: User's input message
+        fuzzy: Also match misspelled single-word keywords within a small
+            edit distance
         
     Returns:
         Tuple of (is_crisis: bool, response: str)
     """
-    message_lower = message.lower()
-    
-    for keyword in CRISIS_KEYWORDS:
-        if keyword in message_lower:
-            return True, SUPPORTIVE_CRISIS_MESSAGE.format(resources=EMERGENCY_RESOURCES)
+    if _CRISIS_MATCHER.search(message, fuzzy) is not None:
+        return True, SUPPORTIVE_CRISIS_MESSAGE.format(resources=EMERGENCY_RESOURCES)
     
     return False, ""
 
 
+class StreamingCrisisDetector:
+    """
+    Incremental crisis detector for text that arrives in pieces.
+    
+    Feed it partial speech-to-text results or streamed model output chunk by
+    chunk; it fires as soon as a crisis phrase completes, even when the phrase
+    is split across chunks, so the caller can stop the stream right away.
+    """
+    
+    def __init__(self, keywords: Optional[Iterable[str]] = None,
+                 matcher: Optional[PhraseMatcher] = None):
+        """
+        Initialize the detector.
+        
+        Args:
+            keywords: Phrases to watch for (defaults to CRISIS_KEYWORDS)
+            matcher: Precompiled matcher to use instead of keywords
+        """
+        if matcher is None:
+            matcher = _CRISIS_MATCHER if keywords is None else build_crisis_matcher(keywords)
+        self._stream = PhraseStream(matcher)
+        self.matches: List[PhraseMatch] = []
+    
+    @classmethod
+    def for_model_output(cls) -> "StreamingCrisisDetector":
+        """Detector for screening the assistant's own replies (UNSAFE_OUTPUT_KEYWORDS)."""
+        return cls(matcher=_OUTPUT_MATCHER)
+    
+    @property
+    def triggered(self) -> bool:
+        """True once any crisis phrase has been seen."""
+        return bool(self.matches)
+    
+    def feed(self, chunk: str) -> bool:
+        """
+        Scan the next chunk of text.
+        
+        Args:
+            chunk: Newly arrived text
+            
+        Returns:
+            True if a crisis phrase has been detected so far
+        """
+        self.matches.extend(self._stream.feed(chunk))
+        return self.triggered
+    
+    def close(self) -> bool:
+        """Flush the end of the stream; returns True if a crisis phrase was detected."""
+        self.matches.extend(self._stream.close())
+        return self.triggered
+    
+    def reset(self):
+        """Clear state to reuse the detector for a new stream."""
+        self._stream.reset()
+        self.matches = []
+    
+    def get_response(self) -> str:
+        """Returns the supportive crisis message."""
+        return SUPPORTIVE_CRISIS_MESSAGE.format(resources=EMERGENCY_RESOURCES)
+
+
+# Matcher used inside batch worker processes (set by _init_batch_worker)
+_WORKER_MATCHER: Optional[PhraseMatcher] = None
+
+
+def _init_batch_worker(keywords: Optional[List[str]]):
+    """Process pool initializer: compile the matcher once per worker."""
+    global _WORKER_MATCHER
+    _WORKER_MATCHER = _CRISIS_MATCHER if keywords is None else build_crisis_matcher(keywords)
+
+
+def _screen_chunk(messages: List[str]) -> List[List[PhraseMatch]]:
+    """Screen one chunk of messages inside a worker process."""
+    matcher = _WORKER_MATCHER if _WORKER_MATCHER is not None else _CRISIS_MATCHER
+    return [matcher.find_all(message) for message in messages]
+
+
+def _chunked(messages: Iterable[str], chunk_size: int) -> Iterator[List[str]]:
+    """Lazily split an iterable into lists of at most chunk_size items."""
+    iterator = iter(messages)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def detect_crisis_batch(messages: Iterable[str], keywords: Optional[Iterable[str]] = None,
+                        workers: Optional[int] = None,
+                        chunk_size: int = 1000) -> Iterator[List[PhraseMatch]]:
+    """
+    Screens many messages for crisis phrases, fanning out over a process pool.
+    
+    Input is consumed lazily and at most ``2 * workers`` chunks are in flight,
+    so memory stays bounded however large the input is. Results come back in
+    input order.
+    
+    Args:
+        messages: Iterable of message texts (may be a generator)
+        keywords: Phrases to screen for (defaults to CRISIS_KEYWORDS)
+        workers: Worker processes (defaults to CPU count; 1 screens in-process)
+        chunk_size: Messages sent to a worker per task
+        
+    Yields:
+        List of PhraseMatch for each message (empty if nothing matched)
+    """
+    keyword_list = None if keywords is None else list(keywords)
+    workers = workers or os.cpu_count() or 1
+    chunks = _chunked(messages, chunk_size)
+    
+    if workers <= 1:
+        matcher = _CRISIS_MATCHER if keyword_list is None else build_crisis_matcher(keyword_list)
+        for chunk in chunks:
+            for message in chunk:
+                yield matcher.find_all(message)
+        return
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                             initargs=(keyword_list,)) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_screen_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def get_severity_score(message: str) -> float:
+    """
+    Continuous severity score from the local classifier.
+    
+    The classifier's baseline (its score for a message with no known
+    features) is subtracted, so ordinary messages score 0.
+    
+    Args:
+        message: User's input message
+        
+    Returns:
+        Score between 0 (neutral) and 1 (severe); 0.0 if numpy is unavailable
+    """
+    classifier = get_default_classifier()
+    if classifier is None:
+        return 0.0
+    return float(classifier.excess_batch([message])[0])
+
+
+def score_severity_batch(messages: List[str]) -> List[float]:
+    """Severity scores (as get_severity_score) for many messages, in one matrix multiply."""
+    classifier = get_default_classifier()
+    if classifier is None:
+        return [0.0] * len(messages)
+    return classifier.excess_batch(messages).tolist()
+
+
 def get_emergency_resources() -> str:
     """Returns formatted emergency resources."""
     return EMERGENCY_RESOURCES
@@ -98,6 +336,133 @@ def is_severe_distress(mood_type: str, intensity: int) -> bool:
     return False
 
 
+# Per-turn risk weights used by SessionRiskTracker
+SELF_HARM_WEIGHT = 3.0
+SEVERE_DISTRESS_WEIGHT = 1.5
+SEVERE_MOOD_WEIGHT = 2.0
+SEVERITY_SCORE_WEIGHT = 2.0
+MAX_TURN_RISK = 6.0
+
+_RISK_WEIGHTS = dict(DISTRESS_SIGNALS)
+_RISK_WEIGHTS.update({keyword: SEVERE_DISTRESS_WEIGHT for keyword in SEVERE_DISTRESS_KEYWORDS})
+_RISK_WEIGHTS.update({keyword: SELF_HARM_WEIGHT for keyword in SELF_HARM_KEYWORDS})
+_RISK_MATCHER = PhraseMatcher(_RISK_WEIGHTS, protected_words=FUZZY_PROTECTED_WORDS,
+                              fuzzy_words=FUZZY_CRISIS_WORDS)
+
+
+def score_turn_risk(message: Optional[str] = None, mood: Optional[str] = None,
+                    intensity: Optional[int] = None, severity: Optional[float] = None) -> float:
+    """
+    Scores the risk signals in a single turn.
+    
+    Misspelled crisis keywords count at FUZZY_MATCH_FACTOR of their weight.
+    The severity classifier is seeded from the same lexicon, so its score is
+    not added on top of the phrase weights: the message contributes whichever
+    is larger, and the classifier only adds risk the phrases missed.
+    
+    Args:
+        message: User's message, if any
+        mood: Mood type from a check-in, if any
+        intensity: Mood intensity (1-10), if any
+        severity: Classifier score (0-1) for the message, if computed
+        
+    Returns:
+        Risk score for the turn (0 to MAX_TURN_RISK)
+    """
+    score = 0.0
+    if message:
+        phrases = {}
+        for match in _RISK_MATCHER.iter_matches(message, fuzzy=True):
+            weight = _RISK_WEIGHTS[match.phrase] * (FUZZY_MATCH_FACTOR if match.fuzzy else 1.0)
+            phrases[match.phrase] = max(phrases.get(match.phrase, 0.0), weight)
+        score += sum(phrases.values())
+    if severity:
+        score = max(score, SEVERITY_SCORE_WEIGHT * severity)
+    if mood and intensity and is_severe_distress(mood, intensity):
+        score += SEVERE_MOOD_WEIGHT
+    return min(score, MAX_TURN_RISK)
+
+
+class SessionRiskTracker:
+    """
+    Sliding-window risk score over a session's recent turns.
+    
+    Keeps the per-turn scores of the last ``window`` turns and a running
+    total, so each update is O(1) and never rescans history. Distress spread
+    over several short messages ("nobody cares" ... "what's the point")
+    adds up even when no single message is a crisis on its own.
+    """
+    
+    __slots__ = ("window", "threshold", "_scores", "_total", "_alerted")
+    
+    def __init__(self, window: int = 6, threshold: float = 4.0):
+        """
+        Initialize the tracker.
+        
+        Args:
+            window: Number of recent turns that count towards the score
+            threshold: Windowed score at which a check-in is warranted
+        """
+        self.window = window
+        self.threshold = threshold
+        self._scores = deque(maxlen=window)
+        self._total = 0.0
+        self._alerted = False
+    
+    @property
+    def score(self) -> float:
+        """Current windowed risk score."""
+        return self._total
+    
+    def observe(self, message: Optional[str] = None, mood: Optional[str] = None,
+                intensity: Optional[int] = None, severity: Optional[float] = None) -> float:
+        """
+        Records one turn (a chat message or a mood check-in).
+        
+        Args:
+            message: User's message, if any
+            mood: Mood type from a check-in, if any
+            intensity: Mood intensity (1-10), if any
+            severity: Classifier score (0-1) for the message, if computed
+            
+        Returns:
+            Updated windowed risk score
+        """
+        return self.add_turn_score(score_turn_risk(message, mood, intensity, severity))
+    
+    def add_turn_score(self, turn_score: float) -> float:
+        """Pushes a precomputed turn score into the window."""
+        if len(self._scores) == self.window:
+            self._total -= self._scores[0]
+        self._scores.append(turn_score)
+        self._total += turn_score
+        if self._total < self.threshold:
+            self._alerted = False
+        return self._total
+    
+    def is_elevated(self) -> bool:
+        """True while the windowed score is at or above the threshold."""
+        return self._total >= self.threshold
+    
+    def needs_check_in(self) -> bool:
+        """
+        True once each time the score crosses the threshold.
+        
+        Stays False while the score remains elevated so the user isn't asked
+        the same question every turn; re-arms after the score drops.
+        """
+        if self.is_elevated() and not self._alerted:
+            self._alerted = True
+            return True
+        return False
+    
+    def reset(self):
+        """Clear the window (e.g. when the conversation is reset)."""
+        self._scores.clear()
+        self._total = 0.0
+        self._alerted = False
+
+
 def get_gentle_checkin() -> str:
     """Returns a gentle check-in message for high-distress users."""
     return """
@@ -0,0 +1,155 @@
+"""
+Crisis Screening CLI
+Re-screens stored JSONL transcripts against the current CRISIS_KEYWORDS
+
+Usage:
+    python -m utils.crisis_screen transcripts/*.jsonl -o hits.jsonl --summary summary.json
+    cat export.jsonl | python -m utils.crisis_screen - --role user
+
+Each input line is a JSON object holding one message (the app's message
+dicts use "role" / "content"). One output line is written per message with
+at least one hit, and aggregate counts are written at the end.
+"""
+
+import argparse
+import json
+import sys
+from collections import Counter
+from itertools import tee
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from utils.crisis_detector import detect_crisis_batch
+
+
+def _open_input(path: str):
+    """Open an input path, treating "-" as stdin."""
+    if path == "-":
+        return sys.stdin
+    return open(path, "r", encoding="utf-8")
+
+
+def _read_records(paths: List[str], text_field: str, role: Optional[str],
+                  stats: Counter) -> Iterator[Tuple[Dict, str]]:
+    """
+    Stream (metadata, text) pairs from JSONL files, one line at a time.
+
+    Malformed lines and records without text are counted and skipped.
+    """
+    for path in paths:
+        handle = _open_input(path)
+        try:
+            for line_no, line in enumerate(handle, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    stats["malformed_lines"] += 1
+                    continue
+                if not isinstance(record, dict):
+                    stats["malformed_lines"] += 1
+                    continue
+                if role and record.get("role") != role:
+                    stats["skipped_role"] += 1
+                    continue
+                text = record.get(text_field)
+                if not isinstance(text, str):
+                    stats["missing_text"] += 1
+                    continue
+                meta = {"source": path, "line": line_no}
+                if "id" in record:
+                    meta["id"] = record["id"]
+                if "timestamp" in record:
+                    meta["timestamp"] = record["timestamp"]
+                yield meta, text
+        finally:
+            if handle is not sys.stdin:
+                handle.close()
+
+
+def screen_transcripts(paths: List[str], out, text_field: str = "content",
+                       role: Optional[str] = None, keywords: Optional[List[str]] = None,
+                       workers: Optional[int] = None, chunk_size: int = 1000) -> Dict:
+    """
+    Screen JSONL transcripts and write per-message hits to ``out``.
+
+    Args:
+        paths: Input JSONL paths ("-" for stdin)
+        out: Writable text stream for per-message hit lines
+        text_field: Record key holding the message text
+        role: Only screen records with this role (e.g. "user")
+        keywords: Phrases to screen for (defaults to CRISIS_KEYWORDS)
+        workers: Worker processes for detect_crisis_batch
+        chunk_size: Messages per worker task
+
+    Returns:
+        Aggregate counts as a dict
+    """
+    stats = Counter()
+    phrase_counts = Counter()
+    records = _read_records(paths, text_field, role, stats)
+    # tee only buffers the messages in flight, so memory stays bounded
+    meta_stream, text_stream = tee(records)
+    texts = (text for _, text in text_stream)
+
+    for (meta, _), matches in zip(meta_stream, detect_crisis_batch(
+            texts, keywords=keywords, workers=workers, chunk_size=chunk_size)):
+        stats["messages"] += 1
+        if not matches:
+            continue
+        stats["flagged_messages"] += 1
+        phrase_counts.update(match.phrase for match in matches)
+        hit = dict(meta)
+        hit["matches"] = [{"phrase": m.phrase, "start": m.start, "end": m.end} for m in matches]
+        out.write(json.dumps(hit, ensure_ascii=False) + "\n")
+
+    summary = dict(stats)
+    summary.setdefault("messages", 0)
+    summary.setdefault("flagged_messages", 0)
+    summary["phrase_counts"] = dict(phrase_counts.most_common())
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(
+        prog="python -m utils.crisis_screen",
+        description="Bulk crisis screening for JSONL conversation transcripts."
+    )
+    parser.add_argument("inputs", nargs="+", help="JSONL transcript files ('-' for stdin)")
+    parser.add_argument("-o", "--output", default="-", help="Per-message hits JSONL (default: stdout)")
+    parser.add_argument("--summary", help="Write aggregate counts JSON here (default: stderr)")
+    parser.add_argument("--text-field", default="content", help="Record key holding the message text")
+    parser.add_argument("--role", help="Only screen records with this role, e.g. 'user'")
+    parser.add_argument("--keywords-file", help="Screen against these phrases (one per line) instead of CRISIS_KEYWORDS")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Messages per worker task")
+    args = parser.parse_args(argv)
+
+    keywords = None
+    if args.keywords_file:
+        with open(args.keywords_file, "r", encoding="utf-8") as f:
+            keywords = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        summary = screen_transcripts(
+            args.inputs, out, text_field=args.text_field, role=args.role,
+            keywords=keywords, workers=args.workers, chunk_size=args.chunk_size
+        )
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    summary_text = json.dumps(summary, indent=2, ensure_ascii=False)
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            f.write(summary_text + "\n")
+    else:
+        print(summary_text, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
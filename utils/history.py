@@ -0,0 +1,229 @@
+"""
+Conversation History Module
+Token-budgeted chat history with a rolling summary of older turns
+
+The last few turns are sent to the model verbatim; anything older is folded
+into a short running summary, so the request size of every turn stays
+bounded however long the session runs.
+"""
+
+import asyncio
+import inspect
+import re
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+# Summarizer signature: (current_summary, user_message, bot_reply) -> new_summary
+# (or an awaitable of it, for summarizers that call a model)
+Summarizer = Callable[[str, str, str], Union[str, Awaitable[str]]]
+
+_MOOD_TAG = re.compile(r"^\[User's current mood:[^\]]*\]\s*")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count (~4 characters per token for English)."""
+    return (len(text) + 3) // 4
+
+
+def _first_sentence(text: str, max_words: int = 30) -> str:
+    """First sentence of a message, capped at max_words."""
+    sentence = _SENTENCE_END.split(text.strip(), maxsplit=1)[0]
+    words = sentence.split()
+    if len(words) > max_words:
+        sentence = " ".join(words[:max_words]) + "..."
+    return sentence
+
+
+def local_summarizer(summary: str, user_message: str, bot_reply: str) -> str:
+    """
+    Extractive summary: one bullet per compacted turn with what the user said.
+
+    The bot's replies are not kept; the model only needs to remember what the
+    user shared, not its own earlier advice.
+    """
+    user_text = _MOOD_TAG.sub("", user_message)
+    mood = _MOOD_TAG.match(user_message)
+    line = f"- {_first_sentence(user_text)}"
+    if mood:
+        line += f" {mood.group().strip()}"
+    return (summary + "\n" + line).strip()
+
+
+def make_model_summarizer(model, fallback: Summarizer = local_summarizer) -> Summarizer:
+    """
+    Build a summarizer that asks a (cheap) model to update the summary.
+
+    The summarizer is async: the blocking generate_content call runs in a
+    worker thread, so compacting history never stalls the shared event loop
+    that add_turn_async is awaited on.
+
+    Args:
+        model: Object with generate_content(prompt) returning .text
+            (e.g. genai.GenerativeModel("gemini-2.0-flash-lite"))
+        fallback: Used if the model call fails
+
+    Returns:
+        Async summarizer function (use with ConversationHistory.add_turn_async)
+    """
+    async def summarize(summary: str, user_message: str, bot_reply: str) -> str:
+        prompt = (
+            "Update this running summary of a mental wellness chat in at most "
+            "5 short bullet points. Keep what the user shared about their "
+            "feelings, situation and what helped. No advice.\n\n"
+            f"Current summary:\n{summary or '(empty)'}\n\n"
+            f"User: {user_message}\nMindEase: {bot_reply}\n\nUpdated summary:"
+        )
+        try:
+            response = await asyncio.to_thread(model.generate_content, prompt)
+            return response.text.strip()
+        except Exception as e:
+            print(f"History summarizer error: {e}")
+            return fallback(summary, user_message, bot_reply)
+    return summarize
+
+
+class ConversationHistory:
+    """Recent turns verbatim plus a running summary, under a token budget."""
+
+    __slots__ = ("max_recent_turns", "max_recent_tokens", "max_summary_tokens", "summarizer",
+                 "summary", "summary_tokens", "_turns", "recent_tokens", "compacted_turns")
+
+    def __init__(self, max_recent_turns: int = 6, max_recent_tokens: int = 1500,
+                 max_summary_tokens: int = 300, summarizer: Optional[Summarizer] = None):
+        """
+        Initialize an empty history.
+
+        Nothing is allocated for turns until the first add_turn, so an idle
+        session costs only this object.
+
+        Args:
+            max_recent_turns: Turns kept verbatim
+            max_recent_tokens: Token budget for the verbatim turns
+            max_summary_tokens: Token budget for the running summary
+            summarizer: Folds a turn into the summary (defaults to local_summarizer)
+        """
+        self.max_recent_turns = max_recent_turns
+        self.max_recent_tokens = max_recent_tokens
+        self.max_summary_tokens = max_summary_tokens
+        self.summarizer = summarizer or local_summarizer
+        self.summary = ""
+        self.summary_tokens = 0
+        self._turns = None      # deque of (user_message, bot_reply, tokens), on first turn
+        self.recent_tokens = 0
+        self.compacted_turns = 0
+
+    def __len__(self) -> int:
+        return len(self._turns) if self._turns else 0
+
+    @property
+    def token_count(self) -> int:
+        """Approximate tokens this history adds to a request."""
+        return self.summary_tokens + self.recent_tokens
+
+    def is_empty(self) -> bool:
+        """True before the first turn (or after clear())."""
+        return not self._turns and not self.summary
+
+    def add_turn(self, user_message: str, bot_reply: str):
+        """
+        Record a completed turn, compacting old turns if over budget.
+
+        Only for synchronous summarizers; use add_turn_async with one built
+        by make_model_summarizer.
+
+        Args:
+            user_message: What was sent to the model for this turn
+            bot_reply: The model's reply
+        """
+        if inspect.iscoroutinefunction(self.summarizer):
+            raise TypeError("async summarizer: use add_turn_async()")
+        self._append(user_message, bot_reply)
+        while self._over_budget():
+            self._set_summary(self.summarizer(self.summary, *self._pop_oldest()))
+
+    async def add_turn_async(self, user_message: str, bot_reply: str):
+        """
+        Record a completed turn, awaiting the summarizer if it is async.
+
+        Args:
+            user_message: What was sent to the model for this turn
+            bot_reply: The model's reply
+        """
+        self._append(user_message, bot_reply)
+        while self._over_budget():
+            summary = self.summarizer(self.summary, *self._pop_oldest())
+            if inspect.isawaitable(summary):
+                summary = await summary
+            self._set_summary(summary)
+
+    def _append(self, user_message: str, bot_reply: str):
+        """Add a turn to the verbatim window, truncating a turn that alone exceeds the budget."""
+        if self._turns is None:
+            self._turns = deque()
+        user_tokens = estimate_tokens(user_message)
+        reply_tokens = estimate_tokens(bot_reply)
+        if user_tokens + reply_tokens > self.max_recent_tokens:
+            # Keep the start of the reply and the end of the message; split the budget
+            # between them in proportion, so one huge turn cannot grow a request unbounded
+            user_budget = max(1, self.max_recent_tokens * user_tokens // (user_tokens + reply_tokens))
+            reply_budget = max(1, self.max_recent_tokens - user_budget)
+            if user_tokens > user_budget:
+                user_message = "..." + user_message[-(user_budget * 4 - 3):]
+            if reply_tokens > reply_budget:
+                bot_reply = bot_reply[:reply_budget * 4 - 3] + "..."
+        tokens = estimate_tokens(user_message) + estimate_tokens(bot_reply)
+        self._turns.append((user_message, bot_reply, tokens))
+        self.recent_tokens += tokens
+
+    def _over_budget(self) -> bool:
+        return len(self._turns) > 1 and (len(self._turns) > self.max_recent_turns
+                                         or self.recent_tokens > self.max_recent_tokens)
+
+    def _pop_oldest(self):
+        """Remove the oldest verbatim turn; returns (user_message, bot_reply)."""
+        user_message, bot_reply, tokens = self._turns.popleft()
+        self.recent_tokens -= tokens
+        return user_message, bot_reply
+
+    def _set_summary(self, summary: str):
+        """Store the summary after folding in a compacted turn, trimmed to its budget."""
+        self.summary = summary
+        self.summary_tokens = estimate_tokens(self.summary)
+        # Over budget: drop the oldest summary lines first
+        while self.summary_tokens > self.max_summary_tokens and "\n" in self.summary:
+            self.summary = self.summary.split("\n", 1)[1]
+            self.summary_tokens = estimate_tokens(self.summary)
+        if self.summary_tokens > self.max_summary_tokens:
+            self.summary = self.summary[-self.max_summary_tokens * 4:]
+            self.summary_tokens = estimate_tokens(self.summary)
+        self.compacted_turns += 1
+
+    def as_contents(self) -> List[Dict]:
+        """
+        History in Gemini "contents" format, to prepend to the next message.
+
+        Returns:
+            List of {"role", "parts"} dicts: the summary (if any) as a
+            leading exchange, then the recent turns verbatim
+        """
+        contents = []
+        if self.summary:
+            contents.append({"role": "user", "parts": [
+                "[Summary of our earlier conversation - what I shared]\n" + self.summary
+            ]})
+            contents.append({"role": "model", "parts": [
+                "Thank you, I remember. Let's continue."
+            ]})
+        for user_message, bot_reply, _ in self._turns or ():
+            contents.append({"role": "user", "parts": [user_message]})
+            contents.append({"role": "model", "parts": [bot_reply]})
+        return contents
+
+    def clear(self):
+        """Forget everything."""
+        self.summary = ""
+        self.summary_tokens = 0
+        self._turns = None
+        self.recent_tokens = 0
+        self.compacted_turns = 0
@@ -0,0 +1,134 @@
+"""
+Intent Router Module
+Declarative intent table compiled into a single word-boundary-aware matcher
+Used by the rule-based fallback path to pick a response template
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from utils.phrase_matcher import PhraseMatcher, phrase_tokens
+
+# Intent table, in priority order (earlier wins ties).
+#   phrases:   words/phrases that signal the intent (matched on word boundaries)
+#   weight:    score per matched word; greetings are weak so "hi, I'm stressed"
+#              routes to stress
+#   max_chars: only consider the intent for messages up to this length
+INTENT_TABLE: Dict[str, Dict] = {
+    "greeting": {
+        "phrases": ["hello", "hi", "hey", "hii", "hiya", "heya", "good morning",
+                    "good afternoon", "good evening"],
+        "weight": 0.5,
+        "max_chars": 24,
+    },
+    "help": {
+        "phrases": ["help me", "help", "i need help", "what do i do", "what should i do"],
+    },
+    "gratitude": {
+        "phrases": ["thank", "thanks", "thank you", "thx", "helpful", "that helped"],
+    },
+    "stress": {
+        "phrases": ["stress", "stressed", "stressful", "overwhelming", "overwhelmed",
+                    "under pressure"],
+    },
+    "anxiety": {
+        "phrases": ["anxious", "anxiety", "worried", "worry", "worrying", "panic",
+                    "panicking", "panic attack", "nervous"],
+    },
+    "sadness": {
+        "phrases": ["sad", "depressed", "down", "low", "unhappy", "miserable",
+                    "feeling down", "feeling low"],
+    },
+    "anger": {
+        "phrases": ["angry", "anger", "frustrated", "frustrating", "mad", "furious"],
+    },
+    "tiredness": {
+        "phrases": ["tired", "exhausted", "sleep", "rest", "fatigue", "can't sleep"],
+    },
+    "breathing": {
+        "phrases": ["breath", "breathe", "breathing", "calm", "calm down"],
+    },
+}
+
+
+class IntentMatch(NamedTuple):
+    """Best intent for a message and how sure the router is (0-1)."""
+    intent: Optional[str]
+    confidence: float
+
+
+class IntentRouter:
+    """
+    Scores every intent in one pass over the message.
+
+    All phrases of all intents are compiled into one PhraseMatcher; each match
+    adds ``weight * words_in_phrase`` to its intent. Confidence combines the
+    best intent's share of the total score with how much of the message its
+    phrases cover, so "thanks!" is a confident gratitude match while a long
+    story that happens to mention "rest" is not.
+    """
+
+    def __init__(self, table: Dict[str, Dict]):
+        """
+        Compile an intent table.
+
+        Args:
+            table: Intent name -> {"phrases": [...], "weight": float, "max_chars": int}
+        """
+        self.intents = list(table)
+        self._priority = {intent: rank for rank, intent in enumerate(self.intents)}
+        self._max_chars = {intent: spec.get("max_chars") for intent, spec in table.items()}
+
+        targets: Dict[Tuple[str, ...], List[Tuple[str, float]]] = {}
+        phrases = []
+        for intent, spec in table.items():
+            weight = spec.get("weight", 1.0)
+            for phrase in spec["phrases"]:
+                tokens = phrase_tokens(phrase)
+                targets.setdefault(tokens, []).append((intent, weight * len(tokens)))
+                phrases.append(phrase)
+
+        self._matcher = PhraseMatcher(phrases)
+        self._targets = {phrase: targets[phrase_tokens(phrase)] for phrase in self._matcher.phrases}
+
+    def route(self, message: str) -> IntentMatch:
+        """
+        Pick the best intent for a message.
+
+        Args:
+            message: User's message
+
+        Returns:
+            IntentMatch(intent, confidence); intent is None when nothing matched
+        """
+        length = len(message.strip())
+        scores: Dict[str, float] = {}
+        covered: Dict[str, int] = {}
+        last_end: Dict[str, int] = {}
+
+        for match in self._matcher.iter_matches(message):
+            for intent, score in self._targets[match.phrase]:
+                max_chars = self._max_chars[intent]
+                if max_chars is not None and length > max_chars:
+                    continue
+                scores[intent] = scores.get(intent, 0.0) + score
+                # Matches arrive ordered by end; count overlapping spans once
+                start = max(match.start, last_end.get(intent, 0))
+                covered[intent] = covered.get(intent, 0) + max(0, match.end - start)
+                last_end[intent] = max(match.end, last_end.get(intent, 0))
+
+        if not scores:
+            return IntentMatch(None, 0.0)
+
+        best = min(scores, key=lambda intent: (-scores[intent], self._priority[intent]))
+        share = scores[best] / sum(scores.values())
+        coverage = min(1.0, covered[best] / max(length, 1))
+        return IntentMatch(best, round(share * (0.5 + 0.5 * coverage), 3))
+
+
+# Compiled once at import; shared by every session
+_ROUTER = IntentRouter(INTENT_TABLE)
+
+
+def route_intent(message: str) -> IntentMatch:
+    """Best intent and confidence for a message, using INTENT_TABLE."""
+    return _ROUTER.route(message)
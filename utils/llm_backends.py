@@ -0,0 +1,504 @@
+"""
+LLM Backends Module
+Pluggable model providers behind one small async interface
+Gemini, OpenAI, any OpenAI-compatible HTTP server, and hedged pairs of them
+
+Every backend takes the conversation in Gemini "contents" format (what
+ConversationHistory produces) and converts it to its own wire format.
+Backends make exactly one attempt per call; limits, retries and circuit
+breaking are applied by the caller (see utils.chatbot / utils.resilience).
+"""
+
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from openai import AsyncOpenAI
+    OPENAI_AVAILABLE = True
+except ImportError:
+    OPENAI_AVAILABLE = False
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+from utils.history import estimate_tokens
+
+
+class TokenUsage:
+    """Input tokens served from a provider cache vs. sent fresh, and output tokens."""
+
+    __slots__ = ("cached_input", "uncached_input", "output")
+
+    def __init__(self, cached_input: int = 0, uncached_input: int = 0, output: int = 0):
+        self.cached_input = cached_input
+        self.uncached_input = uncached_input
+        self.output = output
+
+    def add(self, cached_input: int = 0, uncached_input: int = 0, output: int = 0):
+        self.cached_input += cached_input
+        self.uncached_input += uncached_input
+        self.output += output
+
+    def as_dict(self) -> dict:
+        return {"cached_input": self.cached_input, "uncached_input": self.uncached_input,
+                "output": self.output}
+
+
+class UsageMeter:
+    """Thread-safe process-wide token totals."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._total = TokenUsage()
+        self.calls = 0
+
+    def record(self, usage: TokenUsage):
+        with self._lock:
+            self._total.add(usage.cached_input, usage.uncached_input, usage.output)
+            self.calls += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            totals = self._total.as_dict()
+            calls = self.calls
+        input_tokens = totals["cached_input"] + totals["uncached_input"]
+        totals["calls"] = calls
+        totals["cached_share"] = round(totals["cached_input"] / input_tokens, 3) if input_tokens else 0.0
+        return totals
+
+
+USAGE_METER = UsageMeter()
+
+
+def contents_tokens(contents: List[Dict]) -> int:
+    """Approximate token count of Gemini-format contents."""
+    return sum(estimate_tokens(str(part)) for content in contents for part in content["parts"])
+
+
+def to_openai_messages(contents: List[Dict], system_prompt: Optional[str] = None) -> List[Dict]:
+    """Convert Gemini contents ({"role": "user"/"model", "parts": [...]}) to chat messages."""
+    messages = [{"role": "system", "content": system_prompt}] if system_prompt else []
+    for content in contents:
+        role = "assistant" if content["role"] == "model" else "user"
+        messages.append({"role": role, "content": "".join(str(p) for p in content["parts"])})
+    return messages
+
+
+class LLMBackend:
+    """Interface every provider implements."""
+
+    # Identifies the backend in status output and keys its circuit breaker
+    name = "backend"
+
+    async def generate(self, contents: List[Dict], usage: Optional[TokenUsage] = None) -> str:
+        """
+        Full reply text for a conversation (one attempt, no retries).
+
+        Args:
+            contents: Conversation in Gemini "contents" format
+            usage: If given, the call's token counts are added to it
+        """
+        raise NotImplementedError
+
+    async def stream(self, contents: List[Dict],
+                     usage: Optional[TokenUsage] = None) -> AsyncIterator[str]:
+        """Reply text chunks as the provider produces them."""
+        yield await self.generate(contents, usage)
+
+    def describe(self) -> dict:
+        """Provider details for get_status()."""
+        return {"name": self.name}
+
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini through a (shared) google-generativeai GenerativeModel."""
+
+    provider = "Google Gemini"
+
+    def __init__(self, model, model_name: str, system_cache=None, system_prompt: str = ""):
+        """
+        Args:
+            model: genai.GenerativeModel with the system prompt already set
+            model_name: Gemini model name
+            system_cache: Optional utils.context_cache.SystemPromptCache; while
+                it has a live cache, calls use the cached system prompt
+            system_prompt: The system prompt (for token estimates when the
+                response carries no usage metadata)
+        """
+        self.model = model
+        self.model_name = model_name
+        self.system_cache = system_cache
+        self.system_prompt_tokens = estimate_tokens(system_prompt) if system_prompt else 0
+        self.name = f"gemini:{model_name}"
+
+    async def _model_for_call(self):
+        """(model, cache handle or None) to use for the next call."""
+        if self.system_cache is not None:
+            handle = await self.system_cache.get_async()
+            if handle is not None:
+                return self.system_cache.provider.model_for(handle), handle
+        return self.model, None
+
+    def _record_usage(self, usage: Optional[TokenUsage], response, contents: List[Dict],
+                      handle, text: str):
+        if usage is None:
+            return
+        metadata = getattr(response, "usage_metadata", None)
+        prompt = getattr(metadata, "prompt_token_count", 0) if metadata else 0
+        if prompt:
+            cached = getattr(metadata, "cached_content_token_count", 0) or 0
+            usage.add(cached, prompt - cached, getattr(metadata, "candidates_token_count", 0) or 0)
+        else:
+            # No metadata (e.g. local stand-ins): estimate
+            cached = handle.token_count if handle else 0
+            fresh = contents_tokens(contents) + (0 if handle else self.system_prompt_tokens)
+            usage.add(cached, fresh, estimate_tokens(text))
+
+    async def generate(self, contents: List[Dict], usage: Optional[TokenUsage] = None) -> str:
+        model, handle = await self._model_for_call()
+        response = await model.generate_content_async(contents)
+        text = response.text
+        self._record_usage(usage, response, contents, handle, text)
+        return text
+
+    async def stream(self, contents: List[Dict],
+                     usage: Optional[TokenUsage] = None) -> AsyncIterator[str]:
+        model, handle = await self._model_for_call()
+        response = await model.generate_content_async(contents, stream=True)
+        parts = []
+        async for chunk in response:
+            if chunk.text:
+                parts.append(chunk.text)
+                yield chunk.text
+        self._record_usage(usage, response, contents, handle, "".join(parts))
+
+    def describe(self) -> dict:
+        info = {"name": self.name, "provider": self.provider, "model": self.model_name}
+        if self.system_cache is not None:
+            info["context_cache"] = self.system_cache.stats()
+        return info
+
+
+def _record_openai_usage(usage: Optional[TokenUsage], reported):
+    """Add an OpenAI-style usage block (object or dict) to a TokenUsage."""
+    if usage is None or not reported:
+        return
+    get = reported.get if isinstance(reported, dict) else (lambda k, d=None: getattr(reported, k, d))
+    details = get("prompt_tokens_details") or {}
+    cached = (details.get("cached_tokens") if isinstance(details, dict)
+              else getattr(details, "cached_tokens", 0)) or 0
+    prompt = get("prompt_tokens", 0) or 0
+    usage.add(cached, prompt - cached, get("completion_tokens", 0) or 0)
+
+
+class OpenAIBackend(LLMBackend):
+    """OpenAI chat completions through the official async SDK."""
+
+    provider = "OpenAI"
+
+    def __init__(self, api_key: str, model_name: str = "gpt-4o-mini",
+                 system_prompt: Optional[str] = None, base_url: Optional[str] = None,
+                 max_tokens: int = 400):
+        """
+        Args:
+            api_key: OpenAI API key
+            model_name: Chat model name
+            system_prompt: Sent as the first (system) message
+            base_url: Override the API endpoint (Azure/proxies)
+            max_tokens: Reply length cap
+        """
+        if not OPENAI_AVAILABLE:
+            raise ImportError("openai is required: pip install openai")
+        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url)
+        self.model_name = model_name
+        self.system_prompt = system_prompt
+        self.max_tokens = max_tokens
+        self.name = f"openai:{model_name}"
+
+    async def generate(self, contents: List[Dict], usage: Optional[TokenUsage] = None) -> str:
+        response = await self.client.chat.completions.create(
+            model=self.model_name, max_tokens=self.max_tokens,
+            messages=to_openai_messages(contents, self.system_prompt)
+        )
+        _record_openai_usage(usage, response.usage)
+        return response.choices[0].message.content or ""
+
+    async def stream(self, contents: List[Dict],
+                     usage: Optional[TokenUsage] = None) -> AsyncIterator[str]:
+        response = await self.client.chat.completions.create(
+            model=self.model_name, max_tokens=self.max_tokens, stream=True,
+            stream_options={"include_usage": True},
+            messages=to_openai_messages(contents, self.system_prompt)
+        )
+        async for chunk in response:
+            if chunk.usage:
+                _record_openai_usage(usage, chunk.usage)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def describe(self) -> dict:
+        return {"name": self.name, "provider": self.provider, "model": self.model_name}
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """
+    Any server speaking the OpenAI /chat/completions protocol over plain HTTP.
+
+    Covers local stand-ins (Ollama, llama.cpp server, vLLM, LM Studio) and
+    hosted OpenAI-compatible APIs, without needing the openai package.
+    """
+
+    provider = "OpenAI-compatible"
+
+    def __init__(self, base_url: str, model_name: str, api_key: Optional[str] = None,
+                 system_prompt: Optional[str] = None, max_tokens: int = 400):
+        """
+        Args:
+            base_url: API root, e.g. http://localhost:11434/v1
+            model_name: Model name understood by the server
+            api_key: Sent as a Bearer token if set
+            system_prompt: Sent as the first (system) message
+            max_tokens: Reply length cap
+        """
+        if not AIOHTTP_AVAILABLE:
+            raise ImportError("aiohttp is required: pip install aiohttp")
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.model_name = model_name
+        self.api_key = api_key
+        self.system_prompt = system_prompt
+        self.max_tokens = max_tokens
+        self.name = f"compat:{model_name}@{base_url}"
+        self._session: Optional["aiohttp.ClientSession"] = None
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        # One pooled session, created on (and bound to) the shared loop
+        if self._session is None or self._session.closed:
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+            self._session = aiohttp.ClientSession(headers=headers)
+        return self._session
+
+    def _payload(self, contents: List[Dict], stream: bool) -> dict:
+        payload = {
+            "model": self.model_name,
+            "messages": to_openai_messages(contents, self.system_prompt),
+            "max_tokens": self.max_tokens,
+            "stream": stream,
+        }
+        if stream:
+            payload["stream_options"] = {"include_usage": True}
+        return payload
+
+    async def generate(self, contents: List[Dict], usage: Optional[TokenUsage] = None) -> str:
+        async with self._get_session().post(self.url, json=self._payload(contents, False)) as response:
+            response.raise_for_status()
+            data = await response.json()
+        _record_openai_usage(usage, data.get("usage"))
+        return data["choices"][0]["message"].get("content") or ""
+
+    async def stream(self, contents: List[Dict],
+                     usage: Optional[TokenUsage] = None) -> AsyncIterator[str]:
+        async with self._get_session().post(self.url, json=self._payload(contents, True)) as response:
+            response.raise_for_status()
+            # Server-sent events: "data: {...}" lines, ending with "data: [DONE]"
+            async for raw in response.content:
+                line = raw.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                event = json.loads(data)
+                _record_openai_usage(usage, event.get("usage"))
+                choices = event.get("choices") or []
+                text = choices[0].get("delta", {}).get("content") if choices else None
+                if text:
+                    yield text
+
+    async def close(self):
+        """Close the pooled HTTP session."""
+        if self._session is not None:
+            await self._session.close()
+
+    def describe(self) -> dict:
+        return {"name": self.name, "provider": self.provider, "model": self.model_name,
+                "url": self.url}
+
+
+async def first_chunk(stream: AsyncIterator[str]) -> Tuple[bool, Optional[str]]:
+    """(True, chunk) for the stream's first chunk, (False, None) if it is empty."""
+    try:
+        return True, await stream.__anext__()
+    except StopAsyncIteration:
+        return False, None
+
+
+def censored_quantile(samples: Iterable[Tuple[float, bool]], quantile: float) -> float:
+    """
+    Kaplan-Meier estimate of a latency quantile when some requests never finished.
+
+    Args:
+        samples: (seconds, observed) pairs; observed is False for a censored
+            sample, i.e. a request abandoned after that long, whose latency is
+            only known to be longer
+        quantile: Quantile to estimate (0-1)
+
+    Returns:
+        Smallest observed latency whose estimated CDF reaches the quantile, or
+        the longest sample if censoring hides the tail
+    """
+    ordered = sorted(samples, key=lambda sample: (sample[0], not sample[1]))
+    at_risk = len(ordered)
+    survival = 1.0
+    for seconds, observed in ordered:
+        if observed:
+            survival *= 1 - 1 / at_risk
+            if 1 - survival >= quantile:
+                return seconds
+        at_risk -= 1
+    return ordered[-1][0]
+
+
+class HedgedBackend(LLMBackend):
+    """
+    Sends a request to a primary backend and, if it has not produced its first
+    token within a p95-derived delay, the same request to a secondary.
+
+    Whichever answers first wins and the other request is cancelled. The
+    delay tracks the primary's recent time-to-first-token, so only the slow
+    tail (about 5% of requests) pays for a second call. When the primary loses
+    or is cancelled, the time it had run is kept as a censored sample, so slow
+    requests still push the delay up instead of vanishing from the history.
+    """
+
+    def __init__(self, primary: LLMBackend, secondary: LLMBackend, quantile: float = 0.95,
+                 initial_delay: float = 2.0, min_delay: float = 0.05, max_delay: float = 10.0,
+                 window: int = 200, min_samples: int = 20):
+        """
+        Args:
+            primary: Backend tried first
+            secondary: Backend fired after the hedge delay
+            quantile: Quantile of the primary's latency used as the delay
+            initial_delay: Delay used until min_samples latencies are known
+            min_delay: Lower bound on the delay
+            max_delay: Upper bound on the delay
+            window: Recent latencies kept per mode
+            min_samples: Samples needed before the quantile is trusted
+        """
+        self.primary = primary
+        self.secondary = secondary
+        self.quantile = quantile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.name = f"hedged:{primary.name}|{secondary.name}"
+        # (seconds, observed) to first token (streaming) and to full reply (generate)
+        self._samples = {"stream": deque(maxlen=window), "generate": deque(maxlen=window)}
+        self.requests = 0
+        self.hedged = 0
+        self.secondary_wins = 0
+
+    def hedge_delay(self, mode: str = "stream") -> float:
+        """Seconds to wait for the primary before firing the secondary."""
+        samples = self._samples[mode]
+        if len(samples) < self.min_samples:
+            return self.initial_delay
+        delay = censored_quantile(samples, self.quantile)
+        return min(self.max_delay, max(self.min_delay, delay))
+
+    async def _race(self, mode: str, start) -> Tuple[int, object, list]:
+        """
+        Run start(backend) on the primary, hedge to the secondary after the
+        delay, and return (winner_index, result, handles).
+
+        start(backend) returns (awaitable, handle); the handle is whatever
+        must be closed if that side loses (e.g. its stream).
+        """
+        self.requests += 1
+        backends = [self.primary, self.secondary]
+        began = time.monotonic()
+        handles, tasks, errors = [], {}, []
+
+        def launch(index: int):
+            awaitable, handle = start(backends[index])
+            handles.append(handle)
+            tasks[asyncio.ensure_future(awaitable)] = index
+
+        launch(0)
+        delay = self.hedge_delay(mode)
+        try:
+            while tasks:
+                hedging = len(handles) < 2
+                done, _ = await asyncio.wait(tasks, timeout=delay if hedging else None,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Primary is slow: fire the secondary too
+                    self.hedged += 1
+                    launch(1)
+                    continue
+                for task in done:
+                    index = tasks.pop(task)
+                    if task.exception() is None:
+                        if index == 0:
+                            self._samples[mode].append((time.monotonic() - began, True))
+                        else:
+                            self.secondary_wins += 1
+                        return index, task.result(), handles
+                    errors.append(task.exception())
+                if hedging and not tasks:
+                    # Primary failed before the delay: go to the secondary now
+                    self.hedged += 1
+                    launch(1)
+            raise errors[-1]
+        finally:
+            if 0 in tasks.values():
+                # Primary lost or the request was cancelled: its latency is at least this
+                self._samples[mode].append((time.monotonic() - began, False))
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def generate(self, contents: List[Dict], usage: Optional[TokenUsage] = None) -> str:
+        _, text, _ = await self._race(
+            "generate", lambda backend: (backend.generate(contents, usage), None)
+        )
+        return text
+
+    async def stream(self, contents: List[Dict],
+                     usage: Optional[TokenUsage] = None) -> AsyncIterator[str]:
+        def start(backend):
+            stream = backend.stream(contents, usage)
+            return first_chunk(stream), stream
+
+        winner, (has_text, first), streams = await self._race("stream", start)
+        for index, loser in enumerate(streams):
+            if index != winner:
+                await loser.aclose()
+        stream = streams[winner]
+        try:
+            if has_text:
+                yield first
+                async for chunk in stream:
+                    yield chunk
+        finally:
+            await stream.aclose()
+
+    def describe(self) -> dict:
+        return {
+            "name": self.name,
+            "provider": "Hedged",
+            "primary": self.primary.describe(),
+            "secondary": self.secondary.describe(),
+            "hedge_delay_s": round(self.hedge_delay(), 3),
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "secondary_wins": self.secondary_wins,
+        }
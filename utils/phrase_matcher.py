@@ -0,0 +1,465 @@
+"""
+Phrase Matcher Module
+Compiled multi-phrase matcher used by the safety and routing layers
+Scans a message once, whatever the number of phrases
+"""
+
+import re
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# A word is a run of letters/digits, optionally joined by apostrophes ("don't").
+# Everything else (spaces, punctuation, emojis) acts as a word separator.
+WORD_PATTERN = re.compile(r"[^\W_]+(?:['’][^\W_]+)*")
+
+_APOSTROPHES = re.compile(r"['’]")
+
+# Leading characters of a chunk that may still belong to the previous word
+_WORD_CONTINUATION = re.compile(r"(?:[^\W_]|['’])*")
+
+
+class PhraseMatch(NamedTuple):
+    """A phrase found in a text, with its character span."""
+    phrase: str
+    start: int
+    end: int
+    fuzzy: bool = False
+
+
+def normalize_token(token: str) -> str:
+    """Normalize a single word so "Don’t", "don't" and "dont" compare equal."""
+    token = token.lower()
+    if "'" in token or "’" in token:
+        token = _APOSTROPHES.sub("", token)
+    return token
+
+
+def tokenize(text: str) -> List[Tuple[str, int, int]]:
+    """
+    Split text into normalized words with their character spans.
+
+    Args:
+        text: Raw text to tokenize
+
+    Returns:
+        List of (normalized_word, start, end) tuples
+    """
+    return [(normalize_token(m.group()), m.start(), m.end()) for m in WORD_PATTERN.finditer(text)]
+
+
+def phrase_tokens(phrase: str) -> Tuple[str, ...]:
+    """Normalized word sequence for a phrase ("self-harm" -> ("self", "harm"))."""
+    return tuple(normalize_token(m.group()) for m in WORD_PATTERN.finditer(phrase))
+
+
+def is_prefix_phrase(phrase: str) -> bool:
+    """True for phrases whose last word is a stem ("self-harm*" also matches "self-harming")."""
+    return phrase.rstrip().endswith("*")
+
+
+def bounded_edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Optimal string alignment distance (edits + adjacent swaps), capped.
+
+    Args:
+        a: First string
+        b: Second string
+        limit: Largest distance of interest
+
+    Returns:
+        The distance, or limit + 1 as soon as it is known to exceed limit
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous2 is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class NGramIndex:
+    """
+    Character n-gram index over a word vocabulary for typo correction.
+
+    Each vocabulary word is split into padded n-grams ("^ki", "kil", "ill",
+    "ll$") and posted under each gram. Correcting a word probes one posting
+    list per gram, keeps candidates that share enough grams to be within the
+    edit budget, and only runs the bounded edit distance on those few.
+    """
+
+    def __init__(self, vocabulary: Iterable[str], n: int = 2, min_word_len: int = 4,
+                 protected: Iterable[str] = (), cache_size: int = 4096):
+        """
+        Build the index.
+
+        Args:
+            vocabulary: Words that typos should be corrected to
+            n: Gram length (bigrams keep recall for short words like "wnat")
+            min_word_len: Shorter vocabulary words are never fuzzy-matched
+                (too many real words sit one edit away from "die" or "end")
+            protected: Real words that must never be "corrected" ("will")
+            cache_size: Number of corrections remembered between calls
+        """
+        vocabulary = set(vocabulary)
+        self.n = n
+        self.min_word_len = min_word_len
+        self.words = sorted(word for word in vocabulary if len(word) >= min_word_len)
+        self._exact = frozenset(vocabulary) | frozenset(normalize_token(w) for w in protected)
+        self._postings: Dict[str, List[int]] = {}
+        for index, word in enumerate(self.words):
+            for gram in set(self._grams(word)):
+                self._postings.setdefault(gram, []).append(index)
+        self._cache: Dict[str, Optional[str]] = {}
+        self._cache_size = cache_size
+
+    def _grams(self, word: str) -> List[str]:
+        padded = "^" + word + "$"  # len(word) + 3 - n grams
+        return [padded[i:i + self.n] for i in range(len(padded) - self.n + 1)]
+
+    @staticmethod
+    def max_distance(word: str) -> int:
+        """Edit budget for a vocabulary word: 1 for short words, 2 for long ones."""
+        return 1 if len(word) <= 7 else 2
+
+    def correct(self, token: str) -> Optional[str]:
+        """
+        Map a normalized word to the vocabulary word it is a typo of.
+
+        Args:
+            token: Normalized word from the message
+
+        Returns:
+            The closest vocabulary word within its edit budget, or None
+        """
+        if token in self._exact or len(token) < self.min_word_len - 1:
+            return None
+        cached = self._cache.get(token, self)
+        if cached is not self:
+            return cached
+
+        counts: Dict[int, int] = {}
+        postings = self._postings
+        for gram in set(self._grams(token)):
+            for index in postings.get(gram, ()):
+                counts[index] = counts.get(index, 0) + 1
+
+        best, best_distance = None, None
+        for index, shared in counts.items():
+            word = self.words[index]
+            limit = self.max_distance(word)
+            # Each edit (or swap) destroys at most n + 1 grams
+            if shared < max(len(token), len(word)) + 3 - self.n - (self.n + 1) * limit:
+                continue
+            distance = bounded_edit_distance(token, word, limit)
+            if distance <= limit and (best_distance is None or distance < best_distance):
+                best, best_distance = word, distance
+
+        if len(self._cache) >= self._cache_size:
+            self._cache.clear()
+        self._cache[token] = best
+        return best
+
+
+class PhraseMatcher:
+    """
+    Word-level Aho-Corasick automaton over a fixed list of phrases.
+
+    Phrases are compiled once into a trie of normalized words with failure
+    links, so scanning a message costs one dictionary lookup per word no
+    matter how many phrases are loaded. Matching is word-boundary aware
+    ("die" does not fire inside "diet"), and any run of whitespace or
+    punctuation between words is treated as a single separator.
+
+    A phrase ending in "*" matches any word starting with its last word, so
+    "overdos*" covers "overdose", "overdosed" and "overdosing". Stems are
+    checked against the word being scanned at the state reached by the
+    phrase's earlier words, so they add no extra pass.
+    """
+
+    def __init__(self, phrases: Iterable[str], fuzzy: bool = False,
+                 protected_words: Iterable[str] = (), fuzzy_words: Iterable[str] = ()):
+        """
+        Compile the matcher.
+
+        Args:
+            phrases: Phrases to look for (case and punctuation insensitive;
+                a trailing "*" makes the last word a stem)
+            fuzzy: Also precompute the n-gram index used for typo-tolerant
+                matching (otherwise built on first fuzzy scan)
+            protected_words: Real words the typo index must leave alone
+            fuzzy_words: Words typos are corrected to, e.g. full forms of
+                stems ("suicidal" for "suicid*"). Defaults to the single-word
+                phrases: words inside multi-word phrases are never targets,
+                since everyday words sit one edit away from them
+                ("putting" -> "cutting myself", "sending" -> "ending it all")
+        """
+        self._protected_words = tuple(protected_words)
+        self._fuzzy_words = frozenset(normalize_token(word) for word in fuzzy_words)
+        self.phrases: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Per state: (phrase_index, phrase_length_in_words) tuples ending here
+        self._out: List[Tuple[Tuple[int, int], ...]] = [()]
+        # Per state: (stem, phrase_index, phrase_length_in_words) for stem phrases
+        # whose next word may be any word starting with stem (merged along
+        # failure links, like _out)
+        self._stems: List[Tuple[Tuple[str, int, int], ...]] = [()]
+        self.max_phrase_words = 0
+
+        seen = {}
+        for phrase in phrases:
+            tokens = phrase_tokens(phrase)
+            key = (tokens, is_prefix_phrase(phrase))
+            if not tokens or key in seen:
+                continue
+            seen[key] = len(self.phrases)
+            self._add(tokens, len(self.phrases), prefix=key[1])
+            self.phrases.append(phrase)
+            self.max_phrase_words = max(self.max_phrase_words, len(tokens))
+
+        # Whole words only; stems are matched by prefix, never by the typo index
+        self.vocabulary = frozenset(word for (tokens, prefix) in seen
+                                    for word in (tokens[:-1] if prefix else tokens))
+        self.stems = frozenset(tokens[-1] for (tokens, prefix) in seen if prefix)
+        self._build_failure_links()
+        self._fuzzy_index = None
+        if fuzzy:
+            self._fuzzy_index = self._build_fuzzy_index()
+
+    @property
+    def fuzzy_index(self) -> NGramIndex:
+        """N-gram typo index over the phrase vocabulary."""
+        if self._fuzzy_index is None:
+            self._fuzzy_index = self._build_fuzzy_index()
+        return self._fuzzy_index
+
+    def _build_fuzzy_index(self) -> NGramIndex:
+        targets = self._fuzzy_words or {phrase_tokens(phrase)[0] for phrase in self.phrases
+                                        if len(phrase_tokens(phrase)) == 1 and not is_prefix_phrase(phrase)}
+        return NGramIndex(targets, protected=self._protected_words)
+
+    def _add(self, tokens: Tuple[str, ...], index: int, prefix: bool = False):
+        """Insert a phrase into the trie (all but its stem, for a prefix phrase)."""
+        state = 0
+        for token in (tokens[:-1] if prefix else tokens):
+            nxt = self._goto[state].get(token)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][token] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+                self._stems.append(())
+            state = nxt
+        if prefix:
+            self._stems[state] = self._stems[state] + ((tokens[-1], index, len(tokens)),)
+        else:
+            self._out[state] = self._out[state] + ((index, len(tokens)),)
+
+    def _build_failure_links(self):
+        """Breadth-first pass computing failure links and merged outputs."""
+        queue = deque(self._goto[0].values())
+        # Depth-1 states fail to the root, so they inherit its stems too
+        for state in queue:
+            self._stems[state] = self._stems[state] + self._stems[0]
+        while queue:
+            state = queue.popleft()
+            for token, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(token, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+                self._stems[nxt] = self._stems[nxt] + self._stems[self._fail[nxt]]
+
+    def __len__(self) -> int:
+        return len(self.phrases)
+
+    def step(self, state: int, token: str) -> int:
+        """Advance the automaton by one normalized word."""
+        goto = self._goto
+        fail = self._fail
+        while state and token not in goto[state]:
+            state = fail[state]
+        return goto[state].get(token, 0)
+
+    def outputs(self, state: int) -> Tuple[Tuple[int, int], ...]:
+        """(phrase_index, phrase_length_in_words) pairs completed at a state."""
+        return self._out[state]
+
+    def stem_outputs(self, state: int, token: str) -> List[Tuple[int, int]]:
+        """
+        Stem phrases completed by the next word.
+
+        Args:
+            state: State before the word (after the phrase's earlier words)
+            token: The normalized word
+
+        Returns:
+            (phrase_index, phrase_length_in_words) pairs whose stem the word starts with
+        """
+        return [(index, length) for stem, index, length in self._stems[state]
+                if token.startswith(stem)]
+
+    def iter_matches(self, text: str, fuzzy: bool = False) -> Iterator[PhraseMatch]:
+        """
+        Lazily yield every phrase occurrence in a single pass over the text.
+
+        Args:
+            text: Text to scan
+            fuzzy: Correct misspelled words ("suicdal") to the typo index's
+                words within a small edit distance before matching
+
+        Yields:
+            PhraseMatch for each occurrence, ordered by end position
+        """
+        state = 0
+        window = max(self.max_phrase_words, 1)
+        starts = deque(maxlen=window)
+        corrected = deque(maxlen=window)
+        index_ = self.fuzzy_index if fuzzy else None
+        stems = self._stems
+        for match in WORD_PATTERN.finditer(text):
+            token = normalize_token(match.group())
+            was_corrected = False
+            stem_hits = self.stem_outputs(state, token) if stems[state] else ()
+            if index_ is not None and not stem_hits:
+                correction = index_.correct(token)
+                if correction is not None:
+                    token, was_corrected = correction, True
+                    if stems[state]:
+                        stem_hits = self.stem_outputs(state, token)
+            starts.append(match.start())
+            corrected.append(was_corrected)
+            state = self.step(state, token)
+            for index, length in tuple(stem_hits) + self._out[state]:
+                is_fuzzy = fuzzy and any(corrected[i] for i in range(-length, 0))
+                yield PhraseMatch(self.phrases[index], starts[-length], match.end(), is_fuzzy)
+
+    def find_all(self, text: str, fuzzy: bool = False) -> List[PhraseMatch]:
+        """Return every phrase occurrence in the text."""
+        return list(self.iter_matches(text, fuzzy))
+
+    def search(self, text: str, fuzzy: bool = False) -> Optional[PhraseMatch]:
+        """Return the first phrase occurrence in the text, or None."""
+        return next(self.iter_matches(text, fuzzy), None)
+
+
+class PhraseStream:
+    """
+    Incremental scanner that is fed text in chunks (STT partials, LLM tokens).
+
+    Between chunks it keeps only the automaton state, the start offsets of the
+    last few words and the trailing partial word, so phrases that straddle a
+    chunk boundary are still found. A match is reported as soon as its last
+    word is terminated by a separator (or the stream is closed), since until
+    then "die" could still turn into "diet".
+    """
+
+    def __init__(self, matcher: PhraseMatcher):
+        """
+        Start a new stream.
+
+        Args:
+            matcher: Compiled phrase matcher to run incrementally
+        """
+        self.matcher = matcher
+        self._max_word_len = max((len(word) for word in matcher.vocabulary | matcher.stems), default=0)
+        self.reset()
+
+    def reset(self):
+        """Forget all stream state."""
+        self._state = 0
+        self._starts = deque(maxlen=max(self.matcher.max_phrase_words, 1))
+        self._pending = ""       # trailing partial word not yet terminated
+        self._offset = 0         # absolute offset of _pending[0]
+        self._skipping = False   # inside a word too long to match anything
+
+    def _consume(self, token: str, start: int, end: int) -> List[PhraseMatch]:
+        """Advance the automaton by one complete word at an absolute span."""
+        matcher = self.matcher
+        token = normalize_token(token)
+        stem_hits = matcher.stem_outputs(self._state, token)
+        self._starts.append(start)
+        self._state = matcher.step(self._state, token)
+        return [PhraseMatch(matcher.phrases[index], self._starts[-length], end)
+                for index, length in stem_hits + list(matcher.outputs(self._state))]
+
+    def feed(self, chunk: str) -> List[PhraseMatch]:
+        """
+        Scan the next chunk of text.
+
+        Args:
+            chunk: Newly arrived text
+
+        Returns:
+            Matches completed by this chunk (absolute character spans)
+        """
+        if not chunk:
+            return []
+
+        if self._skipping:
+            skipped = _WORD_CONTINUATION.match(chunk).end()
+            self._offset += skipped
+            if skipped == len(chunk):
+                return []
+            chunk = chunk[skipped:]
+            self._skipping = False
+
+        buffer = self._pending + chunk
+        base = self._offset
+        matches: List[PhraseMatch] = []
+        keep_from = len(buffer)
+
+        for match in WORD_PATTERN.finditer(buffer):
+            if not buffer[match.end():].strip("'’"):
+                # Word touches the end of the buffer: it may continue next chunk
+                keep_from = match.start()
+                break
+            matches.extend(self._consume(match.group(), base + match.start(), base + match.end()))
+
+        self._pending = buffer[keep_from:]
+        self._offset = base + keep_from
+
+        if len(self._pending) > self._max_word_len + 1:
+            # Longer than any phrase word: only a stem can still match it, and
+            # that is decided by its start, so consume it now and drop the
+            # rest of the word as it streams in
+            matches.extend(self._consume(self._pending, self._offset,
+                                         self._offset + len(self._pending)))
+            self._offset += len(self._pending)
+            self._pending = ""
+            self._skipping = True
+
+        return matches
+
+    def close(self) -> List[PhraseMatch]:
+        """
+        Flush the trailing word at end of stream.
+
+        Returns:
+            Matches completed by the final word
+        """
+        matches: List[PhraseMatch] = []
+        for match in WORD_PATTERN.finditer(self._pending):
+            matches.extend(self._consume(match.group(), self._offset + match.start(),
+                                         self._offset + match.end()))
+        self._offset += len(self._pending)
+        self._pending = ""
+        self._skipping = False
+        return matches
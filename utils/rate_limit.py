@@ -0,0 +1,243 @@
+"""
+Rate Limit Module
+Process-wide and per-session token buckets with a fair waiting queue
+
+Every model request needs one token from the global bucket (the deployment's
+quota) and one from its session's bucket. Requests that cannot be admitted
+wait in per-session FIFO queues that are served round-robin, so one chatty
+session cannot starve the others; a request that waits longer than the
+max wait is rejected and the caller answers locally instead.
+
+All waiting happens on the shared background loop (utils.async_runtime).
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Hashable, Optional
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request waited the maximum time without being admitted."""
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second, holding at most ``capacity``."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self, now: float) -> bool:
+        """Whether a token can be taken now."""
+        self._refill(now)
+        return self.tokens >= 1.0
+
+    def take(self):
+        """Take one token (call available() first)."""
+        self.tokens -= 1.0
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1.0 else (1.0 - self.tokens) / self.rate
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class FairRateLimiter:
+    """Global + per-session token buckets with round-robin queueing."""
+
+    def __init__(self, global_rate: float, global_burst: float, session_rate: float,
+                 session_burst: float, max_wait: float = 5.0, max_sessions: int = 10000):
+        """
+        Args:
+            global_rate: Requests per second for the whole process
+            global_burst: Requests the process may burst above its rate
+            session_rate: Requests per second for one session
+            session_burst: Requests one session may burst above its rate
+            max_wait: Seconds a request may queue before RateLimitExceeded
+            max_sessions: Idle session buckets kept before pruning full ones
+        """
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.session_rate = session_rate
+        self.session_burst = session_burst
+        self.max_wait = max_wait
+        self.max_sessions = max_sessions
+        self._sessions: Dict[Hashable, TokenBucket] = {}
+        # Sessions with waiters, in round-robin order -> their FIFO of futures
+        self._queues: "OrderedDict[Hashable, Deque[asyncio.Future]]" = OrderedDict()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self._waits: Deque[float] = deque(maxlen=1000)
+
+    def _bucket(self, session: Hashable) -> TokenBucket:
+        bucket = self._sessions.get(session)
+        if bucket is None:
+            if len(self._sessions) >= self.max_sessions:
+                self._prune()
+            bucket = TokenBucket(self.session_rate, self.session_burst)
+            self._sessions[session] = bucket
+        return bucket
+
+    def _prune(self):
+        """Forget sessions whose bucket is full again (they are idle)."""
+        now = time.monotonic()
+        for session in [s for s, b in self._sessions.items()
+                        if s not in self._queues and b.is_full(now)]:
+            del self._sessions[session]
+
+    async def acquire(self, session: Hashable, max_wait: Optional[float] = None) -> float:
+        """
+        Wait until the request may go upstream.
+
+        Args:
+            session: Session identity for the per-session bucket and queue
+            max_wait: Override the limiter's max wait (e.g. the time left
+                before the request deadline)
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            RateLimitExceeded: Not admitted within the max wait
+        """
+        now = time.monotonic()
+        bucket = self._bucket(session)
+        # Fast path: nobody is queued and both buckets have a token
+        if not self._queues and self.global_bucket.available(now) and bucket.available(now):
+            self.global_bucket.take()
+            bucket.take()
+            self.admitted += 1
+            self._waits.append(0.0)
+            return 0.0
+
+        limit = self.max_wait if max_wait is None else min(self.max_wait, max_wait)
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(session, deque()).append(future)
+        self.queued += 1
+        self._kick()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), max(0.0, limit))
+        except asyncio.TimeoutError:
+            # Admitted right at the deadline: keep the slot
+            if not future.done() or future.cancelled():
+                future.cancel()
+                self._discard(session, future)
+                self.rejected += 1
+                raise RateLimitExceeded(f"waited {limit:.1f}s for a rate-limit slot")
+        except asyncio.CancelledError:
+            future.cancel()
+            self._discard(session, future)
+            raise
+        waited = time.monotonic() - now
+        self._waits.append(waited)
+        return waited
+
+    def _discard(self, session: Hashable, future: asyncio.Future):
+        queue = self._queues.get(session)
+        if queue is None:
+            return
+        try:
+            queue.remove(future)
+        except ValueError:
+            pass
+        if not queue:
+            del self._queues[session]
+
+    def _kick(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+
+    async def _dispatch(self):
+        """Admit queued requests round-robin across sessions as tokens allow."""
+        while self._queues:
+            now = time.monotonic()
+            admitted_any = False
+            next_wait = None
+            for session in list(self._queues):
+                queue = self._queues.get(session)
+                while queue and queue[0].done():
+                    queue.popleft()
+                if not queue:
+                    self._queues.pop(session, None)
+                    continue
+                bucket = self._bucket(session)
+                if not self.global_bucket.available(now):
+                    next_wait = self.global_bucket.wait_time(now)
+                    break
+                if not bucket.available(now):
+                    wait = bucket.wait_time(now)
+                    next_wait = wait if next_wait is None else min(next_wait, wait)
+                    continue
+                self.global_bucket.take()
+                bucket.take()
+                queue.popleft().set_result(None)
+                self.admitted += 1
+                admitted_any = True
+                # Served: move to the back of the round-robin order
+                if queue:
+                    self._queues.move_to_end(session)
+                else:
+                    del self._queues[session]
+            if admitted_any or not self._queues:
+                continue
+            # Nothing admissible: sleep until a bucket refills or a new request arrives
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), next_wait or 0.01)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> dict:
+        """Queue depth, admissions and recent wait times (ms)."""
+        waits = sorted(self._waits)
+        count = len(waits)
+        return {
+            "queue_depth": sum(len(q) for q in self._queues.values()),
+            "waiting_sessions": len(self._queues),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(sum(waits) / count * 1000, 1) if count else 0.0,
+            "p95_wait_ms": round(waits[min(count - 1, int(0.95 * count))] * 1000, 1) if count else 0.0,
+            "max_wait_ms": round(waits[-1] * 1000, 1) if count else 0.0,
+        }
+
+
+_SHARED_LIMITER: Optional[FairRateLimiter] = None
+
+
+def get_rate_limiter() -> FairRateLimiter:
+    """
+    The process-wide limiter, configured from the environment.
+
+    Only use it from the shared background loop.
+    """
+    global _SHARED_LIMITER
+    if _SHARED_LIMITER is None:
+        _SHARED_LIMITER = FairRateLimiter(
+            global_rate=float(os.getenv("MINDEASE_GLOBAL_RPM", "600")) / 60,
+            global_burst=float(os.getenv("MINDEASE_GLOBAL_BURST", "20")),
+            session_rate=float(os.getenv("MINDEASE_SESSION_RPM", "12")) / 60,
+            session_burst=float(os.getenv("MINDEASE_SESSION_BURST", "3")),
+            max_wait=float(os.getenv("MINDEASE_RATE_MAX_WAIT", "5")),
+        )
+    return _SHARED_LIMITER
@@ -0,0 +1,268 @@
+"""
+Resilience Module
+Circuit breaker, retry budget and deadline-bounded retries for model backends
+
+When a backend is down, the breaker opens after a few consecutive failures
+and callers fail fast (straight to the local fallback) instead of each
+waiting out a timeout. After a cool-down one probe request is let through;
+its outcome closes the breaker again or re-opens it.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Exception class names (from any SDK) worth retrying: timeouts, overload, 5xx
+RETRYABLE_ERRORS = frozenset({
+    "TimeoutError", "ConnectionError", "ServiceUnavailable",
+    "ResourceExhausted", "DeadlineExceeded", "InternalServerError", "TooManyRequests",
+    "GatewayTimeout", "BadGateway", "APITimeoutError", "APIConnectionError",
+    "RateLimitError", "ClientConnectionError",
+})
+
+# HTTP statuses worth retrying, for errors that carry one (aiohttp, openai)
+RETRYABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a backend whose circuit is open."""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """True for transient errors (timeouts, overload, server errors, dropped connections)."""
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status", None) or getattr(error, "status_code", None)
+    if isinstance(status, int) and status in RETRYABLE_STATUSES:
+        return True
+    return any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__)
+
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures -> half-open probe -> closed."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 half_open_max_calls: int = 1):
+        """
+        Args:
+            name: Backend name, for status output
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds to stay open before letting a probe through
+            half_open_max_calls: Concurrent probe calls allowed while half-open
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        self.trips = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        """Current state; an open circuit past its cool-down reports half_open."""
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probes = 0
+
+    def allow(self) -> bool:
+        """
+        Whether a call may go to the backend now.
+
+        Every allowed call must be followed by record_success() or
+        record_failure().
+        """
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and self._probes < self.half_open_max_calls:
+                self._probes += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        """The backend answered: close the circuit."""
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probes = 0
+
+    def record_failure(self):
+        """The backend failed: open the circuit if over the threshold or probing."""
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.trips += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probes = 0
+
+    def release(self):
+        """An allowed call was cancelled before finishing: free its probe slot."""
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def snapshot(self) -> dict:
+        """State, failure count and seconds until the next probe."""
+        with self._lock:
+            self._maybe_half_open()
+            retry_in = 0.0
+            if self._state == self.OPEN:
+                retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "retry_in_s": round(retry_in, 1),
+                "trips": self.trips,
+                "rejected": self.rejected,
+            }
+
+
+class RetryBudget:
+    """
+    Caps retries to a fraction of traffic so retries cannot multiply load.
+
+    Every request deposits ``ratio`` tokens (up to ``max_tokens``); every
+    retry spends one.
+    """
+
+    def __init__(self, ratio: float = 0.2, max_tokens: float = 10.0):
+        """
+        Args:
+            ratio: Retries allowed per request, on average
+            max_tokens: Most retries that can be saved up for a burst
+        """
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.denied = 0
+
+    def deposit(self):
+        """Record one request."""
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        """Take one retry from the budget if any is left."""
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                self.retries += 1
+                return True
+            self.denied += 1
+            return False
+
+    def snapshot(self) -> dict:
+        """Tokens left and retry counters."""
+        with self._lock:
+            return {"tokens": round(self._tokens, 2), "retries": self.retries, "denied": self.denied}
+
+
+def backoff_delay(attempt: int, base: float = 0.25, cap: float = 4.0) -> float:
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2**attempt))."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+async def call_with_retries(attempt: Callable[[], Awaitable[T]], breaker: CircuitBreaker,
+                            budget: RetryBudget, deadline: float, max_retries: int = 2,
+                            attempt_timeout: Optional[float] = None) -> T:
+    """
+    Call a backend with a breaker check, per-attempt timeout and budgeted retries.
+
+    Args:
+        attempt: Starts one backend call
+        breaker: Circuit breaker for the backend
+        budget: Retry budget for the backend
+        deadline: time.monotonic() by which the whole call must be done
+        max_retries: Retries after the first attempt
+        attempt_timeout: Cap on a single attempt (default: the time left)
+
+    Returns:
+        The first successful result
+
+    Raises:
+        CircuitOpenError: The circuit is open
+        The last backend error, once retries, budget or time run out
+    """
+    budget.deposit()
+    retry = 0
+    while True:
+        if not breaker.allow():
+            raise CircuitOpenError(f"{breaker.name} circuit is open")
+        remaining = deadline - time.monotonic()
+        timeout = min(attempt_timeout, remaining) if attempt_timeout else remaining
+        try:
+            if timeout <= 0:
+                raise asyncio.TimeoutError()
+            result = await asyncio.wait_for(attempt(), timeout)
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except Exception as e:
+            if not is_retryable(e):
+                # The backend answered (e.g. a bad request); it is not down
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            delay = backoff_delay(retry)
+            if (retry >= max_retries or time.monotonic() + delay >= deadline
+                    or not budget.try_spend()):
+                raise
+            retry += 1
+            await asyncio.sleep(delay)
+            continue
+        breaker.record_success()
+        return result
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+_BUDGETS: Dict[str, RetryBudget] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Process-wide breaker for a backend, configured from the environment."""
+    with _REGISTRY_LOCK:
+        breaker = _BREAKERS.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name,
+                failure_threshold=int(os.getenv("MINDEASE_BREAKER_FAILURES", "5")),
+                reset_timeout=float(os.getenv("MINDEASE_BREAKER_RESET", "30")),
+            )
+            _BREAKERS[name] = breaker
+        return breaker
+
+
+def get_retry_budget(name: str) -> RetryBudget:
+    """Process-wide retry budget for a backend, configured from the environment."""
+    with _REGISTRY_LOCK:
+        budget = _BUDGETS.get(name)
+        if budget is None:
+            budget = RetryBudget(ratio=float(os.getenv("MINDEASE_RETRY_RATIO", "0.2")))
+            _BUDGETS[name] = budget
+        return budget
@@ -0,0 +1,387 @@
+"""
+Response Bank Module
+Offline retrieval over a curated bank of supportive responses
+Answers fallback turns (no model, or model unavailable) without any network call
+
+Every entry has cue text (what a user might say), the moods it suits and
+a response. The cues are indexed as L2-normalized TF-IDF vectors over word
+unigrams and bigrams, stored as an inverted index in flat NumPy arrays: a
+message is scored against every entry with one gather and one bincount,
+then filtered by mood. The arrays can be saved as .npy files and
+memory-mapped at startup; if they are missing or stale, the index is built
+from the bank in memory.
+
+Usage:
+    python -m utils.response_bank build                        # write the index files
+    python -m utils.response_bank query "exams tomorrow" --mood Stressed
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from utils.phrase_matcher import WORD_PATTERN, normalize_token
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_BANK_PATH = os.getenv("MINDEASE_RESPONSE_BANK",
+                              os.path.join(_ROOT, "data", "response_bank.jsonl"))
+DEFAULT_INDEX_DIR = os.getenv("MINDEASE_RESPONSE_INDEX",
+                              os.path.join(_ROOT, "models", "response_bank"))
+
+# Moods from the check-in, one bit each; an entry with no moods suits any mood
+MOODS = ("Stressed", "Sad", "Anxious", "Angry", "Tired")
+_MOOD_BITS = {mood: 1 << i for i, mood in enumerate(MOODS)}
+
+# Function words: kept inside bigrams ("can't sleep") but never matched alone
+STOP_WORDS = frozenset("""
+a about all am an and any are as at be been but by can cant could do does dont for
+from get got had has have he her him his how i if im in is it its ive just like me
+my no not of on or out really she so some than that the them then there they this
+to too up us very was we what whats when with would you your
+""".split())
+
+_ARRAYS = ("idf", "indptr", "entry_ids", "weights", "mood_bits")
+
+
+class BankMatch(NamedTuple):
+    """A retrieved bank entry."""
+    id: str
+    response: str
+    score: float
+
+
+def text_features(text: str) -> List[str]:
+    """
+    Index terms of a text: content words plus adjacent word pairs.
+
+    Args:
+        text: Cue text or user message
+
+    Returns:
+        Terms, with repeats (for term frequency)
+    """
+    words = [normalize_token(word) for word in WORD_PATTERN.findall(text)]
+    terms = [word for word in words if word not in STOP_WORDS]
+    terms.extend(f"{a} {b}" for a, b in zip(words, words[1:])
+                 if a not in STOP_WORDS or b not in STOP_WORDS)
+    return terms
+
+
+def _term_counts(text: str) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for term in text_features(text):
+        counts[term] = counts.get(term, 0) + 1
+    return counts
+
+
+def read_bank(path: str) -> List[dict]:
+    """Entries of a response bank JSONL file ("id", "moods", "cues", "response")."""
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entries.append(json.loads(line))
+    return entries
+
+
+def bank_digest(path: str) -> str:
+    """Fingerprint of a bank file, stored with its saved index."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ResponseBank:
+    """TF-IDF retrieval over bank entries, held in an inverted index of NumPy arrays."""
+
+    def __init__(self, entries: Sequence[dict], vocabulary: Sequence[str],
+                 arrays: Dict[str, "np.ndarray"], min_score: float = 0.18):
+        """
+        Initialize from bank entries and their index (see build()).
+
+        Args:
+            entries: Bank entries, in index order
+            vocabulary: Indexed terms, in column order
+            arrays: "idf" (per term), "indptr" (per term, into the postings),
+                "entry_ids" and "weights" (postings, grouped by term) and
+                "mood_bits" (per entry); may be memory maps
+            min_score: Cosine similarity below which lookup() returns None
+        """
+        if not NUMPY_AVAILABLE:
+            raise ImportError("numpy is required for the response bank")
+        if len(arrays["mood_bits"]) != len(entries) or len(arrays["indptr"]) != len(vocabulary) + 1:
+            raise ValueError("Index arrays do not match the bank")
+        self.ids = [entry["id"] for entry in entries]
+        self.responses = [entry["response"] for entry in entries]
+        self.vocabulary = list(vocabulary)
+        self._columns = {term: column for column, term in enumerate(self.vocabulary)}
+        self.min_score = min_score
+        self.idf = arrays["idf"]
+        self.indptr = arrays["indptr"]
+        self.entry_ids = arrays["entry_ids"]
+        self.weights = arrays["weights"]
+        self.mood_bits = arrays["mood_bits"]
+        self._mood_masks: Dict[str, "np.ndarray"] = {}
+
+    def __len__(self) -> int:
+        return len(self.responses)
+
+    @classmethod
+    def build(cls, entries: Sequence[dict], min_score: float = 0.18) -> "ResponseBank":
+        """
+        Index bank entries.
+
+        Args:
+            entries: Dicts with "id", "moods", "cues" and "response"
+            min_score: Cosine similarity below which lookup() returns None
+        """
+        if not NUMPY_AVAILABLE:
+            raise ImportError("numpy is required for the response bank")
+        columns: Dict[str, int] = {}
+        rows, cols, counts = [], [], []
+        mood_bits = np.zeros(len(entries), dtype=np.uint8)
+        for row, entry in enumerate(entries):
+            for term, count in _term_counts(entry["cues"]).items():
+                rows.append(row)
+                cols.append(columns.setdefault(term, len(columns)))
+                counts.append(count)
+            for mood in entry.get("moods", ()):
+                mood_bits[row] |= _MOOD_BITS.get(mood, 0)
+
+        rows = np.asarray(rows, dtype=np.int32)
+        cols = np.asarray(cols, dtype=np.int64)
+        document_freq = np.bincount(cols, minlength=len(columns))
+        idf = (np.log((1 + len(entries)) / (1 + document_freq)) + 1).astype(np.float32)
+
+        # Sublinear term frequency, then L2-normalize each entry's vector
+        weights = (1 + np.log(np.asarray(counts, dtype=np.float32))) * idf[cols]
+        norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=len(entries)))
+        weights = (weights / np.maximum(norms[rows], 1e-12)).astype(np.float32)
+
+        # Group postings by term (CSC layout) so a query gathers only its terms
+        order = np.argsort(cols, kind="stable")
+        indptr = np.zeros(len(columns) + 1, dtype=np.int64)
+        np.cumsum(document_freq, out=indptr[1:])
+        arrays = {
+            "idf": idf,
+            "indptr": indptr,
+            "entry_ids": rows[order],
+            "weights": weights[order],
+            "mood_bits": mood_bits,
+        }
+        return cls(entries, list(columns), arrays, min_score)
+
+    def save(self, index_dir: str, digest: str):
+        """
+        Write the index arrays as .npy files, plus the vocabulary and a meta.json.
+
+        Args:
+            index_dir: Directory to write to
+            digest: bank_digest() of the bank file, checked by load()
+        """
+        os.makedirs(index_dir, exist_ok=True)
+        arrays = {"idf": self.idf, "indptr": self.indptr, "entry_ids": self.entry_ids,
+                  "weights": self.weights, "mood_bits": self.mood_bits}
+        for name in _ARRAYS:
+            np.save(os.path.join(index_dir, f"{name}.npy"), np.asarray(arrays[name]))
+        with open(os.path.join(index_dir, "vocabulary.json"), "w", encoding="utf-8") as f:
+            json.dump(self.vocabulary, f, ensure_ascii=False)
+        with open(os.path.join(index_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"bank_sha256": digest, "entries": len(self),
+                       "terms": len(self.vocabulary)}, f, indent=2)
+
+    @classmethod
+    def load(cls, entries: Sequence[dict], index_dir: str, digest: str, mmap: bool = True,
+             min_score: float = 0.18) -> "ResponseBank":
+        """
+        Load an index saved with save().
+
+        Args:
+            entries: The bank the index was built from
+            index_dir: Directory written by save()
+            digest: bank_digest() of the bank file the entries were read from
+            mmap: Memory-map the arrays instead of reading them into memory
+            min_score: Cosine similarity below which lookup() returns None
+
+        Raises:
+            OSError: Index files are missing
+            ValueError: The index was built from a different bank
+        """
+        with open(os.path.join(index_dir, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("bank_sha256") != digest:
+            raise ValueError("index is stale (the bank has changed)")
+        with open(os.path.join(index_dir, "vocabulary.json"), "r", encoding="utf-8") as f:
+            vocabulary = json.load(f)
+        arrays = {name: np.load(os.path.join(index_dir, f"{name}.npy"),
+                                mmap_mode="r" if mmap else None)
+                  for name in _ARRAYS}
+        return cls(entries, vocabulary, arrays, min_score)
+
+    def scores(self, message: str) -> "np.ndarray":
+        """
+        Cosine similarity of a message to every entry.
+
+        Args:
+            message: User message
+
+        Returns:
+            float array with one score per entry
+        """
+        columns, counts = [], []
+        for term, count in _term_counts(message).items():
+            column = self._columns.get(term)
+            if column is not None:
+                columns.append(column)
+                counts.append(count)
+        if not columns:
+            return np.zeros(len(self))
+        columns = np.asarray(columns, dtype=np.int64)
+        query = (1 + np.log(np.asarray(counts, dtype=np.float32))) * self.idf[columns]
+        query /= np.sqrt(query @ query)
+
+        # Gather every posting of the query's terms in one pass
+        starts = self.indptr[columns]
+        lengths = self.indptr[columns + 1] - starts
+        total = int(lengths.sum())
+        offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(total)
+        return np.bincount(self.entry_ids[offsets],
+                           weights=self.weights[offsets] * np.repeat(query, lengths),
+                           minlength=len(self))
+
+    def _mood_mask(self, mood: str) -> "np.ndarray":
+        """1.0 for entries that suit a mood (or any mood), else 0.0; cached per mood."""
+        mask = self._mood_masks.get(mood)
+        if mask is None:
+            bit = _MOOD_BITS[mood]
+            allowed = (self.mood_bits == 0) | ((self.mood_bits & bit) != 0)
+            # Multiplying by a float mask is much faster than np.where on a bool one
+            mask = self._mood_masks[mood] = allowed.astype(np.float64)
+        return mask
+
+    def lookup(self, message: str, mood: Optional[str] = None,
+               top_k: int = 3) -> Optional[BankMatch]:
+        """
+        Best-matching response for a message.
+
+        Entries tagged for the user's mood (or for any mood) are preferred;
+        if none of them matches, all entries are considered. Among the top
+        matches that score close to the best one, one is picked at random
+        so repeated messages do not always get the same reply.
+
+        Args:
+            message: User message
+            mood: Current mood type if known
+            top_k: Near-best matches to choose from
+
+        Returns:
+            The match, or None if nothing scores above min_score
+        """
+        scores = self.scores(message)
+        mask = self._mood_mask(mood) if mood in _MOOD_BITS else None
+        if mask is not None:
+            filtered = scores * mask
+            if filtered.max(initial=0.0) >= self.min_score:
+                scores = filtered
+        best = float(scores.max(initial=0.0))
+        if best < self.min_score:
+            return None
+        candidates = np.flatnonzero(scores >= max(self.min_score, 0.9 * best))
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k)[:top_k]]
+        pick = int(random.choice(candidates))
+        return BankMatch(self.ids[pick], self.responses[pick], float(scores[pick]))
+
+
+def load_response_bank(bank_path: str = DEFAULT_BANK_PATH, index_dir: str = DEFAULT_INDEX_DIR,
+                       min_score: float = 0.18) -> ResponseBank:
+    """
+    Memory-map a saved index for the bank, or build one if it is missing or stale.
+
+    Args:
+        bank_path: Response bank JSONL file
+        index_dir: Directory written by `python -m utils.response_bank build`
+        min_score: Cosine similarity below which lookups return None
+    """
+    entries = read_bank(bank_path)
+    try:
+        return ResponseBank.load(entries, index_dir, bank_digest(bank_path), min_score=min_score)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ Response bank index unavailable ({e}). Building it in memory.")
+        return ResponseBank.build(entries, min_score=min_score)
+
+
+_SHARED_BANK: Optional[ResponseBank] = None
+_SHARED_LOADED = False
+_SHARED_LOCK = threading.Lock()
+
+
+def get_response_bank() -> Optional[ResponseBank]:
+    """
+    The process-wide response bank, loaded on first use.
+
+    Returns None if numpy is not installed or the bank file cannot be read
+    (the chatbot then uses its built-in templates only).
+    """
+    global _SHARED_BANK, _SHARED_LOADED
+    with _SHARED_LOCK:
+        if not _SHARED_LOADED and NUMPY_AVAILABLE:
+            _SHARED_LOADED = True
+            try:
+                _SHARED_BANK = load_response_bank(
+                    min_score=float(os.getenv("MINDEASE_RESPONSE_BANK_MIN_SCORE", "0.18"))
+                )
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Response bank unavailable: {e}")
+        return _SHARED_BANK
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(prog="python -m utils.response_bank",
+                                     description="Build or query the offline response bank index.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_cmd = commands.add_parser("build", help="Index the bank and write .npy files")
+    build_cmd.add_argument("--bank", default=DEFAULT_BANK_PATH)
+    build_cmd.add_argument("--out", default=DEFAULT_INDEX_DIR)
+
+    query_cmd = commands.add_parser("query", help="Show the best match for messages")
+    query_cmd.add_argument("messages", nargs="+")
+    query_cmd.add_argument("--mood", choices=MOODS)
+    query_cmd.add_argument("--bank", default=DEFAULT_BANK_PATH)
+    query_cmd.add_argument("--index", default=DEFAULT_INDEX_DIR)
+
+    args = parser.parse_args(argv)
+    if not NUMPY_AVAILABLE:
+        print("numpy is required: pip install numpy", file=sys.stderr)
+        return 1
+
+    if args.command == "build":
+        entries = read_bank(args.bank)
+        ResponseBank.build(entries).save(args.out, bank_digest(args.bank))
+        print(f"Indexed {len(entries)} responses, wrote {args.out}")
+    else:
+        bank = load_response_bank(args.bank, args.index)
+        for message in args.messages:
+            match = bank.lookup(message, args.mood)
+            print(f"{match.score:.3f}  {match.id}" if match else "-      (no match)", f" {message}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
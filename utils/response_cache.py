@@ -0,0 +1,316 @@
+"""
+Response Cache Module
+Process-wide cache of model replies to common first messages
+Near-duplicate openers ("i'm so stressed", "im soooo stressed") share an entry
+
+Lookups are exact on the normalized text first, then approximate: each
+message gets a MinHash signature over character shingles, and signatures
+are bucketed with LSH banding so only a handful of candidates are compared.
+Entries are scoped by (model, mood, intensity bucket), expire after a TTL
+and are evicted least-recently-used.
+
+The cache is shared by every user, so only short openers are cached, and a
+near hit must have exactly the same content words (negations included) as
+the cached message: "not doing well" never gets the reply for "doing well",
+and "hi I'm Priyanka" never gets the one for "hi I'm Priya".
+"""
+
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+from utils.phrase_matcher import WORD_PATTERN, normalize_token
+from utils.response_bank import STOP_WORDS
+
+_REPEATS = re.compile(r"(.)\1+")
+
+# Words that flip a message's meaning; kept as content words although most are stop words
+NEGATIONS = frozenset("""
+no not never nothing nobody none nor cant dont wont isnt arent wasnt werent didnt
+doesnt couldnt shouldnt wouldnt havent hasnt aint
+""".split())
+
+# Largest 32-bit prime; MinHash permutations are (a * x + b) mod this
+_PRIME = 4294967291
+
+
+def normalize_message(message: str) -> str:
+    """
+    Canonical form used as the cache key: lowercase words, single-spaced, with
+    repeated letters collapsed ("I'm SOOO stressed!!" -> "im so stresed").
+    """
+    words = (normalize_token(word) for word in WORD_PATTERN.findall(message))
+    return _REPEATS.sub(r"\1", " ".join(words))
+
+
+def content_words(message: str) -> frozenset:
+    """
+    Words of a message that carry its meaning: everything except stop words,
+    with negations kept and repeated letters collapsed ("SOOO tired" -> {"tired"}).
+    """
+    words = set()
+    for word in WORD_PATTERN.findall(message):
+        word = normalize_token(word)
+        collapsed = _REPEATS.sub(r"\1", word)
+        if word in NEGATIONS or collapsed in NEGATIONS or (
+                word not in STOP_WORDS and collapsed not in STOP_WORDS):
+            words.add(collapsed)
+    return frozenset(words)
+
+
+def intensity_bucket(intensity: Optional[int]) -> Optional[str]:
+    """Coarse intensity band so 4/10 and 5/10 share cached replies."""
+    if not intensity:
+        return None
+    if intensity <= 3:
+        return "low"
+    if intensity <= 6:
+        return "medium"
+    return "high"
+
+
+def cache_scope(model_name: str, mood: Optional[str], intensity: Optional[int]) -> Tuple:
+    """Entries only match within the same model, mood and intensity bucket."""
+    return (model_name, mood.lower() if mood else None, intensity_bucket(intensity))
+
+
+def shingles(text: str, k: int = 3) -> List[int]:
+    """Hashed character k-grams of a normalized text (padded, so short words count)."""
+    padded = f" {text} "
+    if len(padded) <= k:
+        return [zlib.crc32(padded.encode("utf-8"))]
+    return list({zlib.crc32(padded[i:i + k].encode("utf-8"))
+                 for i in range(len(padded) - k + 1)})
+
+
+class MinHasher:
+    """Fixed family of hash permutations producing MinHash signatures."""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        """
+        Args:
+            num_perm: Signature length (more = better Jaccard estimates)
+            seed: Seed for the permutation coefficients
+        """
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME))
+                       for _ in range(num_perm)]
+
+    def signature(self, text: str) -> Tuple[int, ...]:
+        """MinHash signature of a normalized text."""
+        hashes = shingles(text)
+        return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in self._perms)
+
+    @staticmethod
+    def similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+        """Estimated Jaccard similarity of two signatures."""
+        return sum(x == y for x, y in zip(sig_a, sig_b)) / len(sig_a)
+
+
+class CacheHit(NamedTuple):
+    """A cached reply and how similar its message was (1.0 = exact)."""
+    response: str
+    similarity: float
+
+
+class _Entry:
+    __slots__ = ("key", "scope", "signature", "words", "response", "expires")
+
+    def __init__(self, key, scope, signature, words, response, expires):
+        self.key = key
+        self.scope = scope
+        self.signature = signature
+        self.words = words
+        self.response = response
+        self.expires = expires
+
+
+class ResponseCache:
+    """Thread-safe TTL + LRU cache with near-duplicate (MinHash/LSH) lookup."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0,
+                 threshold: float = 0.8, num_perm: int = 64, bands: int = 16,
+                 max_chars: int = 40, max_words: int = 6):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_entries: Entries kept before least-recently-used eviction
+            ttl: Seconds an entry stays valid
+            threshold: Minimum estimated Jaccard similarity for a near hit
+            num_perm: MinHash signature length
+            bands: LSH bands (num_perm must be divisible by it); more bands
+                find lower-similarity candidates
+            max_chars: Longer messages are never cached or looked up
+            max_words: Messages with more words are never cached or looked up
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.bands = bands
+        self.max_chars = max_chars
+        self.max_words = max_words
+        self._rows = num_perm // bands
+        self._hasher = MinHasher(num_perm)
+        self._entries: "OrderedDict[Tuple, _Entry]" = OrderedDict()
+        self._buckets: Dict[Tuple, set] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _key(self, message: str) -> str:
+        """Normalized key, or "" if the message is too long to cache."""
+        if len(message.strip()) > self.max_chars:
+            return ""
+        key = normalize_message(message)
+        return key if key.count(" ") < self.max_words else ""
+
+    def _band_keys(self, scope: Hashable, signature: Tuple[int, ...]) -> List[Tuple]:
+        rows = self._rows
+        return [(scope, band, signature[band * rows:(band + 1) * rows])
+                for band in range(self.bands)]
+
+    def _remove(self, entry: _Entry):
+        self._entries.pop((entry.scope, entry.key), None)
+        for band_key in self._band_keys(entry.scope, entry.signature):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(entry.key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def get(self, message: str, scope: Hashable = None) -> Optional[CacheHit]:
+        """
+        Find a cached reply for this message or a near-duplicate of it.
+
+        A near-duplicate must also have the same content words.
+
+        Args:
+            message: Raw user message
+            scope: Only entries stored with the same scope can match
+
+        Returns:
+            CacheHit, or None on a miss (or if the message is too long to cache)
+        """
+        key = self._key(message)
+        if not key:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((scope, key))
+            if entry is not None and entry.expires > now:
+                self._entries.move_to_end((scope, key))
+                self.hits += 1
+                return CacheHit(entry.response, 1.0)
+            if entry is not None:
+                self._remove(entry)
+
+        signature = self._hasher.signature(key)
+        words = content_words(message)
+        with self._lock:
+            candidates = set()
+            for band_key in self._band_keys(scope, signature):
+                candidates.update(self._buckets.get(band_key, ()))
+            best, best_similarity = None, self.threshold
+            for candidate in candidates:
+                entry = self._entries.get((scope, candidate))
+                if entry is None:
+                    continue
+                if entry.expires <= now:
+                    self._remove(entry)
+                    continue
+                if entry.words != words:
+                    continue
+                similarity = MinHasher.similarity(signature, entry.signature)
+                if similarity >= best_similarity:
+                    best, best_similarity = entry, similarity
+            if best is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((scope, best.key))
+            self.hits += 1
+            self.near_hits += 1
+            return CacheHit(best.response, best_similarity)
+
+    def put(self, message: str, response: str, scope: Hashable = None):
+        """
+        Store a reply for a message (ignored if it is too long to cache).
+
+        Args:
+            message: Raw user message
+            response: Reply to serve for it and its near-duplicates
+            scope: Scope the entry belongs to
+        """
+        key = self._key(message)
+        if not key or not response:
+            return
+        signature = self._hasher.signature(key)
+        entry = _Entry(key, scope, signature, content_words(message), response,
+                       time.monotonic() + self.ttl)
+        with self._lock:
+            old = self._entries.get((scope, key))
+            if old is not None:
+                self._remove(old)
+            self._entries[(scope, key)] = entry
+            for band_key in self._band_keys(scope, signature):
+                self._buckets.setdefault(band_key, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                _, oldest = next(iter(self._entries.items()))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self) -> dict:
+        """Entry count and hit/miss counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+_SHARED_CACHE: Optional[ResponseCache] = None
+_SHARED_LOCK = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    The process-wide response cache, configured from the environment.
+
+    Returns None when MINDEASE_RESPONSE_CACHE is set to 0.
+    """
+    global _SHARED_CACHE
+    if os.getenv("MINDEASE_RESPONSE_CACHE", "1").lower() in ("0", "false", "no"):
+        return None
+    with _SHARED_LOCK:
+        if _SHARED_CACHE is None:
+            _SHARED_CACHE = ResponseCache(
+                max_entries=int(os.getenv("MINDEASE_RESPONSE_CACHE_SIZE", "1024")),
+                ttl=float(os.getenv("MINDEASE_RESPONSE_CACHE_TTL", "3600")),
+                threshold=float(os.getenv("MINDEASE_RESPONSE_CACHE_THRESHOLD", "0.8")),
+                max_chars=int(os.getenv("MINDEASE_RESPONSE_CACHE_MAX_CHARS", "40")),
+            )
+        return _SHARED_CACHE
@@ -0,0 +1,308 @@
+"""
+Severity Model Module
+Small CPU-only classifier that scores how distressed a message sounds (0-1)
+Runs alongside keyword crisis detection, with no network call
+
+Features are hashed word unigrams and bigrams; the model is a single linear
+layer stored as one float32 array (weights + bias) that is memory-mapped at
+load time. A batch of messages is scored with one matrix multiply.
+
+Usage:
+    python -m utils.severity_model build                 # lexicon-seeded weights
+    python -m utils.severity_model train labeled.jsonl   # fit on {"text", "label"} lines
+    python -m utils.severity_model score "I feel hopeless"
+"""
+
+import argparse
+import json
+import os
+import sys
+import zlib
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from utils.phrase_matcher import WORD_PATTERN, normalize_token, phrase_tokens
+
+# Number of hashed feature buckets (power of two; 4096 x float32 = 16 KB)
+N_FEATURES = 2 ** 12
+
+DEFAULT_WEIGHTS_PATH = os.getenv(
+    "MINDEASE_SEVERITY_WEIGHTS",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                 "models", "severity_weights.npy")
+)
+
+# Logit of an empty / neutral message (sigmoid(-3) ~ 0.05)
+DEFAULT_BIAS = -3.0
+
+
+@lru_cache(maxsize=65536)
+def _bucket(feature: str, n_features: int) -> int:
+    """Stable hash of a feature string into a bucket (crc32, not hash())."""
+    return zlib.crc32(feature.encode("utf-8")) & (n_features - 1)
+
+
+def feature_buckets(text: str, n_features: int = N_FEATURES) -> List[int]:
+    """
+    Hashed unigram + bigram feature buckets for a text.
+
+    Args:
+        text: Message text
+        n_features: Number of buckets
+
+    Returns:
+        Bucket index per feature occurrence (duplicates count twice)
+    """
+    words = [normalize_token(word) for word in WORD_PATTERN.findall(text)]
+    buckets = [_bucket(word, n_features) for word in words]
+    buckets.extend(_bucket(a + " " + b, n_features) for a, b in zip(words, words[1:]))
+    return buckets
+
+
+def _phrase_buckets(phrase: str, n_features: int) -> List[int]:
+    """Buckets that represent a lexicon phrase (its unigram, or its bigrams)."""
+    words = phrase_tokens(phrase)
+    if len(words) == 1:
+        return [_bucket(words[0], n_features)]
+    return [_bucket(a + " " + b, n_features) for a, b in zip(words, words[1:])]
+
+
+class SeverityClassifier:
+    """Hashed bag-of-words linear model returning a continuous severity score."""
+
+    def __init__(self, weights):
+        """
+        Initialize from a weight array.
+
+        Args:
+            weights: float32 array of length n_features + 1 (bias last);
+                may be a read-only memory map
+        """
+        if not NUMPY_AVAILABLE:
+            raise ImportError("numpy is required for the severity model")
+        n_features = len(weights) - 1
+        if n_features <= 0 or n_features & (n_features - 1):
+            raise ValueError(f"Expected 2**k + 1 weights, got {len(weights)}")
+        self.weights = weights
+        self.n_features = n_features
+        self._coef = weights[:-1]
+        self._bias = float(weights[-1])
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_WEIGHTS_PATH, mmap: bool = True) -> "SeverityClassifier":
+        """
+        Load weights saved with save().
+
+        Args:
+            path: .npy weights file
+            mmap: Memory-map the file instead of reading it into memory
+        """
+        return cls(np.load(path, mmap_mode="r" if mmap else None))
+
+    def save(self, path: str):
+        """Save weights as a float32 .npy file."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.save(path, np.asarray(self.weights, dtype=np.float32))
+
+    def featurize(self, messages: Sequence[str]):
+        """
+        Build the (batch, n_features) count matrix for a batch of messages.
+
+        Args:
+            messages: Message texts
+
+        Returns:
+            float32 numpy array of feature counts
+        """
+        flat = []
+        for row, message in enumerate(messages):
+            offset = row * self.n_features
+            flat.extend(offset + bucket for bucket in feature_buckets(message, self.n_features))
+        counts = np.bincount(np.asarray(flat, dtype=np.int64),
+                             minlength=len(messages) * self.n_features)
+        return counts.astype(np.float32).reshape(len(messages), self.n_features)
+
+    def score_batch(self, messages: Sequence[str]):
+        """
+        Score a batch of messages with one matrix multiply.
+
+        Args:
+            messages: Message texts
+
+        Returns:
+            numpy array of severity scores in [0, 1]
+        """
+        logits = self.featurize(messages) @ self._coef + self._bias
+        return 1.0 / (1.0 + np.exp(-logits))
+
+    def score(self, message: str) -> float:
+        """Severity score in [0, 1] for a single message."""
+        return float(self.score_batch([message])[0])
+
+    @property
+    def neutral_score(self) -> float:
+        """Score of a message with no known features (sigmoid of the bias)."""
+        return float(self.score_batch([""])[0])
+
+    def excess_batch(self, messages: Sequence[str]):
+        """
+        Scores rescaled so a neutral message is 0 and the maximum stays 1.
+
+        Args:
+            messages: Message texts
+
+        Returns:
+            numpy array in [0, 1]; anything at or below the neutral score is 0
+        """
+        # The empty message rides along in the same multiply as the baseline
+        scores = self.score_batch(list(messages) + [""])
+        neutral = scores[-1]
+        return np.clip((scores[:-1] - neutral) / (1.0 - neutral), 0.0, 1.0)
+
+
+def build_lexicon_weights(n_features: int = N_FEATURES,
+                          phrase_logits: Optional[Dict[str, float]] = None):
+    """
+    Seed weights from the curated crisis/distress lexicon.
+
+    Each phrase's logit is spread over the buckets that represent it, so a
+    message containing the phrase gets roughly that logit added.
+
+    Args:
+        n_features: Number of buckets
+        phrase_logits: Phrase -> logit contribution (defaults to the lexicon
+            in utils.crisis_detector)
+
+    Returns:
+        float32 weights array of length n_features + 1
+    """
+    if phrase_logits is None:
+        from utils.crisis_detector import (
+            DISTRESS_SIGNALS, SELF_HARM_KEYWORDS, SEVERE_DISTRESS_KEYWORDS, STEM_FORMS
+        )
+        phrase_logits = {phrase: 2.0 * weight for phrase, weight in DISTRESS_SIGNALS.items()}
+        phrase_logits.update({phrase: 4.0 for phrase in SEVERE_DISTRESS_KEYWORDS})
+        # Stemmed keywords ("overdos*") are seeded through their common forms
+        phrase_logits.update({form: 6.0 for phrase in SELF_HARM_KEYWORDS
+                              for form in STEM_FORMS.get(phrase, [phrase])})
+
+    weights = np.zeros(n_features + 1, dtype=np.float32)
+    for phrase, logit in phrase_logits.items():
+        buckets = _phrase_buckets(phrase, n_features)
+        for bucket in buckets:
+            weights[bucket] = max(weights[bucket], logit / len(buckets))
+    weights[-1] = DEFAULT_BIAS
+    return weights
+
+
+def train(texts: Sequence[str], labels: Sequence[float], n_features: int = N_FEATURES,
+          epochs: int = 200, learning_rate: float = 0.5, l2: float = 1e-4,
+          initial_weights=None):
+    """
+    Fit the linear model with full-batch logistic regression.
+
+    Args:
+        texts: Training messages
+        labels: Target severity per message (0-1)
+        n_features: Number of buckets
+        epochs: Gradient steps
+        learning_rate: Step size
+        l2: L2 penalty on the coefficients
+        initial_weights: Warm start (defaults to the lexicon seed)
+
+    Returns:
+        float32 weights array of length n_features + 1
+    """
+    if initial_weights is None:
+        initial_weights = build_lexicon_weights(n_features)
+    model = SeverityClassifier(np.array(initial_weights, dtype=np.float32))
+    features = model.featurize(texts)
+    targets = np.asarray(labels, dtype=np.float32)
+    coef, bias = model._coef, model._bias
+
+    for _ in range(epochs):
+        predictions = 1.0 / (1.0 + np.exp(-(features @ coef + bias)))
+        error = predictions - targets
+        coef -= learning_rate * (features.T @ error / len(targets) + l2 * coef)
+        bias -= learning_rate * float(error.mean())
+
+    weights = np.empty(n_features + 1, dtype=np.float32)
+    weights[:-1] = coef
+    weights[-1] = bias
+    return weights
+
+
+_DEFAULT_CLASSIFIER: Optional[SeverityClassifier] = None
+
+
+def get_default_classifier() -> Optional[SeverityClassifier]:
+    """
+    Shared classifier, memory-mapped from DEFAULT_WEIGHTS_PATH on first use.
+
+    Falls back to lexicon-seeded weights if the file is missing, and returns
+    None if numpy is not installed.
+    """
+    global _DEFAULT_CLASSIFIER
+    if _DEFAULT_CLASSIFIER is None and NUMPY_AVAILABLE:
+        try:
+            _DEFAULT_CLASSIFIER = SeverityClassifier.load(DEFAULT_WEIGHTS_PATH)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Severity weights unavailable ({e}). Using lexicon weights.")
+            _DEFAULT_CLASSIFIER = SeverityClassifier(build_lexicon_weights())
+    return _DEFAULT_CLASSIFIER
+
+
+def _read_labeled(path: str) -> Iterable[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(prog="python -m utils.severity_model",
+                                     description="Build, train or try the local severity model.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_cmd = commands.add_parser("build", help="Write lexicon-seeded weights")
+    build_cmd.add_argument("--out", default=DEFAULT_WEIGHTS_PATH)
+
+    train_cmd = commands.add_parser("train", help="Fit on JSONL lines with 'text' and 'label'")
+    train_cmd.add_argument("data")
+    train_cmd.add_argument("--out", default=DEFAULT_WEIGHTS_PATH)
+    train_cmd.add_argument("--epochs", type=int, default=200)
+
+    score_cmd = commands.add_parser("score", help="Score messages")
+    score_cmd.add_argument("messages", nargs="+")
+    score_cmd.add_argument("--weights", default=DEFAULT_WEIGHTS_PATH)
+
+    args = parser.parse_args(argv)
+    if not NUMPY_AVAILABLE:
+        print("numpy is required: pip install numpy", file=sys.stderr)
+        return 1
+
+    if args.command == "build":
+        SeverityClassifier(build_lexicon_weights()).save(args.out)
+        print(f"Wrote {args.out}")
+    elif args.command == "train":
+        rows = list(_read_labeled(args.data))
+        weights = train([r["text"] for r in rows], [float(r["label"]) for r in rows],
+                        epochs=args.epochs)
+        SeverityClassifier(weights).save(args.out)
+        print(f"Trained on {len(rows)} messages, wrote {args.out}")
+    else:
+        model = SeverityClassifier.load(args.weights)
+        for message, score in zip(args.messages, model.score_batch(args.messages)):
+            print(f"{score:.3f}  {message}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
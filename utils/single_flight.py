@@ -0,0 +1,168 @@
+"""
+Single-Flight Module
+Coalesces identical concurrent async calls into one upstream call
+
+All callers must run on the same event loop (the shared background loop
+from utils.async_runtime), which is what makes coalescing work across
+Streamlit session threads: every session's model call is a coroutine on
+that one loop, so a plain dict of in-flight tasks is enough.
+"""
+
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class _Broadcast:
+    """Chunks produced by one upstream stream, replayed to every subscriber."""
+
+    def __init__(self):
+        self.parts: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Event()
+        self.subscribers = 0
+        self.on_abandoned: Optional[Callable[[], None]] = None
+
+    def publish(self, part: Optional[str] = None, error: Optional[BaseException] = None,
+                done: bool = False):
+        if part is not None:
+            self.parts.append(part)
+        if error is not None:
+            self.error = error
+        self.done = self.done or done or error is not None
+        # Wake current waiters, then re-arm for the next chunk
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        self.subscribers += 1
+        try:
+            index = 0
+            while True:
+                while index < len(self.parts):
+                    yield self.parts[index]
+                    index += 1
+                if self.error is not None:
+                    raise self.error
+                if self.done:
+                    return
+                await self.changed.wait()
+        finally:
+            self.subscribers -= 1
+            if not self.subscribers and not self.done and self.on_abandoned is not None:
+                self.on_abandoned()
+
+
+class SingleFlight:
+    """
+    At most one in-flight upstream call per key.
+
+    The first caller for a key starts the call; callers arriving while it
+    runs await the same result (or exception). The key is forgotten as soon
+    as the call finishes, so later calls go upstream again.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self._streams: Dict[Hashable, _Broadcast] = {}
+        self._pumps = set()   # strong refs so running pump tasks are not collected
+        self.calls = 0
+        self.upstream_calls = 0
+        self.coalesced = 0
+        self.abandoned = 0
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run call() once for all concurrent callers with the same key.
+
+        Args:
+            key: Identity of the request (equal keys must mean equal requests)
+            call: Starts the upstream call; only invoked by the first caller
+
+        Returns:
+            The shared result; the shared exception is raised to every caller
+        """
+        self.calls += 1
+        task = self._calls.get(key)
+        if task is None:
+            self.upstream_calls += 1
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+        else:
+            self.coalesced += 1
+        # A caller giving up (timeout, cancelled session) must not cancel
+        # the call the other callers are waiting on
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        self._calls.pop(key, None)
+        # Mark the exception retrieved even if every caller already gave up
+        if not task.cancelled():
+            task.exception()
+
+    def stream(self, key: Hashable, call: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """
+        Share one upstream stream between all concurrent callers with the same key.
+
+        Late joiners first receive the chunks already produced, then the rest
+        live. The upstream stream is consumed by its own task, so callers that
+        stop iterating early do not cut it off for the others; once the last
+        caller has closed its iterator the upstream call is cancelled. Close
+        iterators you stop reading early (aclose()), or this cannot happen.
+
+        Args:
+            key: Identity of the request
+            call: Returns the upstream async iterator; only invoked once
+
+        Returns:
+            Async iterator over the shared chunks
+        """
+        self.calls += 1
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            self.upstream_calls += 1
+            broadcast = _Broadcast()
+            self._streams[key] = broadcast
+            pump = asyncio.ensure_future(self._pump(key, call, broadcast))
+            self._pumps.add(pump)
+            pump.add_done_callback(self._pumps.discard)
+            broadcast.on_abandoned = lambda: self._abandon(key, broadcast, pump)
+        else:
+            self.coalesced += 1
+        return broadcast.subscribe()
+
+    def _abandon(self, key: Hashable, broadcast: _Broadcast, pump: asyncio.Task):
+        """Every caller stopped reading: cancel the upstream stream."""
+        # New callers for the key start a fresh upstream call
+        if self._streams.get(key) is broadcast:
+            del self._streams[key]
+        self.abandoned += 1
+        pump.cancel()
+
+    async def _pump(self, key: Hashable, call: Callable[[], AsyncIterator[str]],
+                    broadcast: _Broadcast):
+        try:
+            async for part in call():
+                broadcast.publish(part)
+        except BaseException as e:
+            broadcast.publish(error=e)
+            if not isinstance(e, Exception):
+                raise
+        else:
+            broadcast.publish(done=True)
+        finally:
+            if self._streams.get(key) is broadcast:
+                del self._streams[key]
+
+    def stats(self) -> dict:
+        """Call counters: total, sent upstream, coalesced, currently in flight."""
+        return {
+            "calls": self.calls,
+            "upstream_calls": self.upstream_calls,
+            "coalesced": self.coalesced,
+            "abandoned": self.abandoned,
+            "in_flight": len(self._calls) + len(self._streams),
+        }
@@ -0,0 +1,348 @@
+"""
+Telemetry Module
+Structured per-turn records for MindEaseAI, fanned out to pluggable sinks
+
+Each chat turn produces one TurnRecord: which tier answered (local, cache,
+model, fallback), the backend, time spent queued for a rate-limit or
+concurrency slot, time to first token, total latency, token counts, why a
+fallback happened, whether the response cache hit and whether the reply
+completed or was cut off by its reader. Sinks keep the most
+recent records in memory, append them to a JSONL file, or aggregate them
+into Prometheus-style counters and histograms.
+
+Recording is a few attribute writes plus one call per sink; the JSONL sink
+buffers lines and writes them in batches on its own writer thread, so a
+turn finishing on the event loop never waits on file I/O.
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from utils.llm_backends import TokenUsage
+
+
+class TurnRecord:
+    """Measurements for one chat turn."""
+
+    __slots__ = ("timestamp", "started", "session", "backend", "mode", "tier", "cache",
+                 "queue_wait", "ttft", "latency", "usage", "fallback_reason", "coalesced",
+                 "outcome")
+
+    def __init__(self, session: str, backend: Optional[str], mode: str):
+        """
+        Args:
+            session: Session id
+            backend: Backend name (None when no model is configured)
+            mode: "text" or "stream"
+        """
+        self.timestamp = time.time()
+        self.started = time.perf_counter()
+        self.session = session
+        self.backend = backend
+        self.mode = mode
+        self.tier: Optional[str] = None
+        self.cache = "skip"              # hit / miss / skip (not eligible)
+        self.queue_wait = 0.0
+        self.ttft: Optional[float] = None
+        self.latency: Optional[float] = None
+        self.usage = TokenUsage()
+        self.fallback_reason: Optional[str] = None
+        self.coalesced = False
+        self.outcome: Optional[str] = None  # completed / cut_off / cancelled
+
+    def first_token(self):
+        """Mark the first text reaching the user."""
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self.started
+
+    def finish(self, tier: str, fallback_reason: Optional[str] = None,
+               outcome: str = "completed"):
+        """
+        Close the record with the tier that answered.
+
+        Args:
+            tier: Tier that answered
+            fallback_reason: Why the turn fell back, if it did
+            outcome: "completed", "cut_off" (the reader stopped the stream,
+                e.g. the output crisis screen) or "cancelled"
+        """
+        self.latency = time.perf_counter() - self.started
+        if self.ttft is None:
+            self.ttft = self.latency
+        self.tier = tier
+        self.fallback_reason = fallback_reason
+        self.outcome = outcome
+
+    def as_dict(self) -> dict:
+        return {
+            "ts": round(self.timestamp, 3),
+            "session": self.session,
+            "backend": self.backend,
+            "mode": self.mode,
+            "tier": self.tier,
+            "cache": self.cache,
+            "coalesced": self.coalesced,
+            "queue_wait_ms": round(self.queue_wait * 1000, 2),
+            "ttft_ms": round(self.ttft * 1000, 2) if self.ttft is not None else None,
+            "latency_ms": round(self.latency * 1000, 2) if self.latency is not None else None,
+            "cached_input_tokens": self.usage.cached_input,
+            "uncached_input_tokens": self.usage.uncached_input,
+            "output_tokens": self.usage.output,
+            "fallback_reason": self.fallback_reason,
+            "outcome": self.outcome,
+        }
+
+
+class TelemetrySink:
+    """Receives every finished TurnRecord."""
+
+    def emit(self, record: TurnRecord):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class RingBufferSink(TelemetrySink):
+    """Keeps the most recent records in memory (for the UI / debugging)."""
+
+    def __init__(self, capacity: int = 1000):
+        self._records = deque(maxlen=capacity)
+
+    def emit(self, record: TurnRecord):
+        self._records.append(record)
+
+    def recent(self, n: Optional[int] = None) -> List[dict]:
+        """The last n records (all kept records by default), oldest first."""
+        records = list(self._records)
+        if n is not None:
+            records = records[-n:]
+        return [record.as_dict() for record in records]
+
+
+class JsonlSink(TelemetrySink):
+    """Appends one JSON line per record to a file, written in batches by a writer thread."""
+
+    def __init__(self, path: str, flush_every: int = 50, flush_interval: float = 5.0):
+        """
+        Args:
+            path: JSONL file to append to
+            flush_every: Write after this many buffered records
+            flush_interval: ... or when the oldest buffered record is this old
+        """
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._buffer: List[str] = []
+        self._oldest = 0.0
+        self._lock = threading.Lock()
+        self._batches: "queue.Queue[Optional[List[str]]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self.write_errors = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def emit(self, record: TurnRecord):
+        line = json.dumps(record.as_dict(), ensure_ascii=False)
+        with self._lock:
+            if not self._buffer:
+                self._oldest = time.monotonic()
+            self._buffer.append(line)
+            due = (len(self._buffer) >= self.flush_every
+                   or time.monotonic() - self._oldest >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Hand buffered records to the writer thread (does not wait for the write)."""
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+            if not lines:
+                return
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_batches,
+                                                name="mindease-telemetry", daemon=True)
+                self._writer.start()
+            self._batches.put(lines)
+
+    def _write_batches(self):
+        while True:
+            lines = self._batches.get()
+            if lines is None:
+                return
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("\n".join(lines) + "\n")
+            except OSError as e:
+                self.write_errors += 1
+                if self.write_errors == 1:
+                    print(f"⚠️ Telemetry JSONL write to {self.path} failed: {e}")
+
+    def close(self):
+        """Write everything buffered and stop the writer thread."""
+        self.flush()
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._batches.put(None)
+            writer.join(timeout=5)
+
+
+# Histogram buckets (seconds)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class PrometheusSink(TelemetrySink):
+    """Aggregates records into counters and histograms in Prometheus text format."""
+
+    def __init__(self, prefix: str = "mindease", buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], _Histogram] = {}
+
+    def _inc(self, name: str, labels: Tuple[Tuple[str, str], ...], value: float = 1.0):
+        key = (name, labels)
+        self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def _observe(self, name: str, labels: Tuple[Tuple[str, str], ...], value: float):
+        key = (name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = _Histogram(self.buckets)
+        histogram.observe(value)
+
+    def emit(self, record: TurnRecord):
+        backend = record.backend or "none"
+        tier = (("tier", record.tier or "unknown"),)
+        with self._lock:
+            self._inc("turns_total", (("backend", backend),) + tier)
+            self._inc("response_cache_total", (("result", record.cache),))
+            self._inc("turn_outcomes_total", (("outcome", record.outcome or "unknown"),))
+            if record.fallback_reason:
+                self._inc("fallbacks_total", (("reason", record.fallback_reason),))
+            if record.coalesced:
+                self._inc("coalesced_total", ())
+            usage = record.usage
+            self._inc("tokens_total", (("kind", "cached_input"),), usage.cached_input)
+            self._inc("tokens_total", (("kind", "uncached_input"),), usage.uncached_input)
+            self._inc("tokens_total", (("kind", "output"),), usage.output)
+            self._observe("turn_latency_seconds", tier, record.latency or 0.0)
+            self._observe("ttft_seconds", tier, record.ttft or 0.0)
+            if record.tier == "model":
+                self._observe("queue_wait_seconds", (), record.queue_wait)
+
+    @staticmethod
+    def _labels(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+        parts = [f'{key}="{value}"' for key, value in labels]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def render(self) -> str:
+        """Current metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self._counters}):
+                metric = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {metric} counter")
+                for (key, labels), value in sorted(self._counters.items()):
+                    if key == name:
+                        lines.append(f"{metric}{self._labels(labels)} {value:g}")
+            for name in sorted({name for name, _ in self._histograms}):
+                metric = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {metric} histogram")
+                for (key, labels), histogram in sorted(self._histograms.items(), key=lambda kv: kv[0]):
+                    if key != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        bucket_labels = self._labels(labels, 'le="%s"' % le)
+                        lines.append(f"{metric}_bucket{bucket_labels} {cumulative}")
+                    lines.append(f"{metric}_sum{self._labels(labels)} {histogram.total:.6f}")
+                    lines.append(f"{metric}_count{self._labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+class Telemetry:
+    """Fans finished TurnRecords out to every registered sink."""
+
+    def __init__(self, sinks: Sequence[TelemetrySink] = (), enabled: bool = True):
+        self.sinks: List[TelemetrySink] = list(sinks)
+        self.enabled = enabled
+        self.sink_errors = 0
+
+    def add_sink(self, sink: TelemetrySink):
+        self.sinks.append(sink)
+
+    def emit(self, record: TurnRecord):
+        """Send a finished record to all sinks; a failing sink never breaks a turn."""
+        if not self.enabled:
+            return
+        for sink in self.sinks:
+            try:
+                sink.emit(record)
+            except Exception as e:
+                self.sink_errors += 1
+                if self.sink_errors == 1:
+                    print(f"⚠️ Telemetry sink {type(sink).__name__} failed: {e}")
+
+    def sink(self, kind: type) -> Optional[TelemetrySink]:
+        """First registered sink of a type (e.g. PrometheusSink)."""
+        for sink in self.sinks:
+            if isinstance(sink, kind):
+                return sink
+        return None
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+_SHARED_TELEMETRY: Optional[Telemetry] = None
+_SHARED_LOCK = threading.Lock()
+
+
+def get_telemetry() -> Telemetry:
+    """
+    The process-wide telemetry, configured from the environment.
+
+    Always keeps a ring buffer and Prometheus-style metrics; also writes
+    JSONL when MINDEASE_TELEMETRY_JSONL is set. MINDEASE_TELEMETRY=0
+    turns recording off.
+    """
+    global _SHARED_TELEMETRY
+    with _SHARED_LOCK:
+        if _SHARED_TELEMETRY is None:
+            enabled = os.getenv("MINDEASE_TELEMETRY", "1").lower() not in ("0", "false", "no")
+            sinks: List[TelemetrySink] = [RingBufferSink(), PrometheusSink()]
+            jsonl_path = os.getenv("MINDEASE_TELEMETRY_JSONL")
+            if jsonl_path:
+                sinks.append(JsonlSink(jsonl_path))
+            _SHARED_TELEMETRY = Telemetry(sinks, enabled=enabled)
+            atexit.register(_SHARED_TELEMETRY.close)
+        return _SHARED_TELEMETRY
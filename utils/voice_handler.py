@@ -2,13 +2,40 @@
 Voice Handler Module
 Handles speech-to-text and text-to-speech functionality
 Uses Edge TTS for natural sounding voices
+
+Synthesis runs on one long-lived event loop thread shared by every
+VoiceHandler in the process (the voice worker), separate from the chat
+runtime so slow speech never delays model calls. At most
+MINDEASE_TTS_MAX_CONCURRENT syntheses run at once and at most
+MINDEASE_TTS_MAX_QUEUED more wait for a slot; beyond that new jobs are
+rejected rather than piling up.
+
+Long texts can be synthesized in pipelined mode: the text is split at
+sentence boundaries, the pieces are synthesized concurrently, and each
+piece's MP3 is handed out in order as soon as it is ready. MP3 frames are
+self-contained, so the pieces concatenate into one playable stream without
+re-encoding. One engine speaks the whole text: if a piece fails before any
+audio is out, the whole text is redone with the next engine.
+
+Pipelining only shortens time-to-audio for callers that play chunks as they
+arrive (speak_stream). The Streamlit app plays whole files with st.audio,
+so it uses the capped mode; long static texts reach it in full from the
+pre-rendered asset bundle instead.
 """
 
+import asyncio
+import atexit
+import concurrent.futures
+import io
 import os
+import re
 import tempfile
 import threading
-import asyncio
-from typing import Optional, Tuple
+from typing import AsyncIterator, Awaitable, Iterator, List, Optional, Tuple, TypeVar
+
+from utils.async_runtime import BackgroundLoop
+from utils.audio_assets import AssetBundle, get_audio_assets
+from utils.audio_cache import AudioCache, audio_key, get_audio_cache
 
 # Edge TTS (Natural sounding voices)
 try:
@@ -50,15 +77,232 @@ VOICE_OPTIONS = {
 # Default to a warm, calming voice for mental wellness
 DEFAULT_VOICE = "en-US-JennyNeural"
 
+# Syntheses in flight at once, and jobs allowed to wait for a slot
+TTS_MAX_CONCURRENT = int(os.getenv("MINDEASE_TTS_MAX_CONCURRENT", "8"))
+TTS_MAX_QUEUED = int(os.getenv("MINDEASE_TTS_MAX_QUEUED", "64"))
+
+# Pipelined mode: pieces synthesized at once per text, and target piece length
+TTS_PIPELINE_WORKERS = int(os.getenv("MINDEASE_TTS_PIPELINE_WORKERS", "3"))
+SPEECH_CHUNK_CHARS = 250
+
+# Speech is truncated here outside pipelined mode
+SPEECH_MAX_CHARS = 500
+
+SENTENCE_END = re.compile(r'(?<=[.!?;:])\s+')
+
+T = TypeVar("T")
+
+
+class SynthesisQueueFull(Exception):
+    """Raised when a speech job is submitted while the voice worker's queue is full."""
+
+
+class VoiceWorker:
+    """A background event loop running speech synthesis jobs, with a bounded queue."""
+    
+    def __init__(self, max_concurrent: int = TTS_MAX_CONCURRENT, max_queued: int = TTS_MAX_QUEUED,
+                 name: str = "mindease-voice"):
+        """
+        Args:
+            max_concurrent: Jobs synthesizing at once
+            max_queued: Jobs allowed to wait for a free slot
+            name: Name of the loop thread
+        """
+        self.runtime = BackgroundLoop(name)
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self._slots: Optional[asyncio.Semaphore] = None   # created on the loop
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.submitted = 0
+        self.rejected = 0
+        self.failed = 0
+    
+    def _reserve(self):
+        """Count a new job in, or raise SynthesisQueueFull."""
+        with self._lock:
+            if self._pending >= self.max_concurrent + self.max_queued:
+                self.rejected += 1
+                raise SynthesisQueueFull(f"{self._pending} speech jobs already queued or running")
+            self._pending += 1
+            self.submitted += 1
+    
+    def _release(self, failed: bool = False):
+        with self._lock:
+            self._pending -= 1
+            if failed:
+                self.failed += 1
+    
+    def _get_slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        return self._slots
+    
+    async def _limited(self, coro: Awaitable[T]) -> T:
+        async with self._get_slots():
+            return await coro
+    
+    def submit(self, coro: Awaitable[T]) -> "concurrent.futures.Future[T]":
+        """
+        Queue a synthesis coroutine on the voice loop.
+        
+        Returns:
+            A concurrent.futures.Future for its result
+        
+        Raises:
+            SynthesisQueueFull: If the queue is at its cap (the coroutine is closed)
+        """
+        try:
+            self._reserve()
+        except SynthesisQueueFull:
+            coro.close()
+            raise
+        try:
+            future = self.runtime.submit(self._limited(coro))
+        except BaseException:
+            self._release(failed=True)
+            raise
+        future.add_done_callback(
+            lambda f: self._release(failed=f.cancelled() or f.exception() is not None))
+        return future
+    
+    def iterate(self, agen: AsyncIterator[T]) -> Iterator[T]:
+        """
+        Consume an async iterator on the voice loop from synchronous code.
+        
+        The job holds one synthesis slot until the iterator is exhausted
+        or closed.
+        
+        Raises:
+            SynthesisQueueFull: If the queue is at its cap
+        """
+        self._reserve()
+        
+        async def limited():
+            async with self._get_slots():
+                async for item in agen:
+                    yield item
+        
+        failed = True
+        try:
+            yield from self.runtime.iterate(limited())
+            failed = False
+        except GeneratorExit:
+            failed = False
+            raise
+        finally:
+            self._release(failed)
+    
+    def stats(self) -> dict:
+        """Queue depth and job counters."""
+        with self._lock:
+            return {
+                "pending": self._pending,
+                "max_concurrent": self.max_concurrent,
+                "max_queued": self.max_queued,
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+                "failed": self.failed,
+            }
+    
+    def shutdown(self, timeout: float = 5.0):
+        """Cancel outstanding jobs and stop the loop thread."""
+        self.runtime.shutdown(timeout)
+        self._slots = None
+
+
+_SHARED_WORKER: Optional[VoiceWorker] = None
+_SHARED_WORKER_LOCK = threading.Lock()
+
+
+def get_voice_worker() -> VoiceWorker:
+    """The process-wide voice worker, created on first use and shut down at exit."""
+    global _SHARED_WORKER
+    with _SHARED_WORKER_LOCK:
+        if _SHARED_WORKER is None:
+            _SHARED_WORKER = VoiceWorker()
+            atexit.register(_SHARED_WORKER.shutdown)
+        return _SHARED_WORKER
+
+
+def split_sentences(text: str, max_chars: int = SPEECH_CHUNK_CHARS) -> List[str]:
+    """
+    Split text into pieces for pipelined synthesis.
+    
+    The first sentence is always a piece of its own so playback can start
+    early; later sentences are grouped up to max_chars. A sentence longer
+    than max_chars is broken at commas, then at spaces.
+    
+    Args:
+        text: Cleaned text
+        max_chars: Target piece length
+    
+    Returns:
+        Pieces in order (joined with spaces they give back the text)
+    """
+    sentences = []
+    for sentence in SENTENCE_END.split(text.strip()):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(", ", 0, max_chars)
+            if cut <= 0:
+                cut = sentence.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            else:
+                cut += 1
+            sentences.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if sentence:
+            sentences.append(sentence)
+    
+    pieces = sentences[:1]
+    for sentence in sentences[1:]:
+        if len(pieces) > 1 and len(pieces[-1]) + 1 + len(sentence) <= max_chars:
+            pieces[-1] += " " + sentence
+        else:
+            pieces.append(sentence)
+    return pieces
+
+
+async def edge_audio_chunks(text: str, voice: str) -> AsyncIterator[bytes]:
+    """
+    Stream MP3 audio for a text from Edge TTS, chunk by chunk, in memory.
+    
+    Args:
+        text: Text to speak
+        voice: Edge TTS voice name
+    
+    Yields:
+        MP3 byte chunks as they arrive
+    """
+    async for chunk in edge_tts.Communicate(text, voice).stream():
+        if chunk["type"] == "audio":
+            yield chunk["data"]
+
 
 class VoiceHandler:
     """Handles voice input and output for the chatbot."""
     
-    def __init__(self, voice: str = DEFAULT_VOICE):
-        """Initialize voice handler with available engines."""
+    def __init__(self, voice: str = DEFAULT_VOICE, audio_cache: Optional[AudioCache] = None,
+                 audio_assets: Optional[AssetBundle] = None, worker: Optional[VoiceWorker] = None):
+        """
+        Initialize voice handler with available engines.
+        
+        Args:
+            voice: Edge TTS voice name
+            audio_cache: Cache for synthesized audio (defaults to the shared
+                cache; disable with MINDEASE_TTS_CACHE=0)
+            audio_assets: Pre-rendered audio for static texts (defaults to
+                the bundle built by `python -m utils.audio_assets build`)
+            worker: Event loop that runs synthesis (defaults to the shared
+                voice worker)
+        """
         self.tts_engine = None
         self.recognizer = None
         self.voice = voice
+        self.audio_cache = audio_cache if audio_cache is not None else get_audio_cache()
+        self.audio_assets = audio_assets if audio_assets is not None else get_audio_assets()
+        self.worker = worker if worker is not None else get_voice_worker()
         self._init_tts()
         self._init_stt()
     
@@ -102,45 +346,248 @@ class VoiceHandler:
             use_gtts: Whether to use Google TTS (ignored, Edge TTS preferred)
         
         Returns:
-            Path to audio file
+            Path to a temporary audio file (the caller may delete it)
         """
-        # Clean text for speech (remove markdown formatting)
-        clean_text = self._clean_text_for_speech(text)
-        
-        # Prefer Edge TTS for natural voice
-        if EDGE_TTS_AVAILABLE:
-            return self._speak_edge_tts(clean_text)
-        elif GTTS_AVAILABLE:
-            return self._speak_gtts(clean_text)
-        elif self.tts_engine:
-            self._speak_pyttsx3(clean_text)
+        if not (EDGE_TTS_AVAILABLE or GTTS_AVAILABLE):
+            if self.tts_engine:
+                self._speak_pyttsx3(self._clean_text_for_speech(text))
+            else:
+                print("No TTS engine available")
             return None
-        else:
-            print("No TTS engine available")
+        
+        audio = self.speak_bytes(text)
+        if audio is None:
             return None
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as f:
+            f.write(audio)
+            return f.name
     
-    def _speak_edge_tts(self, text: str) -> Optional[str]:
-        """Generate speech using Edge TTS (natural sounding)."""
+    def speak_bytes(self, text: str, pipelined: bool = False) -> Optional[bytes]:
+        """
+        Convert text to MP3 audio in memory.
+        
+        Served from the pre-rendered assets or the audio cache when possible.
+        
+        Args:
+            text: Text to speak
+            pipelined: Speak the whole text, synthesizing its sentences
+                concurrently (otherwise it is cut at 500 characters, unless
+                the full text is pre-rendered or cached). This still waits
+                for every piece; use speak_stream() to start playback early.
+        
+        Returns:
+            MP3 bytes, or None if no file-producing engine succeeded or the
+            voice worker is overloaded
+        """
         try:
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as f:
-                temp_path = f.name
-            
-            # Run async function
-            asyncio.run(self._generate_edge_audio(text, temp_path))
-            
-            return temp_path
-        except Exception as e:
-            print(f"Edge TTS failed: {e}")
-            # Fallback to gTTS
-            if GTTS_AVAILABLE:
-                return self._speak_gtts(text)
+            return self.submit(text, pipelined).result()
+        except SynthesisQueueFull as e:
+            print(f"⚠️ Speech skipped: {e}")
             return None
     
-    async def _generate_edge_audio(self, text: str, output_path: str):
-        """Async function to generate audio with Edge TTS."""
-        communicate = edge_tts.Communicate(text, self.voice)
-        await communicate.save(output_path)
+    def submit(self, text: str, pipelined: bool = False) -> "concurrent.futures.Future[Optional[bytes]]":
+        """
+        Queue text for synthesis on the voice worker without waiting.
+        
+        Args:
+            text: Text to speak
+            pipelined: See speak_bytes()
+        
+        Returns:
+            A future for the MP3 bytes (None if no engine succeeded)
+        
+        Raises:
+            SynthesisQueueFull: If too many speech jobs are already queued
+        """
+        return self.worker.submit(self.synthesize(text, pipelined))
+    
+    def speak_stream(self, text: str, pipelined: bool = False) -> Iterator[bytes]:
+        """
+        Convert text to speech, yielding MP3 chunks as they are synthesized.
+        
+        Nothing touches the disk: Edge TTS chunks are yielded as they arrive
+        from the service, gTTS audio is written into memory. Completed audio
+        is added to the audio cache.
+        
+        In pipelined mode each chunk is the complete MP3 of one piece of the
+        text (see split_sentences()); the first is ready for playback while
+        the rest are still being synthesized.
+        
+        An engine failure before any audio is out falls back to the next
+        engine; after that the stream ends early rather than switching voice
+        (speak_bytes() always falls back, since it returns nothing until done).
+        
+        Args:
+            text: Text to speak
+            pipelined: See speak_bytes()
+        
+        Yields:
+            MP3 byte chunks (concatenated, they form one MP3 stream)
+        """
+        try:
+            yield from self.worker.iterate(self.stream(text, pipelined))
+        except SynthesisQueueFull as e:
+            print(f"⚠️ Speech skipped: {e}")
+    
+    async def synthesize(self, text: str, pipelined: bool = False) -> Optional[bytes]:
+        """Async speak_bytes(): the whole MP3 for a text, or None."""
+        audio = b"".join([chunk async for chunk in self._audio_chunks(text, pipelined, buffered=True)])
+        return audio or None
+    
+    async def stream(self, text: str, pipelined: bool = False) -> AsyncIterator[bytes]:
+        """Async speak_stream(): MP3 chunks for a text as they arrive."""
+        async for chunk in self._audio_chunks(text, pipelined, buffered=False):
+            yield chunk
+    
+    async def _audio_chunks(self, text: str, pipelined: bool, buffered: bool) -> AsyncIterator[bytes]:
+        """MP3 chunks for raw text; buffered callers see nothing until the audio is complete."""
+        # Clean text for speech (remove markdown formatting)
+        full_text = self._clean_text_for_speech(text, max_chars=None)
+        if pipelined:
+            chunks = self._stream_pipelined(full_text, buffered)
+        else:
+            clean_text = self._clean_text_for_speech(text)
+            stored = None
+            if clean_text != full_text:
+                # Long static texts are pre-rendered in full; play those rather than a cut
+                stored = await self._stored_any_engine(full_text)
+            if stored is not None:
+                yield stored
+                return
+            chunks = self._stream_clean(clean_text, buffered)
+        async for chunk in chunks:
+            yield chunk
+    
+    async def _stream_clean(self, clean_text: str, buffered: bool = False) -> AsyncIterator[bytes]:
+        """
+        MP3 chunks for already-cleaned text, from storage or the first engine that works.
+        
+        When buffered, chunks are held until the engine finishes, so a failure
+        part-way through falls back to the next engine with nothing lost;
+        otherwise a failure after audio is out ends the audio there.
+        """
+        # Prefer Edge TTS for natural voice, then gTTS
+        for engine, voice in self._file_engines():
+            key = audio_key(clean_text, voice, engine)
+            audio = await asyncio.to_thread(self._stored_audio, key)
+            if audio is not None:
+                yield audio
+                return
+            parts = []
+            try:
+                async for chunk in self._engine_chunks(clean_text, engine, voice):
+                    parts.append(chunk)
+                    if not buffered:
+                        yield chunk
+            except Exception as e:
+                print(f"{engine} TTS failed: {e}")
+                if parts and not buffered:
+                    # Part of the audio is already out; don't splice in another voice
+                    return
+                continue
+            if parts:
+                audio = b"".join(parts)
+                if self.audio_cache is not None:
+                    await asyncio.to_thread(self.audio_cache.put, key, audio)
+                if buffered:
+                    yield audio
+                return
+    
+    async def _stream_pipelined(self, clean_text: str, buffered: bool = False) -> AsyncIterator[bytes]:
+        """
+        One complete MP3 per sentence piece, in order, synthesized concurrently.
+        
+        All pieces come from one engine. If a piece fails before any audio was
+        handed out (always, when buffered), the whole text is redone with the
+        next engine rather than mixing two voices; a failure after playback
+        has started ends the audio there.
+        """
+        # Pre-rendered assets and earlier replays hold the text as a whole
+        audio = await self._stored_any_engine(clean_text)
+        if audio is not None:
+            yield audio
+            return
+        
+        pieces = split_sentences(clean_text)
+        for engine, voice in self._file_engines():
+            rendered, started = [], False
+            try:
+                async for audio in self._pipeline_engine(pieces, engine, voice):
+                    if buffered:
+                        rendered.append(audio)
+                    else:
+                        started = True
+                        yield audio
+            except Exception as e:
+                print(f"{engine} TTS failed: {e}")
+                if started:
+                    # Part of the audio is already out; don't continue in another voice
+                    return
+                continue
+            if rendered:
+                yield b"".join(rendered)
+            return
+    
+    async def _pipeline_engine(self, pieces: List[str], engine: str, voice: str) -> AsyncIterator[bytes]:
+        """Each piece's MP3 from one engine, in order; raises if any piece fails."""
+        slots = asyncio.Semaphore(TTS_PIPELINE_WORKERS)
+        
+        async def render(piece: str) -> bytes:
+            async with slots:
+                key = audio_key(piece, voice, engine)
+                audio = await asyncio.to_thread(self._stored_audio, key)
+                if audio is not None:
+                    return audio
+                audio = b"".join([chunk async for chunk in self._engine_chunks(piece, engine, voice)])
+                if not audio:
+                    raise RuntimeError(f"no audio for: {piece[:40]}...")
+                if self.audio_cache is not None:
+                    await asyncio.to_thread(self.audio_cache.put, key, audio)
+                return audio
+        
+        # Semaphore waiters are woken in order, so pieces start in text order
+        tasks = [asyncio.ensure_future(render(piece)) for piece in pieces]
+        try:
+            for task in tasks:
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    async def _stored_any_engine(self, clean_text: str) -> Optional[bytes]:
+        """Stored audio for a whole text in any file engine's voice, preferred engine first."""
+        for engine, voice in self._file_engines():
+            audio = await asyncio.to_thread(self._stored_audio, audio_key(clean_text, voice, engine))
+            if audio is not None:
+                return audio
+        return None
+    
+    def _stored_audio(self, key: str) -> Optional[bytes]:
+        """Audio for a key from the pre-rendered assets or the audio cache."""
+        if self.audio_assets is not None:
+            audio = self.audio_assets.get(key)
+            if audio is not None:
+                return audio
+        if self.audio_cache is not None:
+            return self.audio_cache.get(key)
+        return None
+    
+    def _file_engines(self):
+        """(engine, voice) pairs that produce MP3 audio, in order of preference."""
+        if EDGE_TTS_AVAILABLE:
+            yield "edge", self.voice
+        if GTTS_AVAILABLE:
+            yield "gtts", "en"
+    
+    async def _engine_chunks(self, text: str, engine: str, voice: str) -> AsyncIterator[bytes]:
+        """MP3 chunks for a text from one engine."""
+        if engine == "edge":
+            async for chunk in edge_audio_chunks(text, voice):
+                yield chunk
+        else:
+            # gTTS is a blocking HTTP client; keep it off the loop
+            yield await asyncio.to_thread(self._gtts_bytes, text)
     
     def _speak_pyttsx3(self, text: str) -> None:
         """Speak text using pyttsx3."""
@@ -150,23 +597,16 @@ class VoiceHandler:
         except Exception as e:
             print(f"pyttsx3 speech failed: {e}")
     
-    def _speak_gtts(self, text: str) -> Optional[str]:
-        """Generate speech audio file using Google TTS."""
-        try:
-            tts = gTTS(text=text, lang='en', slow=False)
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as f:
-                temp_path = f.name
-            tts.save(temp_path)
-            return temp_path
-        except Exception as e:
-            print(f"gTTS failed: {e}")
-            return None
+    @staticmethod
+    def _gtts_bytes(text: str) -> bytes:
+        """Generate speech with Google TTS, written into memory."""
+        buffer = io.BytesIO()
+        gTTS(text=text, lang='en', slow=False).write_to_fp(buffer)
+        return buffer.getvalue()
     
-    def _clean_text_for_speech(self, text: str) -> str:
-        """Remove markdown and special formatting for cleaner speech."""
-        import re
-        
+    @staticmethod
+    def _clean_text_for_speech(text: str, max_chars: Optional[int] = SPEECH_MAX_CHARS) -> str:
+        """Remove markdown and special formatting for cleaner speech (cut at max_chars, if set)."""
         # Remove markdown headers
         text = re.sub(r'#{1,6}\s*', '', text)
         # Remove bold/italic markers
@@ -178,8 +618,8 @@ class VoiceHandler:
         # Clean up extra whitespace
         text = re.sub(r'\s+', ' ', text).strip()
         # Limit length for speech
-        if len(text) > 500:
-            text = text[:500] + "... Please read the full response on screen."
+        if max_chars is not None and len(text) > max_chars:
+            text = text[:max_chars] + "... Please read the full response on screen."
         
         return text
     
@@ -253,7 +693,10 @@ class VoiceHandler:
             "tts_engine": tts_engine,
             "voice": self.voice if EDGE_TTS_AVAILABLE else "default",
             "stt_available": self.is_stt_available(),
-            "stt_engine": "Google Speech Recognition" if self.recognizer else None
+            "stt_engine": "Google Speech Recognition" if self.recognizer else None,
+            "audio_cache": self.audio_cache.stats() if self.audio_cache is not None else None,
+            "audio_assets": self.audio_assets.stats() if self.audio_assets is not None else None,
+            "voice_worker": self.worker.stats()
         }
     
     def get_available_voices(self) -> dict:
@@ -262,12 +705,9 @@ class VoiceHandler:
 
 
 # Alternative async speech for non-blocking TTS
-def speak_async(text: str, voice_handler: VoiceHandler):
-    """Speak text in a background thread."""
-    thread = threading.Thread(target=voice_handler.speak, args=(text,))
-    thread.daemon = True
-    thread.start()
-    return thread
+def speak_async(text: str, voice_handler: VoiceHandler) -> "concurrent.futures.Future[Optional[bytes]]":
+    """Synthesize text on the voice worker; returns a future for the MP3 bytes."""
+    return voice_handler.submit(text)
 
 
 def check_microphone_availability() -> Tuple[bool, str]: